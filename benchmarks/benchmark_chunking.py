@@ -0,0 +1,97 @@
+'''
+Benchmarks hdf5 write throughput and file size of `ps.Experiment` for typical 1D-4D scan layouts
+using different `runinfo.chunks` and `runinfo.compression` settings.
+
+Usage
+-----
+python benchmarks/benchmark_chunking.py [--scale 1.0] [--data-dir ./benchmark_data]
+'''
+import argparse
+import os
+import shutil
+import numpy as np
+import pyscan as ps
+
+from time import perf_counter
+
+
+# (name, scan lengths from scan0 upward, shape of the data measured at each point)
+LAYOUTS = [
+    ('1D scalar', (4000,), ()),
+    ('2D scalar', (64, 64), ()),
+    ('2D spectrum', (32, 32), (256,)),
+    ('3D spectrum', (16, 16, 8), (128,)),
+    ('4D spectrum', (8, 8, 6, 4), (64,)),
+]
+
+POLICIES = [
+    ('single chunk', None, None, False),
+    ('point', 'point', None, False),
+    ('auto', 'auto', None, False),
+    ('auto + gzip', 'auto', 'gzip', True),
+    ('auto + lzf', 'auto', 'lzf', True),
+]
+
+
+def make_axis_function(i):
+    def axis(value):
+        pass
+
+    axis.__name__ = f'axis{i}'
+    return axis
+
+
+def make_measure_function(point_shape):
+    rng = np.random.default_rng(0)
+
+    def measure(expt):
+        d = ps.ItemAttribute()
+        # smooth signal with noise so that compression ratios are realistic
+        d.x = np.round(np.sin(expt.runinfo.scan0.i / 10) + 1e-3 * rng.standard_normal(), 6)
+        if point_shape != ():
+            d.spectrum = np.round(np.sin(np.linspace(0, 10, point_shape[0])) + 1e-3 * rng.standard_normal(point_shape), 6)
+        return d
+
+    return measure
+
+
+def run_layout(dims, point_shape, chunks, compression, shuffle, data_dir):
+    runinfo = ps.RunInfo()
+    for i, n in enumerate(dims):
+        runinfo[f'scan{i}'] = ps.FunctionScan(make_axis_function(i), np.arange(n))
+    runinfo.measure_function = make_measure_function(point_shape)
+    runinfo.initial_pause = 0
+    runinfo.chunks = chunks
+    runinfo.compression = compression
+    runinfo.shuffle = shuffle
+
+    expt = ps.Experiment(runinfo, ps.ItemAttribute(), data_dir=data_dir)
+
+    t0 = perf_counter()
+    expt.run()
+    elapsed = perf_counter() - t0
+
+    n_points = int(np.prod(dims))
+    size = os.path.getsize(expt.save_name)
+
+    return n_points / elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help='scales the length of scan0 of every layout')
+    parser.add_argument('--data-dir', default='./benchmark_data', help='temporary directory for hdf5 files')
+    args = parser.parse_args()
+
+    print('{:<14}{:<16}{:>12}{:>12}'.format('layout', 'policy', 'points/s', 'size (kB)'))
+    for name, dims, point_shape in LAYOUTS:
+        dims = (max(1, int(dims[0] * args.scale)), *dims[1:])
+        for policy, chunks, compression, shuffle in POLICIES:
+            rate, size = run_layout(dims, point_shape, chunks, compression, shuffle, args.data_dir)
+            print('{:<14}{:<16}{:>12.0f}{:>12.0f}'.format(name, policy, rate, size / 1e3))
+
+    shutil.rmtree(args.data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+'''
+Benchmarks the per-point overhead of the `ps.Experiment` run loop: iterating the scan indicies with
+`ps.delta_product` and `ps.IterationPlan`, and running 1D-3D experiments of `ps.TestVoltage`
+`PropertyScan`s with a trivial measure function.
+
+Usage
+-----
+python benchmarks/benchmark_iteration.py [--scale 1.0] [--data-dir ./benchmark_data]
+'''
+import argparse
+import shutil
+import numpy as np
+import pyscan as ps
+
+from time import perf_counter
+
+
+# scan lengths from scan0 upward
+LAYOUTS = [
+    ('1D', (20000,)),
+    ('2D', (200, 100)),
+    ('3D', (50, 20, 20)),
+]
+
+
+def time_iteration(iterable):
+    t0 = perf_counter()
+    n = 0
+    for indicies, deltas in iterable:
+        n += 1
+    return (perf_counter() - t0) / n
+
+
+def measure_voltages(expt):
+    d = ps.ItemAttribute()
+    d.x = expt.runinfo.scan0.i
+    return d
+
+
+def time_experiment(dims, data_dir):
+    devices = ps.ItemAttribute()
+    runinfo = ps.RunInfo()
+    for i, n in enumerate(dims):
+        devices[f'v{i}'] = ps.TestVoltage()
+        runinfo[f'scan{i}'] = ps.PropertyScan({f'v{i}': np.linspace(-10, 10, n)}, 'voltage')
+    runinfo.measure_function = measure_voltages
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, devices, data_dir=data_dir)
+
+    t0 = perf_counter()
+    expt.run()
+    return (perf_counter() - t0) / int(np.prod(dims))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help='scales the length of scan0 of every layout')
+    parser.add_argument('--data-dir', default='./benchmark_data', help='temporary directory for hdf5 files')
+    args = parser.parse_args()
+
+    print('{:<8}{:>10}{:>20}{:>20}{:>20}'.format(
+        'layout', 'points', 'delta_product (us)', 'IterationPlan (us)', 'experiment (us)'))
+    for name, dims in LAYOUTS:
+        dims = (max(1, int(dims[0] * args.scale)), *dims[1:])
+        iterators = [range(n) for n in dims]
+
+        t_delta = time_iteration(ps.delta_product(iterators))
+        t_plan = time_iteration(ps.IterationPlan(iterators))
+        t_expt = time_experiment(dims, args.data_dir)
+
+        print('{:<8}{:>10}{:>20.2f}{:>20.2f}{:>20.2f}'.format(
+            name, int(np.prod(dims)), 1e6 * t_delta, 1e6 * t_plan, 1e6 * t_expt))
+
+    shutil.rmtree(args.data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+'''
+Benchmarks the cost of the `ps.RunInfo` scan properties used at every point of a run (scans, dims,
+indicies, average_indicies, has_average_scan, continuous_index), with the compiled scan structure cached
+and with the structure recomputed at every access as before it was cached.
+
+Usage
+-----
+python benchmarks/benchmark_run_info.py [--points 20000]
+'''
+import argparse
+import pyscan as ps
+
+from time import perf_counter
+
+
+def make_runinfo(ndim):
+    runinfo = ps.RunInfo()
+    for i in range(ndim - 1):
+        runinfo[f'scan{i}'] = ps.PropertyScan({f'v{i}': ps.drange(0, 0.1, 1)}, 'voltage')
+    runinfo[f'scan{ndim - 1}'] = ps.AverageScan(10)
+    runinfo.check()
+    return runinfo
+
+
+def access(runinfo):
+    runinfo.scans
+    runinfo.dims
+    runinfo.indicies
+    runinfo.average_indicies
+    runinfo.has_average_scan
+    runinfo.continuous_index
+
+
+def time_access(runinfo, points, cached):
+    t0 = perf_counter()
+    for _ in range(points):
+        if not cached:
+            runinfo._structure = None
+        access(runinfo)
+    return (perf_counter() - t0) / points
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=20000, help='number of simulated points')
+    args = parser.parse_args()
+
+    print('{:<8}{:>16}{:>16}'.format('scans', 'uncached (us)', 'cached (us)'))
+    for ndim in [1, 2, 3, 4]:
+        runinfo = make_runinfo(ndim)
+        uncached = time_access(runinfo, args.points, False)
+        cached = time_access(runinfo, args.points, True)
+        print('{:<8}{:>16.2f}{:>16.2f}'.format(ndim, 1e6 * uncached, 1e6 * cached))
+
+
+if __name__ == '__main__':
+    main()
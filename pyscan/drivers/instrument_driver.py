@@ -1,10 +1,28 @@
 from .new_instrument import new_instrument
 from itemattribute import ItemAttribute
 from collections import OrderedDict
+from threading import Lock
+from weakref import WeakKeyDictionary
+import asyncio
 import numpy as np
 import re
 
 
+# one lock per driver, kept outside of the drivers so that they can still be saved as metadata
+_instrument_locks = WeakKeyDictionary()
+_instrument_locks_lock = Lock()
+
+
+def instrument_lock(driver):
+    '''
+    Returns the lock that serializes the async calls to a driver's instrument
+    '''
+    with _instrument_locks_lock:
+        if driver not in _instrument_locks:
+            _instrument_locks[driver] = Lock()
+        return _instrument_locks[driver]
+
+
 class InstrumentDriver(ItemAttribute):
     '''
     Base driver class which creates class attributes based on a
@@ -20,6 +38,12 @@ class InstrumentDriver(ItemAttribute):
     query(string)
     write(string)
     read()
+    run_in_executor(function, *args)
+    async_query(string)
+    async_write(string)
+    async_read()
+    async_get(prop)
+    async_set(prop, value)
     find_first_key(dictionary, machine_value)
     add_device_property(settings)
     get_instrument_property()
@@ -92,6 +116,95 @@ class InstrumentDriver(ItemAttribute):
 
         return self.instrument.read()
 
+    async def run_in_executor(self, function, *args):
+        '''
+        Runs a blocking function in the event loop's default executor, holding the driver's lock so that
+        only one call at a time talks to the instrument
+
+        Parameters
+        ----------
+        function : func
+            Blocking function
+        *args :
+            Arguments of `function`
+
+        Returns
+        -------
+        Return value of `function`
+        '''
+
+        def locked():
+            with instrument_lock(self):
+                return function(*args)
+
+        return await asyncio.get_running_loop().run_in_executor(None, locked)
+
+    async def async_query(self, string):
+        '''
+        Awaitable `query`, which runs in a thread so that queries of different instruments overlap
+
+        Parameters
+        ----------
+        string: str
+            The message to send to the device
+
+        Returns
+        -------
+        str
+            Answer from the device.
+        '''
+        return await self.run_in_executor(self.query, string)
+
+    async def async_write(self, string):
+        '''
+        Awaitable `write`, which runs in a thread so that writes to different instruments overlap
+
+        Parameters
+        ----------
+        string: str
+            The message to be sent
+        '''
+        await self.run_in_executor(self.write, string)
+
+    async def async_read(self):
+        '''
+        Awaitable `read`, which runs in a thread so that reads of different instruments overlap
+
+        Returns
+        -------
+        str
+            Message read from the instrument
+        '''
+        return await self.run_in_executor(self.read)
+
+    async def async_get(self, prop):
+        '''
+        Awaitable query of a property, e.g. `await v1.async_get('voltage')`
+
+        Parameters
+        ----------
+        prop : str
+            Name of the property
+
+        Returns
+        -------
+        Value of the property
+        '''
+        return await self.run_in_executor(getattr, self, prop)
+
+    async def async_set(self, prop, value):
+        '''
+        Awaitable set of a property, e.g. `await v1.async_set('voltage', 1)`
+
+        Parameters
+        ----------
+        prop : str
+            Name of the property
+        value :
+            New value
+        '''
+        await self.run_in_executor(setattr, self, prop, value)
+
     def find_first_key(self, dictionary, machine_value):
         for key, val in dictionary.items():
             if str(val) == str(machine_value):
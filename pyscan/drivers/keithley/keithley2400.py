@@ -1,7 +1,8 @@
+import warnings
 from pyscan.drivers.instrument_driver import InstrumentDriver
 import numpy as np
-from time import sleep
 from ...general.d_range import drange
+from ...general.interruptible_sleep import interruptible_sleep, device_cancel_event
 
 
 class Keithley2400(InstrumentDriver):
@@ -138,9 +139,14 @@ class Keithley2400(InstrumentDriver):
 
         ramp_values = drange(start + sign * step_size, sign * step_size, new_value)
 
+        level = start
         for v in ramp_values:
-            sleep(0.05)
+            if interruptible_sleep(0.05, device_cancel_event(self)):
+                warnings.warn('Voltage ramp to {} was interrupted by Experiment.stop(), '
+                              'the output stays at {}'.format(new_value, level))
+                return
             self.write(';:SOUR:VOLT:LEV {}'.format(v))
+            self._voltage = level = v
 
         self._voltage = new_value
 
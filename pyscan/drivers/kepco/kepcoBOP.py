@@ -1,5 +1,6 @@
+import warnings
 from ..instrument_driver import InstrumentDriver
-from time import sleep
+from ...general.interruptible_sleep import interruptible_sleep, device_cancel_event
 import math
 
 
@@ -102,7 +103,11 @@ class KepcoBOP(InstrumentDriver):
                 current_steps.append(iend)
                 for current in current_steps:
                     self.write('curr {0:.4f}'.format(current))
-                    sleep(delta_i / current_sweep_rate)
+                    self._current = current
+                    if interruptible_sleep(delta_i / current_sweep_rate, device_cancel_event(self)):
+                        warnings.warn('Current ramp to {} was interrupted by Experiment.stop(), '
+                                      'the output stays at {}'.format(iend, self._current))
+                        return
                 self._current = iend
 
         else:
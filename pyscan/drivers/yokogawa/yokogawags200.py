@@ -1,7 +1,8 @@
+import warnings
 from ..instrument_driver import InstrumentDriver
 import numpy as np
-from time import sleep
 from ...general.d_range import drange
+from ...general.interruptible_sleep import interruptible_sleep, device_cancel_event
 
 
 class YokogawaGS200(InstrumentDriver):
@@ -87,8 +88,12 @@ class YokogawaGS200(InstrumentDriver):
             ramp_values = drange(start + sign * step_size, sign * step_size, new_value)
 
             for v in ramp_values:
-                sleep(self.dt)
+                if interruptible_sleep(self.dt, device_cancel_event(self)):
+                    warnings.warn('Voltage ramp to {} was interrupted by Experiment.stop(), '
+                                  'the output stays at {}'.format(new_value, self._voltage))
+                    return
                 self.write('SOUR:LEV:FIX {}'.format(v))
+                self._voltage = v
 
             self._voltage = new_value
 
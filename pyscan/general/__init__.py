@@ -1,9 +1,15 @@
 # methods
 from .d_range import drange
 from .delta_product import delta_product
+from .iteration_plan import IterationPlan
 from .first_string import first_string
+from .interruptible_sleep import interruptible_sleep, bind_cancel_event, device_cancel_event
 from .is_list_type import is_list_type
 from .is_numeric_type import is_numeric_type
 from .same_length import same_length
 from .set_difference import set_difference
 from .append_stack_or_contact import append_stack_or_contact
+from .growable_array import GrowableArray
+from .ring_buffer import RingBuffer
+from .running_statistics import welford_update
+from .scan_values import ScanValues, Linspace, DRange, Logspace, ValueList, Piecewise
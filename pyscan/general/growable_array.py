@@ -0,0 +1,100 @@
+import numpy as np
+
+
+class GrowableArray(object):
+    '''
+    Array that grows along one axis with amortized O(1) cost per element. Values are stored in a
+    buffer whose capacity doubles when it is full, and `array` is a view of the logical length.
+
+    Parameters
+    ----------
+    array : array like object
+        Initial values
+    axis : int
+        Axis along which the array grows, defaults to 0
+    fill_value : float
+        Value of unused elements of the buffer, defaults to np.nan
+
+    Attributes
+    ----------
+    length : int
+        Logical length of the array along `axis`
+    buffer : np.ndarray
+        Storage including unused capacity
+
+    Methods
+    -------
+    resize(length)
+    append(value)
+    '''
+
+    def __init__(self, array, axis=0, fill_value=np.nan):
+        array = np.array(array, dtype=float)
+        if array.ndim == 0:
+            array = array.reshape((1,))
+
+        self.axis = axis
+        self.fill_value = fill_value
+        self.length = array.shape[axis]
+        self.buffer = array
+
+    @property
+    def capacity(self):
+        '''
+        Returns the number of elements along `axis` that fit in the buffer
+        '''
+        return self.buffer.shape[self.axis]
+
+    @property
+    def array(self):
+        '''
+        Returns a view of the buffer containing the logical length of the array
+        '''
+        return self.buffer[self.index(slice(0, self.length))]
+
+    def index(self, i):
+        '''
+        Returns an index tuple selecting `i` along `axis`
+        '''
+        return (*(slice(None) for _ in range(self.axis)), i)
+
+    def resize(self, length):
+        '''
+        Sets the logical length, doubling the buffer capacity as many times as needed.
+
+        Parameters
+        ----------
+        length : int
+            New logical length along `axis`
+        '''
+        if length > self.capacity:
+            capacity = max(self.capacity, 1)
+            while capacity < length:
+                capacity *= 2
+
+            shape = list(self.buffer.shape)
+            shape[self.axis] = capacity
+            buffer = np.full(shape, self.fill_value, dtype=self.buffer.dtype)
+            buffer[self.index(slice(0, self.length))] = self.array
+            self.buffer = buffer
+
+        self.length = length
+
+    def append(self, value):
+        '''
+        Appends `value` to the end of the array along `axis`
+
+        Parameters
+        ----------
+        value : int, float, or array like object
+        '''
+        self.resize(self.length + 1)
+        self.buffer[self.index(self.length - 1)] = value
+
+    def __len__(self):
+        return self.length
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.array
+        return self.array.astype(dtype)
@@ -0,0 +1,78 @@
+from time import sleep
+from weakref import WeakKeyDictionary
+
+
+# the cancel event of the experiment running each device, kept outside of the drivers so that they can still
+# be saved as metadata
+_device_events = WeakKeyDictionary()
+
+
+def interruptible_sleep(seconds, cancel_event=None):
+    '''
+    Sleeps for `seconds`, or until `cancel_event` is set by `Experiment.stop()`. Used for the waits of
+    scans and of ramping drivers, so that a stop takes effect within milliseconds instead of after the
+    current point.
+
+    Parameters
+    ----------
+    seconds : float
+        Time to sleep.
+    cancel_event : threading.Event, optional
+        `Experiment.cancel_event` of the running experiment. If None (default), sleeps without interruption.
+
+    Returns
+    -------
+    bool
+        True if the sleep was interrupted, or `cancel_event` was already set
+    '''
+
+    if cancel_event is None:
+        if seconds > 0:
+            sleep(seconds)
+        return False
+    if seconds <= 0:
+        return cancel_event.is_set()
+    return cancel_event.wait(seconds)
+
+
+def bind_cancel_event(device, cancel_event):
+    '''
+    Sets the cancel event that interrupts the ramps of a device, see `device_cancel_event`. Used by an
+    experiment for its devices while it runs.
+
+    Parameters
+    ----------
+    device : object
+        Driver of the device
+    cancel_event : threading.Event or None
+        Event of the running experiment, or None to remove the device's event
+    '''
+
+    try:
+        if cancel_event is None:
+            _device_events.pop(device, None)
+        else:
+            _device_events[device] = cancel_event
+    except TypeError:
+        # objects that can not be weakly referenced do not ramp with `interruptible_sleep`
+        pass
+
+
+def device_cancel_event(device):
+    '''
+    Returns the cancel event of the experiment running a device, or None if no experiment is running it
+
+    Parameters
+    ----------
+    device : object
+        Driver of the device
+
+    Returns
+    -------
+    threading.Event or None
+    '''
+
+    try:
+        return _device_events.get(device)
+    except TypeError:
+        return None
@@ -0,0 +1,169 @@
+import numpy as np
+
+
+class IterationPlan(object):
+    '''
+    Iterable of the indicies and deltas of nested scan loops, equivalent to `delta_product` but computed
+    with numpy for a whole chunk of points at a time, so that iterating does not allocate numpy arrays
+    for every point.
+
+    Parameters
+    ----------
+    iterator_list : list(range(int))
+        Iterators of the scans, from scan0 (innermost) to the outermost scan, e.g. `runinfo.iterators`
+    continuous : bool
+        If True and the outermost iterator is `range(1)`, the outermost index increases indefinitely,
+        as for a `.ContinuousScan` without `n_max`. Defaults to False.
+    chunk_size : int
+        Number of points computed at a time, defaults to 65536
+    serpentine : bool
+        If True, every index except the outermost runs backwards on alternate passes, so that consecutive
+        points only ever differ by one step of one index and no scan returns to its start value.
+        Defaults to False, where every index restarts from zero.
+
+    Attributes
+    ----------
+    dims : tuple
+        Number of values of each index, with None for an indefinite continuous index
+    n : int or None
+        Total number of points, None if the plan is indefinite
+
+    Yields
+    ------
+    indicies, deltas
+    indicies : tuple(int)
+        Indicies of the nested loops, scan0 first
+    deltas : tuple(int)
+        Change of each index since the previous point, -1 if it returned to zero (or decremented, for
+        serpentine plans), 0 if it has not changed, 1 if it has incremented. All -1 for the first point.
+
+    Methods
+    -------
+    chunk(start, stop)
+    points(start=0)
+    position(indicies)
+    '''
+
+    def __init__(self, iterator_list, continuous=False, chunk_size=2**16, serpentine=False):
+        for iterable in iterator_list:
+            assert isinstance(iterable, range) and (iterable == range(len(iterable))), \
+                'iterator_list must contain range(n) iterators'
+        assert chunk_size > 0, 'chunk_size must be > 0'
+
+        dims = [len(iterable) for iterable in iterator_list]
+
+        # a fully continuous scan has range(1), otherwise it has range(n_max) and is a normal loop
+        self.continuous = continuous and (len(dims) > 0) and (iterator_list[-1] == range(1))
+        if self.continuous:
+            dims[-1] = None
+
+        self.dims = tuple(dims)
+        self.chunk_size = chunk_size
+        self.serpentine = serpentine
+
+        # number of points between increments of each index
+        self.strides = np.cumprod([1] + [n for n in dims[:-1]]).astype(np.int64)
+        self.lengths = np.array([0 if n is None else n for n in dims], dtype=np.int64)
+        self.length_list = [int(n) for n in self.lengths]
+
+        if self.continuous:
+            self.n = None
+        else:
+            self.n = int(np.prod(dims))
+
+    def chunk(self, start, stop):
+        '''
+        Returns the tables of indicies and deltas of points `start` to `stop`
+
+        Parameters
+        ----------
+        start : int
+            First point
+        stop : int
+            Point after the last point
+
+        Returns
+        -------
+        indicies : np.ndarray
+            Array of shape (stop - start, number of scans)
+        deltas : np.ndarray
+            Array of shape (stop - start, number of scans)
+        '''
+        points = np.arange(max(start - 1, 0), stop, dtype=np.int64)[:, np.newaxis]
+        table = points // self.strides
+        if self.continuous:
+            table[:, :-1] %= self.lengths[:-1]
+        else:
+            table %= self.lengths
+
+        if self.serpentine and (table.shape[1] > 1):
+            # an index runs backwards when the loop it belongs to has completed an odd number of passes
+            passes = points // (self.strides[:-1] * self.lengths[:-1])
+            table[:, :-1] = np.where(passes % 2 == 1, self.lengths[:-1] - 1 - table[:, :-1], table[:, :-1])
+
+        deltas = np.sign(np.diff(table, axis=0))
+        if start == 0:
+            deltas = np.concatenate([-np.ones((1, table.shape[1]), dtype=deltas.dtype), deltas])
+        else:
+            table = table[1:]
+
+        return table, deltas
+
+    def points(self, start=0):
+        '''
+        Yields the indicies and deltas of the points from point `start` on, see the class description.
+        The deltas of the first point are all -1 whatever `start` is, so that a plan resumed partway
+        through sets every scan at its first point.
+
+        Parameters
+        ----------
+        start : int
+            Number of the first point, defaults to 0
+        '''
+        if len(self.dims) == 0:
+            if start == 0:
+                yield (), ()
+            return
+
+        first = True
+        while (self.n is None) or (start < self.n):
+            stop = start + self.chunk_size if self.n is None else min(start + self.chunk_size, self.n)
+            indicies, deltas = self.chunk(start, stop)
+            if first:
+                deltas[0] = -1
+                first = False
+            # one conversion per chunk, the points are then plain tuples of ints
+            yield from zip(map(tuple, indicies.tolist()), map(tuple, deltas.tolist()))
+            start = stop
+
+    def position(self, indicies):
+        '''
+        Returns the number of the point with the given indicies, the inverse of `points()`
+
+        Parameters
+        ----------
+        indicies : tuple(int)
+            Indicies of the nested loops, scan0 first
+
+        Returns
+        -------
+        int
+        '''
+        if len(indicies) == 0:
+            return 0
+
+        # the outermost index counts the passes of the next index, and so on inwards
+        position = indicies[-1]
+        for k in range(len(indicies) - 2, -1, -1):
+            i = indicies[k]
+            if self.serpentine and (position % 2 == 1):
+                i = self.length_list[k] - 1 - i
+            position = position * self.length_list[k] + i
+        return int(position)
+
+    def __iter__(self):
+        return self.points()
+
+    def __len__(self):
+        assert self.n is not None, 'An indefinite continuous plan has no length'
+        return self.n
@@ -0,0 +1,132 @@
+import numpy as np
+
+
+class RingBuffer(object):
+    '''
+    Fixed size circular array that keeps the last `size` elements appended along one axis, with O(1)
+    cost per append. Every element is stored twice in a buffer of twice the size, so that the retained
+    elements are always available, in order, as the contiguous view `array`.
+
+    Only the newest element may be modified through `array`, it is copied to its mirror position
+    when the next element is added.
+
+    Parameters
+    ----------
+    array : array like object
+        Initial values
+    size : int
+        Number of elements to keep
+    axis : int
+        Axis along which elements are appended, defaults to 0
+    fill_value : float
+        Value of new elements, defaults to np.nan
+
+    Attributes
+    ----------
+    length : int
+        Total number of elements appended, including those no longer kept
+    buffer : np.ndarray
+        Storage of twice `size` along `axis`
+
+    Methods
+    -------
+    resize(length)
+    append(value)
+    '''
+
+    def __init__(self, array, size, axis=0, fill_value=np.nan):
+        assert isinstance(size, int) and size > 0, 'RingBuffer size must be an int > 0'
+
+        array = np.array(array, dtype=float)
+        if array.ndim == 0:
+            array = array.reshape((1,))
+
+        self.size = size
+        self.axis = axis
+        self.fill_value = fill_value
+        self.length = 0
+
+        shape = list(array.shape)
+        shape[axis] = 2 * size
+        self.buffer = np.full(shape, fill_value, dtype=float)
+
+        for i in range(array.shape[axis]):
+            self.append(array[self.index(i)])
+
+    @property
+    def offset(self):
+        '''
+        Returns the number of elements that are no longer kept, which is the absolute index of `array[0]`
+        '''
+        return max(0, self.length - self.size)
+
+    @property
+    def array(self):
+        '''
+        Returns a view of the kept elements, oldest first
+        '''
+        start = self.offset % self.size
+        return self.buffer[self.index(slice(start, start + min(self.length, self.size)))]
+
+    def index(self, i):
+        '''
+        Returns an index tuple selecting `i` along `axis`
+        '''
+        return (*(slice(None) for _ in range(self.axis)), i)
+
+    def newest(self):
+        '''
+        Returns the buffer positions of the newest element and of its mirror
+        '''
+        position = self.offset % self.size + min(self.length, self.size) - 1
+        if position < self.size:
+            return position, position + self.size
+        else:
+            return position, position - self.size
+
+    def advance(self):
+        '''
+        Adds one element filled with `fill_value`, dropping the oldest element if the buffer is full
+        '''
+        if self.length > 0:
+            position, mirror = self.newest()
+            self.buffer[self.index(mirror)] = self.buffer[self.index(position)]
+
+        self.length += 1
+
+        position, mirror = self.newest()
+        self.buffer[self.index(position)] = self.fill_value
+        self.buffer[self.index(mirror)] = self.fill_value
+
+    def resize(self, length):
+        '''
+        Advances the buffer until `length` elements have been added. Does nothing if `length` is not
+        larger than the current length.
+
+        Parameters
+        ----------
+        length : int
+            New total number of elements
+        '''
+        while self.length < length:
+            self.advance()
+
+    def append(self, value):
+        '''
+        Appends `value` along `axis`, dropping the oldest element if the buffer is full
+
+        Parameters
+        ----------
+        value : int, float, or array like object
+        '''
+        self.advance()
+        position, mirror = self.newest()
+        self.buffer[self.index(position)] = value
+
+    def __len__(self):
+        return min(self.length, self.size)
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.array
+        return self.array.astype(dtype)
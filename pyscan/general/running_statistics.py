@@ -0,0 +1,47 @@
+import numpy as np
+
+
+def welford_update(mean, std, sem, value, n):
+    '''
+    Adds the `n`-th sample to a running mean, sample standard deviation, and standard error of the mean,
+    updating them in place with Welford's algorithm. It is numerically stable and does not need the
+    earlier samples, so averaging costs the same memory whatever the number of repeats.
+
+    The sum of squared differences from the mean is recovered from `std` at each update, so no other
+    state is kept. `std` and `sem` are np.nan until a second sample has been added.
+
+    Parameters
+    ----------
+    mean : np.ndarray
+        Mean of the first `n - 1` samples, updated in place. Can be a 0-d view of a single element.
+    std : np.ndarray
+        Sample standard deviation of the first `n - 1` samples, same shape as `mean`, updated in place
+    sem : np.ndarray
+        Standard error of the mean, same shape as `mean`, overwritten
+    value : float or array like object
+        New sample
+    n : int
+        Number of samples including `value`
+    '''
+
+    if n == 1:
+        mean[...] = value
+        std[...] = np.nan
+        sem[...] = np.nan
+        return
+
+    # std becomes the sum of squared differences of the previous samples
+    if n == 2:
+        std[...] = 0
+    else:
+        np.square(std, out=std)
+        std *= n - 2
+
+    delta = np.subtract(value, mean)
+    mean += delta / n
+    delta *= np.subtract(value, mean)
+    std += delta
+
+    std /= n - 1
+    np.sqrt(std, out=std)
+    np.divide(std, np.sqrt(n), out=sem)
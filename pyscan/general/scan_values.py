@@ -0,0 +1,278 @@
+import numpy as np
+
+from bisect import bisect_right
+from .d_range import drange
+
+
+class ScanValues(object):
+    '''
+    Base class for scan values that are computed from a few parameters instead of being stored as an array.
+    Single values are computed in O(1) when they are indexed, so a scan can iterate over a huge sweep
+    without creating its array, and the values are only materialized with `np.asarray` (e.g. when the
+    experiment saves them). They are saved in the metadata as their parameters, see `parameters()`.
+
+    Inheriting classes implement `value(i)` and `parameters()`, and set `n`.
+
+    Attributes
+    ----------
+    n : int
+        Number of values
+
+    Methods
+    -------
+    value(i)
+    parameters()
+    materialize()
+    tolist()
+    '''
+
+    def value(self, i):
+        '''
+        Returns the value at the non-negative index `i`
+        '''
+        raise NotImplementedError
+
+    def parameters(self):
+        '''
+        Returns a dict of the constructor arguments
+        '''
+        raise NotImplementedError
+
+    def materialize(self):
+        '''
+        Returns all values as a np.ndarray
+        '''
+        return np.fromiter((self.value(i) for i in range(self.n)), dtype=float, count=self.n)
+
+    @property
+    def shape(self):
+        return (self.n,)
+
+    @property
+    def ndim(self):
+        return 1
+
+    @property
+    def size(self):
+        return self.n
+
+    @property
+    def dtype(self):
+        return np.dtype(float)
+
+    def tolist(self):
+        return self.materialize().tolist()
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self.value(i)
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            if i < 0:
+                i += self.n
+            if (i < 0) or (i >= self.n):
+                raise IndexError('index {} is out of range for {} values'.format(i, self.n))
+            return self.value(int(i))
+        elif isinstance(i, slice):
+            return np.array([self.value(j) for j in range(*i.indices(self.n))])
+        else:
+            return self.materialize()[i]
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.materialize()
+        return self.materialize().astype(dtype)
+
+    def __repr__(self):
+        parameters = ', '.join('{}={!r}'.format(key, value) for key, value in self.parameters().items())
+        return '{}({})'.format(type(self).__name__, parameters)
+
+
+class Linspace(ScanValues):
+    '''
+    `n` evenly spaced values from `start` to `stop`, inclusive, equal to `np.linspace(start, stop, n)`.
+
+    Parameters
+    ----------
+    start : float
+        First value
+    stop : float
+        Last value
+    n : int
+        Number of values
+    '''
+
+    def __init__(self, start, stop, n):
+        assert int(n) > 0, 'n must be > 0'
+        self.start = start
+        self.stop = stop
+        self.n = int(n)
+        self.step = (stop - start) / (self.n - 1) if self.n > 1 else 0
+
+    def value(self, i):
+        if i == self.n - 1:
+            return float(self.stop) if self.n > 1 else float(self.start)
+        return self.start + i * self.step
+
+    def parameters(self):
+        return {'start': self.start, 'stop': self.stop, 'n': self.n}
+
+    def materialize(self):
+        return np.linspace(self.start, self.stop, self.n)
+
+
+class DRange(ScanValues):
+    '''
+    Values from `start` in steps of `delta` to `stop`, inclusive, equal to `ps.drange(start, delta, stop)`.
+
+    Parameters
+    ----------
+    start : float or int
+        Start value
+    delta : float or int
+        Distance between values
+    stop : float or int
+        Last value
+    '''
+
+    def __init__(self, start, delta, stop):
+        self.start = start
+        self.delta = delta
+        self.stop = stop
+
+        delta = abs(delta)
+        self.linspace = None
+        if stop == start:
+            self.n = 1
+        elif np.abs(stop - start) < delta:
+            self.n = 2
+        elif not ((stop - start) / delta) % 1 > 0:
+            self.linspace = Linspace(start, stop, int(np.abs(stop - start) / (delta) + 1))
+            self.n = self.linspace.n
+        else:
+            self.sign = (stop - start) / np.abs(stop - start)
+            self.n = int(np.floor(np.abs(stop - start) / delta)) + 2
+
+    def value(self, i):
+        if self.linspace is not None:
+            return self.linspace.value(i)
+        elif i == 0:
+            return self.start
+        elif i == self.n - 1:
+            return self.stop
+        return self.start + self.sign * abs(self.delta) * i
+
+    def parameters(self):
+        return {'start': self.start, 'delta': self.delta, 'stop': self.stop}
+
+    def materialize(self):
+        return np.array(drange(self.start, self.delta, self.stop), dtype=float)
+
+
+class Logspace(ScanValues):
+    '''
+    `n` values from `start` to `stop`, inclusive, evenly spaced on a log scale, like `np.geomspace`.
+
+    Parameters
+    ----------
+    start : float
+        First value, non-zero
+    stop : float
+        Last value, non-zero with the same sign as `start`
+    n : int
+        Number of values
+    '''
+
+    def __init__(self, start, stop, n):
+        assert int(n) > 0, 'n must be > 0'
+        assert start * stop > 0, 'start and stop must be non-zero with the same sign'
+        self.start = start
+        self.stop = stop
+        self.n = int(n)
+        self.ratio = stop / start
+
+    def value(self, i):
+        if i == self.n - 1:
+            return float(self.stop) if self.n > 1 else float(self.start)
+        return self.start * self.ratio ** (i / (self.n - 1))
+
+    def parameters(self):
+        return {'start': self.start, 'stop': self.stop, 'n': self.n}
+
+
+class ValueList(ScanValues):
+    '''
+    Explicit list of values, used as a segment of `Piecewise` values.
+
+    Parameters
+    ----------
+    values : array like object
+        One dimensional values
+    '''
+
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=float)
+        assert self.values.ndim == 1, 'values must be one dimensional'
+        self.n = len(self.values)
+
+    def value(self, i):
+        return self.values[i]
+
+    def parameters(self):
+        return {'values': self.values}
+
+    def materialize(self):
+        return self.values.copy()
+
+
+class Piecewise(ScanValues):
+    '''
+    Values of several segments one after another, e.g.
+    `Piecewise(DRange(0, 0.1, 1), DRange(1.01, 0.01, 1.2), [1.5, 2])`.
+
+    Parameters
+    ----------
+    *segments : ScanValues or array like objects
+        Segments in order, arrays and lists are used as `ValueList` segments
+    '''
+
+    def __init__(self, *segments):
+        assert len(segments) > 0, 'Piecewise values need at least one segment'
+        self.segments = [s if isinstance(s, ScanValues) else ValueList(s) for s in segments]
+        self.offsets = list(np.cumsum([0] + [len(s) for s in self.segments[:-1]]).astype(int))
+        self.n = int(sum(len(s) for s in self.segments))
+
+    def value(self, i):
+        k = bisect_right(self.offsets, i) - 1
+        return self.segments[k].value(i - self.offsets[k])
+
+    def parameters(self):
+        return {'segments': self.segments}
+
+    def materialize(self):
+        return np.concatenate([s.materialize() for s in self.segments])
+
+
+SCAN_VALUES = {cls.__name__: cls for cls in [Linspace, DRange, Logspace, ValueList, Piecewise]}
+
+
+def scan_values_to_dict(values):
+    '''
+    Returns the dict used to save scan values in the metadata, {"_pyscan_scan_values": class name, **parameters}
+    '''
+    return {'_pyscan_scan_values': type(values).__name__, **values.parameters()}
+
+
+def scan_values_from_dict(data):
+    '''
+    Returns the scan values saved with `scan_values_to_dict`
+    '''
+    data = dict(data)
+    cls = SCAN_VALUES[data.pop('_pyscan_scan_values')]
+    if cls is Piecewise:
+        return Piecewise(*data['segments'])
+    return cls(**data)
@@ -1,10 +1,15 @@
 # Functions
-from .load_experiment import load_experiment
+from .load_experiment import (
+    load_experiment, load_experiments, load_grid, LiveExperiment, LazyArray, LazyExperiment, StitchedExperiment)
 from .get_pyscan_version import get_pyscan_version
 
 # Scans/Experiments
 from .experiment import Experiment
-from .scans import PropertyScan, RepeatScan, ContinuousScan, FunctionScan, AverageScan
+from .scans import (
+    PropertyScan, RepeatScan, ContinuousScan, FunctionScan, AverageScan, SweepScan, AdaptiveScan, PropertyScanError)
 
 # Other objects
 from .run_info import RunInfo
+from .hdf5_writer import HDF5Writer, AsyncHDF5Writer
+from .catalog import Catalog
+from .point_timing import PointTiming, load_timing, timing_report, format_timing_report
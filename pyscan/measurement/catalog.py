@@ -0,0 +1,364 @@
+import argparse
+import h5py
+import json
+import os
+import re
+import sqlite3
+
+from pathlib import Path
+from time import time
+from itemattribute import ItemAttribute
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS experiments (
+    file_name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    created REAL,
+    modified REAL,
+    complete TEXT,
+    n_parts INTEGER,
+    dims TEXT,
+    measured TEXT,
+    scans TEXT
+);
+CREATE TABLE IF NOT EXISTS scan_devices (
+    file_name TEXT NOT NULL,
+    scan INTEGER NOT NULL,
+    device TEXT,
+    prop TEXT
+);
+CREATE TABLE IF NOT EXISTS measured_keys (
+    file_name TEXT NOT NULL,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS experiments_created ON experiments (created);
+CREATE INDEX IF NOT EXISTS scan_devices_file_name ON scan_devices (file_name);
+CREATE INDEX IF NOT EXISTS scan_devices_device ON scan_devices (device);
+CREATE INDEX IF NOT EXISTS scan_devices_prop ON scan_devices (prop);
+CREATE INDEX IF NOT EXISTS measured_keys_file_name ON measured_keys (file_name);
+CREATE INDEX IF NOT EXISTS measured_keys_key ON measured_keys (key);
+'''
+
+
+def get_value(obj, key, default=None):
+    '''
+    Returns `obj[key]` for dicts, such as runinfo decoded from a file, or the attribute `key` otherwise
+    '''
+    if isinstance(obj, dict):
+        return obj.get(key, default)
+    else:
+        return getattr(obj, key, default)
+
+
+def describe_runinfo(runinfo):
+    '''
+    Returns the scans, dims and measured keys of a runinfo, which can be a `.RunInfo` or the runinfo
+    metadata of a file decoded as a dict
+
+    Parameters
+    ----------
+    runinfo : ps.RunInfo or dict
+
+    Returns
+    -------
+    scans : list of dict
+        'device_names' and 'prop' of each scan, in order
+    dims : list of int
+    measured : list of str
+    '''
+    scans = []
+    dims = []
+    i = 0
+    while get_value(runinfo, f'scan{i}') is not None:
+        scan = get_value(runinfo, f'scan{i}')
+        # a `.FunctionScan` has no devices, its function name is used instead
+        device_names = get_value(scan, 'device_names')
+        if device_names is None:
+            device_names = list(get_value(scan, 'scan_dict', {}).keys())
+        scans.append({'device_names': list(device_names), 'prop': get_value(scan, 'prop')})
+        dims.append(int(get_value(scan, 'n', 0)))
+        i += 1
+
+    measured = sorted(get_value(runinfo, 'measured', []) or [])
+
+    return scans, dims, measured
+
+
+class Catalog(object):
+    '''
+    SQLite index of the experiment files in a data directory, so that experiments can be found by time,
+    scanned devices and properties, measured keys, or completion state without opening every file.
+    Experiments add themselves when they save their metadata and update their entry when they end,
+    see `runinfo.catalog`. `rebuild()` indexes the hdf5 files already in the directory.
+
+    Parameters
+    ----------
+    data_path : str or Path
+        Directory containing the experiment files, defaults to './backup'
+    file_name : str
+        Name of the catalog file in `data_path`, defaults to 'catalog.sqlite'
+
+    Attributes
+    ----------
+    path : Path
+        Path to the catalog file
+
+    Methods
+    -------
+    connect()
+    record(file_name, path, runinfo, complete=None, n_parts=1, created=None, modified=None)
+    remove(file_name)
+    query(measured=None, device=None, prop=None, complete=None, after=None, before=None, limit=None)
+    last()
+    rebuild()
+    '''
+
+    def __init__(self, data_path='./backup', file_name='catalog.sqlite'):
+        self.path = Path(data_path) / file_name
+
+    def connect(self):
+        '''
+        Opens a connection to the catalog, creating the catalog file and tables if needed.
+        The connection commits when used as a context manager, and must be closed by the caller.
+
+        Returns
+        -------
+        sqlite3.Connection
+        '''
+        connection = sqlite3.connect(str(self.path), timeout=10)
+        connection.executescript(SCHEMA)
+        return connection
+
+    def record(self, file_name, path, runinfo, complete=None, n_parts=1, created=None, modified=None):
+        '''
+        Adds or updates the entry of an experiment. The created time of an existing entry is kept.
+
+        Parameters
+        ----------
+        file_name : str
+            Name of the experiment's file without extension, `runinfo.file_name`
+        path : str or Path
+            Path to the experiment's hdf5 file
+        runinfo : ps.RunInfo or dict
+            Runinfo of the experiment, or the runinfo metadata of the file decoded as a dict
+        complete : bool, str or None
+            Completion state, `runinfo.complete`
+        n_parts : int
+            Number of file parts, see `runinfo.rotate_size`, defaults to 1
+        created : float, optional
+            Creation time as a unix timestamp, defaults to now for new entries
+        modified : float, optional
+            Modification time as a unix timestamp, defaults to now
+        '''
+        scans, dims, measured = describe_runinfo(runinfo)
+
+        now = time()
+        created = now if created is None else created
+        modified = now if modified is None else modified
+        complete = None if complete is None else str(complete)
+
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute(
+                    'INSERT INTO experiments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT(file_name) DO UPDATE SET path=excluded.path, modified=excluded.modified, '
+                    'complete=excluded.complete, n_parts=excluded.n_parts, dims=excluded.dims, '
+                    'measured=excluded.measured, scans=excluded.scans',
+                    (file_name, str(path), created, modified, complete, n_parts,
+                     json.dumps(dims), json.dumps(measured), json.dumps(scans)))
+
+                connection.execute('DELETE FROM scan_devices WHERE file_name = ?', (file_name,))
+                connection.executemany(
+                    'INSERT INTO scan_devices VALUES (?, ?, ?, ?)',
+                    [(file_name, i, device, scan['prop'])
+                     for i, scan in enumerate(scans) for device in scan['device_names']])
+
+                connection.execute('DELETE FROM measured_keys WHERE file_name = ?', (file_name,))
+                connection.executemany(
+                    'INSERT INTO measured_keys VALUES (?, ?)', [(file_name, key) for key in measured])
+        finally:
+            connection.close()
+
+    def remove(self, file_name):
+        '''
+        Removes the entry of an experiment
+
+        Parameters
+        ----------
+        file_name : str
+            Name of the experiment's file without extension
+        '''
+        connection = self.connect()
+        try:
+            with connection:
+                for table in ['experiments', 'scan_devices', 'measured_keys']:
+                    connection.execute('DELETE FROM {} WHERE file_name = ?'.format(table), (file_name,))
+        finally:
+            connection.close()
+
+    def query(self, measured=None, device=None, prop=None, complete=None, after=None, before=None, limit=None):
+        '''
+        Returns the experiments matching all of the given conditions, newest first
+
+        Parameters
+        ----------
+        measured : str, optional
+            Key returned by the measure function
+        device : str, optional
+            Name of a scanned device, or of a `.FunctionScan` function
+        prop : str, optional
+            Property set by a `.PropertyScan`
+        complete : bool or str, optional
+            Completion state, e.g. True, 'stopped' or 'error'
+        after : float, optional
+            Earliest creation time as a unix timestamp
+        before : float, optional
+            Latest creation time as a unix timestamp
+        limit : int, optional
+            Maximum number of experiments to return
+
+        Returns
+        -------
+        list of ItemAttribute
+            Entries with file_name, path, created, modified, complete, n_parts, dims, measured and scans
+        '''
+        conditions = []
+        parameters = []
+
+        if measured is not None:
+            conditions.append(
+                'file_name IN (SELECT file_name FROM measured_keys WHERE key = ?)')
+            parameters.append(measured)
+        if (device is not None) or (prop is not None):
+            scan_conditions = []
+            if device is not None:
+                scan_conditions.append('device = ?')
+                parameters.append(device)
+            if prop is not None:
+                scan_conditions.append('prop = ?')
+                parameters.append(prop)
+            conditions.append(
+                'file_name IN (SELECT file_name FROM scan_devices WHERE {})'.format(' AND '.join(scan_conditions)))
+        if complete is not None:
+            conditions.append('complete = ?')
+            parameters.append(str(complete))
+        if after is not None:
+            conditions.append('created >= ?')
+            parameters.append(after)
+        if before is not None:
+            conditions.append('created <= ?')
+            parameters.append(before)
+
+        sql = 'SELECT * FROM experiments'
+        if len(conditions) > 0:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY created DESC, file_name DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            parameters.append(int(limit))
+
+        connection = self.connect()
+        try:
+            cursor = connection.execute(sql, parameters)
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        finally:
+            connection.close()
+
+        entries = []
+        for row in rows:
+            entry = ItemAttribute()
+            for column, value in zip(columns, row):
+                if column in ['dims', 'measured', 'scans']:
+                    value = json.loads(value)
+                entry[column] = value
+            entries.append(entry)
+
+        return entries
+
+    def last(self):
+        '''
+        Returns the newest experiment, or None if the catalog is empty
+
+        Returns
+        -------
+        ItemAttribute or None
+        '''
+        entries = self.query(limit=1)
+        if len(entries) == 0:
+            return None
+        return entries[0]
+
+    def rebuild(self):
+        '''
+        Replaces the catalog with the hdf5 files in its directory, using their runinfo metadata and their
+        file times. Completion state is not saved in the files, so it is kept from existing entries.
+
+        Returns
+        -------
+        int
+            Number of experiments in the catalog
+        '''
+        states = {}
+        if self.path.is_file():
+            for entry in self.query():
+                states[entry.file_name] = entry.complete
+
+        connection = self.connect()
+        try:
+            with connection:
+                for table in ['experiments', 'scan_devices', 'measured_keys']:
+                    connection.execute('DELETE FROM {}'.format(table))
+        finally:
+            connection.close()
+
+        part = re.compile(r'-part\d{3}$')
+        count = 0
+        for path in sorted(self.path.parent.glob('*.hdf5')):
+            if part.search(path.stem):
+                continue
+
+            try:
+                with h5py.File(str(path), 'r') as f:
+                    runinfo = json.loads(f.attrs['runinfo'])
+                    runinfo['measured'] = [
+                        key for key, value in f.items()
+                        if isinstance(value, h5py.Dataset) and (key not in scan_datasets(runinfo))]
+            except (OSError, KeyError, ValueError):
+                # not a pyscan file, or written by a version without runinfo metadata
+                continue
+
+            n_parts = 1 + len(list(self.path.parent.glob('{}-part[0-9][0-9][0-9].hdf5'.format(path.stem))))
+            self.record(
+                path.stem, path.absolute(), runinfo, complete=states.get(path.stem), n_parts=n_parts,
+                created=os.path.getctime(path), modified=os.path.getmtime(path))
+            count += 1
+
+        return count
+
+
+def scan_datasets(runinfo):
+    '''
+    Returns the names of the datasets saved for the scans of a runinfo decoded as a dict
+    '''
+    names = ['iteration']
+    i = 0
+    while f'scan{i}' in runinfo:
+        names += list(runinfo[f'scan{i}'].get('scan_dict', {}).keys())
+        i += 1
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuilds the catalog of a pyscan data directory')
+    parser.add_argument('data_path', nargs='?', default='./backup', help='data directory, defaults to ./backup')
+    args = parser.parse_args()
+
+    count = Catalog(args.data_path).rebuild()
+    print('Indexed {} experiments in {}'.format(count, Path(args.data_path) / 'catalog.sqlite'))
+
+
+if __name__ == '__main__':
+    main()
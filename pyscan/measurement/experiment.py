@@ -1,19 +1,33 @@
+import asyncio
 import h5py
 import json
+import sqlite3
+import warnings
 import numpy as np
 
-from time import sleep
+from time import monotonic, perf_counter
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
-from threading import Thread as thread
+from contextlib import contextmanager
+from threading import Thread as thread, Lock, Event
+from inspect import isawaitable
 from time import strftime
 
-from .scans import PropertyScan
+from .scans import PropertyScan, SweepScan, AdaptiveScan
+from .catalog import Catalog, describe_runinfo
+from .load_experiment import dataset_keys, find_measured_datasets
+from .pyscan_json_decoder import PyscanJSONDecoder
+from .point_timing import PointTiming, NoTiming, timing_report
+from .hdf5_writer import HDF5Writer, AsyncHDF5Writer, write_values, chunk_shape, grow_dataset
 from .pyscan_json_encoder import PyscanJSONEncoder
 from itemattribute import ItemAttribute
 
 from ..general.is_list_type import is_list_type
-from ..general.append_stack_or_contact import append_stack_or_contact
-from ..general.delta_product import delta_product
+from ..general.growable_array import GrowableArray
+from ..general.ring_buffer import RingBuffer
+from ..general.running_statistics import welford_update
+from ..general.iteration_plan import IterationPlan
+from ..general.interruptible_sleep import interruptible_sleep, bind_cancel_event, device_cancel_event
 
 
 class Experiment(ItemAttribute):
@@ -35,6 +49,18 @@ class Experiment(ItemAttribute):
         Contains all information about the experiment
     devices : ItemAttribute
         ItemAttribute instance containing all experiment devices
+    writer : ps.HDF5Writer or None
+        Holds the hdf5 file open while the experiment is running, `None` otherwise
+    part : int
+        Number of the file part currently written, see `rotate_file`
+    part_offset : int
+        Continuous scan iteration stored first in the current file part
+    plan : ps.IterationPlan or None
+        Order of the points of the current or last run
+    point_timing : ps.PointTiming or None
+        Durations of the phases of every point of the last run, if `runinfo.timing` was True
+    cancel_event : threading.Event
+        Set by `stop()` while the experiment runs, interrupts the waits of its scans and the ramps of its devices
 
     Methods
     -------
@@ -42,17 +68,45 @@ class Experiment(ItemAttribute):
     setup_data_dir(data_dir)
     check_runinfo()
     save_metadata(metadata_name)
+    update_catalog()
+
+    # File methods
+    open_writer()
+    close_writer()
+    open_file()
+    should_rotate(continuous_n)
+    rotate_file()
+    split_axis(name)
+    mark_part(f)
+    file_index(indicies)
 
     # Data methods
     preallocate(data)
+    dataset_options(dims, n_scan_dims)
     reallocate(data)
-    rolling_average(data)
-    save_point(data)
+    trim_continuous()
+    store_point(data, indicies, first=False, new_iteration=False)
+    average_keys(data)
+    fetch_point(fetch_function, handle, indicies, first=False, new_iteration=False, point=None)
+    point_index(indicies)
+    rolling_average(data, indicies=None)
+    save_point(data, indicies=None)
+    checkpoint(indicies)
+    buffer_point(indicies, progress=None)
+    write_pending()
+    write_region(indicies, values, progress=None)
+    save_timing()
+    timing_report(percentiles=(50, 90, 99))
+    save_grid()
 
     # Running experiment methods
+    run_async(awaitable)
+    close_event_loop()
     start_thread()
-    stop()
+    stop(interrupt=True)
     run()
+    run_points(start=0, resumed=False)
+    resume(path)
     '''
 
     def __init__(self, runinfo, devices, data_dir=None):
@@ -63,48 +117,287 @@ class Experiment(ItemAttribute):
 
         self.runinfo = runinfo
         self.devices = devices
+        self.writer = None
+        self.pending_lines = {}
+        self.continuous_buffers = {}
+        self.continuous_offset = 0
+        self.part = 0
+        self.part_offset = 0
+        self.part_start = None
+        self.event_loop = None
+        self.event_loop_thread = None
+        self.event_loop_lock = Lock()
+        self.point_timing = None
+        self.plan = None
+        self.pending_progress = None
+        self.cancel_event = Event()
         self.setup_data_dir(data_dir)
 
     def run(self):
 
         self.check_runinfo()
+        self.run_points()
 
-        self.save_metadata('runinfo')
-        self.save_metadata('devices')
+    def resume(self, path):
+        '''
+        Continues an interrupted experiment, e.g. one that crashed, from the point after the last point
+        saved to its hdf5 file, see `checkpoint`. The experiment must be created with the same scans,
+        measure function and devices as the interrupted one. The saved runinfo is reloaded from the file
+        to check that the scans match and to find the measured datasets, the data arrays are restored
+        from the file, and the new points are added to the same file. If scan0 is a `.SweepScan`, the
+        line of the last saved point is measured again from its start, since the line is swept at once.
 
-        sleep(self.runinfo.initial_pause)
+        Parameters
+        ----------
+        path : str or Path
+            Path to the hdf5 file of the interrupted experiment, with or without the '.hdf5' extension
+        '''
+        path = Path(path)
+        if path.suffix != '.hdf5':
+            path = path.with_name(path.name + '.hdf5')
+        assert path.is_file(), 'Cannot locate {}'.format(path)
 
-        self.runinfo.running = True
+        self.check_runinfo()
+        assert not self.runinfo.has_continuous_scan, 'Experiments with a ContinuousScan can not be resumed'
+        assert not any(isinstance(scan, AdaptiveScan) for scan in self.runinfo.scans), \
+            'Experiments with an AdaptiveScan can not be resumed'
+        self.runinfo.data_path = path.parent
+        self.runinfo.file_name = path.stem
+
+        with h5py.File(str(path), 'r') as f:
+            assert '_checkpoint' in f, '{} has no checkpoint to resume from'.format(path)
+
+            saved = json.loads(f.attrs['runinfo'], cls=PyscanJSONDecoder)
+            _, saved_dims, _ = describe_runinfo(saved)
+            assert tuple(saved_dims) == tuple(self.runinfo.dims), \
+                'The scans of {} have dims {}, not {}'.format(path, tuple(saved_dims), self.runinfo.dims)
+            assert getattr(saved, 'scan_order', 'raster') == self.runinfo.scan_order, \
+                'The points of {} were measured in {} order'.format(path, saved.scan_order)
+
+            position = int(f['_checkpoint/position'][()])
+
+            # the scan values are not read back, they are the same as the scans'
+            for s in self.runinfo.scans:
+                for key, values in s.scan_dict.items():
+                    self[key] = np.asarray(values)
+
+            keys = dataset_keys(f)
+            measured = find_measured_datasets(saved, keys)
+            self.runinfo.measured = [key for key in keys if key in measured]
+
+            n_scan_dims = self.runinfo.n_average_dim if self.runinfo.has_average_scan else self.runinfo.ndim
+            for key in self.runinfo.measured:
+                value = f[key][()].astype('float64')
+                # single values without scan dimensions are saved with shape (1,)
+                if (n_scan_dims == 0) and (value.shape == (1,)):
+                    value = value[0]
+                self[key] = value
+
+        self.pending_lines = {}
+        self.pending_progress = None
+        self.continuous_buffers = {}
+        self.continuous_offset = 0
+
+        start = position + 1
+        scan0 = self.runinfo.scans[0]
+        if isinstance(scan0, SweepScan):
+            start -= start % scan0.n
+
+        self.run_points(start, resumed=True)
+
+    def run_points(self, start=0, resumed=False):
+        '''
+        Runs the experiment's points from point `start` of its `.IterationPlan` on
+
+        Parameters
+        ----------
+        start : int
+            Number of the first point, defaults to 0
+        resumed : bool
+            True if the data arrays and the datasets of the hdf5 file were restored by `resume`, instead of
+            being created at the first point. Defaults to False.
+        '''
+
+        self.point_timing = None
+
+        # the file stays open until the loop ends, is stopped, or raises
+        self.open_writer()
+
+        executor = None
+        pending = None
+
+        try:
+            if not resumed:
+                self.save_metadata('runinfo')
+                self.save_metadata('devices')
+            else:
+                # the datasets were created by the interrupted run
+                self.writer.start_swmr()
+
+            self.runinfo.running = True
+            # the ramps of the experiment's devices are interrupted by its stop() until the run ends
+            for device in self.devices.values():
+                bind_cancel_event(device, self.cancel_event)
+
+            interruptible_sleep(self.runinfo.initial_pause, self.cancel_event)
 
-        for indicies, deltas in delta_product(self.runinfo.iterators, self.runinfo.has_continuous_scan):
-            for scan, i, d in zip(self.runinfo.scans[::-1], indicies[::-1], deltas[::-1]):
-                scan.iterate(self, i, d)
+            # everything that does not change between points is looked up once
+            plan = IterationPlan(
+                self.runinfo.iterators, self.runinfo.has_continuous_scan,
+                serpentine=(self.runinfo.scan_order == 'serpentine'))
+            self.plan = plan
+            scans = self.runinfo.scans[::-1]
+            scan_phases = ['iterate_scan{}'.format(k) for k in range(len(scans))][::-1]
+            measure_function = self.runinfo.measure_function
+            has_continuous_scan = self.runinfo.has_continuous_scan
+            pipeline = self.runinfo.pipeline
+            if pipeline:
+                # one worker, so that points are fetched and stored in order
+                executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pyscan-pipeline')
+                trigger_function = self.runinfo.trigger_function
+                fetch_function = self.runinfo.fetch_function
+                phases = ['pipeline_wait', 'trigger', 'fetch', 'save', 'writer_wait']
+            else:
+                phases = ['measure', 'save', 'writer_wait']
+            if self.runinfo.timing:
+                self.point_timing = PointTiming(scan_phases[::-1] + phases)
+                timing = self.point_timing
+            else:
+                timing = NoTiming()
+            first = not resumed
+
+            for indicies, deltas in plan.points(start):
+                point = timing.start_point()
+                new_iteration = has_continuous_scan and (deltas[-1] == 1) and not first
+
+                # storing the first point of an iteration reads the continuous scan's length,
+                # so the previous point must be stored before the scans move on
+                if (pending is not None) and new_iteration:
+                    pending.result()
+                    pending = None
+                    timing.lap('pipeline_wait')
+
+                for scan, phase, i, d in zip(scans, scan_phases, indicies[::-1], deltas[::-1]):
+                    # scans with async iterate methods are run by the experiment's event loop
+                    result = scan.iterate(self, i, d)
+                    if isawaitable(result):
+                        self.run_async(result)
+                    timing.lap(phase)
+
+                # stopped while the scans were waiting or ramping, so the point may not have been reached
+                if self.cancel_event.is_set():
+                    break
+
+                if pipeline:
+                    # the previous point was fetched and stored while the scans moved to this point
+                    if pending is not None:
+                        pending.result()
+                        timing.lap('pipeline_wait')
+                    handle = trigger_function(self)
+                    if isawaitable(handle):
+                        handle = self.run_async(handle)
+                    timing.lap('trigger')
+                    pending = executor.submit(
+                        self.fetch_point, fetch_function, handle, indicies, first, new_iteration, point)
+                else:
+                    data = measure_function(self)
+                    if isawaitable(data):
+                        data = self.run_async(data)
+                    timing.lap('measure')
+                    wait_time = self.writer.wait_time
+                    self.store_point(data, indicies, first, new_iteration)
+                    # the wait for the writer is only counted as writer_wait, not as part of save
+                    waited = self.writer.wait_time - wait_time
+                    timing.lap('save', exclude=waited)
+                    timing.record(point, 'writer_wait', waited)
 
-            data = self.runinfo.measure_function(self)
+                first = False
 
-            if np.all(np.array(indicies) == 0):
-                self.preallocate(data)
-            elif (self.runinfo.has_continuous_scan) and (deltas[-1] == 1):
-                self.reallocate(data)
                 # early terminate here
                 if not self.runinfo.running:
                     break
-                continue  # saving is handled here
-            elif self.runinfo.has_average_scan:
-                self.rolling_average(data)
 
-            self.save_point(data)
+            if pending is not None:
+                pending.result()
+                pending = None
 
-            # early terminate here
-            if not self.runinfo.running:
-                break
+            # write buffered lines, wait for queued points, and surface any writer errors
+            self.write_pending()
+            self.writer.drain()
+        except BaseException:
+            self.runinfo.running = False
+            self.runinfo.complete = 'error'
+            # a point still being stored by the pipeline must finish before the pending lines are written
+            if pending is not None:
+                wait([pending])
+            # keep the points that were measured before the error
+            self.write_pending()
+            self.update_catalog()
+            raise
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            self.close_event_loop()
+            # drivers ramp normally again once the experiment has stopped
+            for device in self.devices.values():
+                if device_cancel_event(device) is self.cancel_event:
+                    bind_cancel_event(device, None)
+            self.cancel_event.clear()
+            # keeps the indicies of the last point in runinfo._indicies
+            self.runinfo._indicies = list(self.runinfo.indicies)
+            self.trim_continuous()
+            self.close_writer()
+            self.save_timing()
+            self.save_grid()
 
         self.runinfo.complete = True
         self.runinfo.running = False
+        self.update_catalog()
 
         if 'end_function' in list(self.runinfo.keys()):
             self.runinfo.end_function(self)
 
+    def run_async(self, awaitable):
+        '''
+        Runs an awaitable, such as the coroutine returned by an `async def` measure function, in the
+        experiment's event loop and returns its result. The event loop runs in its own thread, and is
+        started by the first call and closed at the end of `run()`, so `asyncio` code in measure functions
+        and scans can overlap the I/O of several instruments, e.g. with `asyncio.gather` and
+        `InstrumentDriver.async_query`.
+
+        Parameters
+        ----------
+        awaitable :
+            Coroutine or other awaitable object
+
+        Returns
+        -------
+        Result of `awaitable`
+        '''
+        with self.event_loop_lock:
+            if self.event_loop is None:
+                self.event_loop = asyncio.new_event_loop()
+                self.event_loop_thread = thread(target=self.event_loop.run_forever, daemon=True)
+                self.event_loop_thread.start()
+
+        async def result():
+            return await awaitable
+
+        return asyncio.run_coroutine_threadsafe(result(), self.event_loop).result()
+
+    def close_event_loop(self):
+        '''
+        Stops and closes the experiment's event loop, if it was started by `run_async`
+        '''
+        with self.event_loop_lock:
+            if self.event_loop is None:
+                return
+            self.event_loop.call_soon_threadsafe(self.event_loop.stop)
+            self.event_loop_thread.join()
+            self.event_loop.close()
+            self.event_loop = None
+            self.event_loop_thread = None
+
     def setup_data_dir(self, data_dir):
         '''Creates save directory if it does not exist
 
@@ -148,10 +441,222 @@ class Experiment(ItemAttribute):
             save_path = self.runinfo.data_path / f'{base_name}-{count}.hdf5'
 
         self.runinfo.file_name = save_path.stem
+        self.part = 0
+        self.part_offset = 0
         self.runinfo.check()
 
         return 1
 
+    # File methods
+    @property
+    def save_name(self):
+        '''
+        Returns the absolute path of the experiment's hdf5 file as a string. After the file has been
+        rotated, this is still the first part, `<file_name>.hdf5`, which `load_experiment(save_name, stitch=True)`
+        reads together with the other parts. See `part_name` for the part being written.
+        '''
+        save_path = self.runinfo.data_path / '{}.hdf5'.format(self.runinfo.file_name)
+        return str(save_path.absolute())
+
+    @property
+    def part_name(self):
+        '''
+        Returns the absolute path of the file part being written as a string, `save_name` until the file is
+        rotated and `<file_name>-partNNN.hdf5` after
+        '''
+        if self.part == 0:
+            save_path = self.runinfo.data_path / '{}.hdf5'.format(self.runinfo.file_name)
+        else:
+            save_path = self.runinfo.data_path / '{}-part{:03d}.hdf5'.format(self.runinfo.file_name, self.part)
+        return str(save_path.absolute())
+
+    @property
+    def rotates(self):
+        '''
+        Returns True if the experiment's file is split into parts, which requires a `.ContinuousScan` and one
+        of `runinfo.rotate_size`, `runinfo.rotate_iterations` or `runinfo.rotate_interval`
+        '''
+        return self.runinfo.has_continuous_scan and any(
+            getattr(self.runinfo, key, None) is not None
+            for key in ['rotate_size', 'rotate_iterations', 'rotate_interval'])
+
+    def open_writer(self):
+        '''
+        Opens a `.HDF5Writer` that keeps the hdf5 file open until `close_writer` is called.
+        Flushing is controlled by `runinfo.flush_points` and `runinfo.flush_interval`. If
+        `runinfo.async_save` is True, an `.AsyncHDF5Writer` writes points from a background thread.
+        If `runinfo.swmr` is True, the file is switched to single-writer/multiple-reader mode once
+        `preallocate` has created all datasets.
+        '''
+        self.close_writer()
+        if self.runinfo.async_save:
+            self.writer = AsyncHDF5Writer(
+                self.part_name,
+                flush_points=self.runinfo.flush_points,
+                flush_interval=self.runinfo.flush_interval,
+                swmr=self.runinfo.swmr,
+                queue_size=self.runinfo.save_queue_size)
+        else:
+            self.writer = HDF5Writer(
+                self.part_name,
+                flush_points=self.runinfo.flush_points,
+                flush_interval=self.runinfo.flush_interval,
+                swmr=self.runinfo.swmr)
+        self.writer.open()
+        self.part_start = monotonic()
+
+    def close_writer(self):
+        '''
+        Flushes and closes the experiment's writer, if one is open
+        '''
+        if self.writer is not None:
+            self.writer.close()
+
+    @contextmanager
+    def open_file(self):
+        '''
+        Context manager that yields the experiment's hdf5 file. Uses the writer's open handle while
+        the experiment is running, otherwise the file is opened and closed for this access only.
+        '''
+        if (self.writer is not None) and self.writer.is_open:
+            with self.writer.lock:
+                yield self.writer.file
+        else:
+            with h5py.File(self.part_name, 'a') as f:
+                yield f
+
+    def should_rotate(self, continuous_n):
+        '''
+        Returns True if the current file part is full according to `runinfo.rotate_size`,
+        `runinfo.rotate_iterations` or `runinfo.rotate_interval`
+
+        Parameters
+        ----------
+        continuous_n : int
+            Number of continuous scan iterations, including the one that is starting
+        '''
+        if not self.rotates:
+            return False
+
+        if (self.runinfo.rotate_iterations is not None) and (
+                continuous_n - 1 - self.part_offset >= self.runinfo.rotate_iterations):
+            return True
+
+        if self.runinfo.rotate_size is not None:
+            with self.open_file() as f:
+                if f.id.get_filesize() >= self.runinfo.rotate_size:
+                    return True
+
+        if (self.runinfo.rotate_interval is not None) and (
+                monotonic() - self.part_start >= self.runinfo.rotate_interval):
+            return True
+
+        return False
+
+    def rotate_file(self):
+        '''
+        Closes the current file part and continues in `<file_name>-partNNN.hdf5`, starting with the continuous
+        scan iteration that is being measured. The new part has the same metadata, scan arrays and dataset
+        layout, and the continuous scan dimension of the previous part is trimmed to the iterations it holds.
+        '''
+        continuous_n = self.runinfo.scans[self.runinfo.continuous_index].n
+
+        # finish writing everything that belongs to the previous iterations
+        self.write_pending()
+        self.writer.drain()
+
+        layouts = {}
+        with self.open_file() as f:
+            for name, dataset in f.items():
+                if not isinstance(dataset, h5py.Dataset):
+                    # metadata arrays are saved again by save_metadata
+                    continue
+                split_axis = self.split_axis(name)
+                shape = list(dataset.shape)
+                if split_axis is not None:
+                    shape[split_axis] = continuous_n - 1 - self.part_offset
+                    dataset.resize(tuple(shape))
+                    shape[split_axis] = 1
+                    data = None
+                else:
+                    data = dataset[()]
+
+                layouts[name] = (data, {
+                    'shape': tuple(shape), 'maxshape': dataset.maxshape, 'chunks': dataset.chunks,
+                    'compression': dataset.compression, 'compression_opts': dataset.compression_opts,
+                    'shuffle': dataset.shuffle, 'fillvalue': dataset.fillvalue, 'dtype': dataset.dtype})
+
+        self.close_writer()
+        self.part += 1
+        self.part_offset = continuous_n - 1
+        self.open_writer()
+
+        self.save_metadata('runinfo')
+        self.save_metadata('devices')
+
+        with self.open_file() as f:
+            for name, (data, options) in layouts.items():
+                f.create_dataset(name, **options)
+                if data is not None:
+                    f[name][()] = data
+            self.mark_part(f)
+
+        self.writer.start_swmr()
+
+    def split_axis(self, name):
+        '''
+        Returns the axis along which a dataset is split between file parts, or None if every part holds
+        the whole dataset
+        '''
+        if name == 'iteration':
+            return 0
+        elif name in self.runinfo.measured:
+            return self.continuous_axis
+        else:
+            return None
+
+    def mark_part(self, f):
+        '''
+        Saves the part number and first continuous iteration of a file part as attributes of the file, and
+        the axis along which each dataset is split as attributes of the datasets. These are used by
+        `load_experiment(file_name, stitch=True)` to put the parts back together.
+
+        Parameters
+        ----------
+        f : h5py.File
+            File part to mark
+        '''
+        f.attrs['part'] = self.part
+        f.attrs['iteration_offset'] = self.part_offset
+        for name in ['iteration', *self.runinfo.measured]:
+            f[name].attrs['continuous_axis'] = self.split_axis(name)
+
+    def file_index(self, indicies):
+        '''
+        Converts indicies of the experiment to indicies of the current file part, which differ along the
+        continuous scan dimension once the file has been rotated.
+
+        Parameters
+        ----------
+        indicies : tuple
+            Indicies or slices of the experiment's data
+
+        Returns
+        -------
+        tuple
+        '''
+        if self.part_offset == 0:
+            return indicies
+
+        axis = self.continuous_axis
+        indicies = list(indicies)
+        i = indicies[axis]
+        if isinstance(i, slice):
+            indicies[axis] = slice(i.start - self.part_offset, i.stop - self.part_offset)
+        else:
+            indicies[axis] = i - self.part_offset
+        return tuple(indicies)
+
     # Data methods
     def preallocate(self, data):
         '''
@@ -164,21 +669,23 @@ class Experiment(ItemAttribute):
         '''
 
         # fill in what was measured
+        self.pending_lines = {}
+        self.pending_progress = None
+        self.continuous_buffers = {}
+        self.continuous_offset = 0
         self.runinfo.measured = []
         for key, value in data.items():
             self.runinfo.measured.append(key)
 
-        # get the file save path name
-        save_path = self.runinfo.data_path / '{}.hdf5'.format(self.runinfo.file_name)
-        save_name = str(save_path.absolute())
-
         # Create and save scan arrays
-        with h5py.File(save_name, 'a') as f:
+        with self.open_file() as f:
             for s in self.runinfo.scans:
                 for key, values in s.scan_dict.items():
+                    # `ScanValues` are only materialized here
+                    values = np.asarray(values)
                     self[key] = values
                     if key == 'iteration':
-                        f.create_dataset(key, shape=values.shape, maxshape=(None,), chunks=(100, ),)
+                        f.create_dataset(key, shape=values.shape, maxshape=(None,), chunks=(100, ), fillvalue=np.nan)
                     else:
                         f.create_dataset(key, shape=values.shape, maxshape=values.shape, chunks=values.shape,)
                     f[key][:] = values
@@ -192,28 +699,28 @@ class Experiment(ItemAttribute):
             ndim = self.runinfo.n_average_dim
 
         # Initialize the data arrays
-        with h5py.File(save_name, 'a') as f:
+        with self.open_file() as f:
             for name in self.runinfo.measured:
                 # array of data, at least one non average scan
                 if is_list_type(data[name]) and ndim > 0:
                     dims = (*scan_dims, * np.array(data[name]).shape)
                     self[name] = np.zeros(dims) * np.nan
                     maxshape = tuple(None for _ in dims)
-                    f.create_dataset(name, shape=dims, maxshape=maxshape, chunks=dims,
+                    f.create_dataset(name, shape=dims, maxshape=maxshape, **self.dataset_options(dims, ndim),
                                      fillvalue=np.nan, dtype='float64')
                 # single data point, at least on non average scan
                 elif (not is_list_type(data[name])) and (ndim > 0):
                     dims = scan_dims
                     self[name] = np.zeros(dims) * np.nan
                     maxshape = tuple(None for _ in dims)
-                    f.create_dataset(name, shape=dims, maxshape=maxshape, chunks=dims,
+                    f.create_dataset(name, shape=dims, maxshape=maxshape, **self.dataset_options(dims, ndim),
                                      fillvalue=np.nan, dtype='float64')
                 # data is an array, but there are no scan dimension other than average
                 elif is_list_type(data[name]) and (ndim == 0):
                     dims = np.array(data[name]).shape
                     self[name] = np.zeros(dims) * np.nan
                     maxshape = tuple(None for _ in dims)
-                    f.create_dataset(name, shape=dims, maxshape=maxshape, chunks=dims,
+                    f.create_dataset(name, shape=dims, maxshape=maxshape, **self.dataset_options(dims, 0),
                                      fillvalue=np.nan, dtype='float64')
                 # data is a single point, but there are no scan dimensions other than average
                 else:
@@ -221,107 +728,534 @@ class Experiment(ItemAttribute):
                     f.create_dataset(name, shape=[1, ], maxshape=(None,), chunks=(1,),
                                      fillvalue=np.nan, dtype='float64')
 
+            # the last point written, see `checkpoint`
+            if not self.runinfo.has_continuous_scan:
+                group = f.create_group('_checkpoint')
+                group.create_dataset('position', data=-1, dtype='int64')
+                group.create_dataset('indicies', data=np.full(self.runinfo.ndim, -1), dtype='int64')
+
+        if self.rotates:
+            with self.open_file() as f:
+                self.mark_part(f)
+
+        # all datasets exist, readers can now follow the file
+        if (self.writer is not None) and self.writer.is_open:
+            self.writer.start_swmr()
+
+    def dataset_options(self, dims, n_scan_dims):
+        '''
+        Returns the chunking and compression keyword arguments used to create a measured dataset,
+        based on `runinfo.chunks`, `runinfo.compression`, `runinfo.compression_opts` and `runinfo.shuffle`.
+
+        Parameters
+        ----------
+        dims : tuple
+            Shape of the dataset
+        n_scan_dims : int
+            Number of leading scan dimensions in `dims`
+
+        Returns
+        -------
+        dict
+        '''
+
+        if self.runinfo.has_continuous_scan and (n_scan_dims > 0):
+            grow_axis = n_scan_dims - 1
+        else:
+            grow_axis = None
+
+        options = {'chunks': chunk_shape(dims, n_scan_dims, self.runinfo.chunks, grow_axis=grow_axis)}
+
+        if self.runinfo.compression is not None:
+            options['compression'] = self.runinfo.compression
+            options['compression_opts'] = self.runinfo.compression_opts
+        if self.runinfo.shuffle:
+            options['shuffle'] = True
+
+        return options
+
     def reallocate(self, data):
         '''
         Reallocates memory for continuous experiments save files and measurement attribute arrays.
+        Grows the continuous scan dimension to the current number of iterations, doubling the
+        capacity of the arrays and datasets when they are full, so the cost per iteration is amortized O(1).
+        The unused capacity is removed by `trim_continuous` at the end of the run.
+
+        If the continuous scan has `n_retain` set, the measurement attribute arrays only hold the last
+        `n_retain` iterations, see `memory_index`.
 
         Parameters
         ----------
         data : ItemAttribute
             ItemAttribute instance containing data from self.runinfo.measure_function
         '''
-        save_path = self.runinfo.data_path / '{}.hdf5'.format(self.runinfo.file_name)
-        save_name = str(save_path.absolute())
+        continuous_scan = self.runinfo.scans[self.runinfo.continuous_index]
+        continuous_n = continuous_scan.n
+        axis = self.continuous_axis
+
+        self['iteration'] = continuous_scan.scan_dict['iteration']
 
-        with h5py.File(save_name, 'a') as f:
-            continuous_n = self.runinfo.scans[-1].n
-            f['iteration'].resize((continuous_n,))
-            self['iteration'] = self.runinfo.scans[-1].scan_dict['iteration']
-            f['iteration'][-1] = self.runinfo.scans[-1].scan_dict['iteration'][-1]
+        if continuous_scan.n_retain is not None:
+            # buffered lines must be written before their iterations are dropped from memory
+            self.write_pending()
+
+        if self.should_rotate(continuous_n):
+            self.rotate_file()
+
+        # number of iterations stored in the current file part
+        file_n = continuous_n - self.part_offset
+
+        with self.open_file() as f:
+            grow_dataset(f['iteration'], 0, file_n)
+            f['iteration'][file_n - 1] = continuous_scan.i
 
             for name in self.runinfo.measured:
-                if is_list_type(data[name]):
-                    f[name].resize(tuple((*self.runinfo.dims, *np.array(data[name]).shape)))
-                    f[name][-1] = data[name]
-                    self[name] = append_stack_or_contact(self[name], data[name])
-                else:
-                    f[name].resize(self.runinfo.dims)
-                    f[name][-1] = data[name]
-                    self[name] = append_stack_or_contact(self[name], data[name])
+                if name not in self.continuous_buffers:
+                    if continuous_scan.n_retain is None:
+                        self.continuous_buffers[name] = GrowableArray(self[name], axis=axis)
+                    else:
+                        self.continuous_buffers[name] = RingBuffer(self[name], continuous_scan.n_retain, axis=axis)
+                self.continuous_buffers[name].resize(continuous_n)
+                self[name] = self.continuous_buffers[name].array
+                self.continuous_offset = getattr(self.continuous_buffers[name], 'offset', 0)
 
-    def rolling_average(self, data):
+                grow_dataset(f[name], axis, file_n)
+
+    def memory_index(self, indicies):
         '''
-        Does a rolling average of newly measured data
+        Converts indicies of the saved datasets to indicies of the measurement attribute arrays, which differ
+        along the continuous scan dimension when only the last `n_retain` iterations are kept in memory.
+
+        Parameters
+        ----------
+        indicies : tuple
+            Indicies or slices of the saved datasets
+
+        Returns
+        -------
+        tuple
+        '''
+        if self.continuous_offset == 0:
+            return indicies
+
+        axis = self.continuous_axis
+        indicies = list(indicies)
+        i = indicies[axis]
+        if isinstance(i, slice):
+            indicies[axis] = slice(max(i.start - self.continuous_offset, 0), i.stop - self.continuous_offset)
+        else:
+            indicies[axis] = i - self.continuous_offset
+        return tuple(indicies)
+
+    @property
+    def continuous_axis(self):
+        '''
+        Returns the axis of the measured data arrays that corresponds to the continuous scan
+        '''
+        if self.runinfo.has_average_scan:
+            return self.runinfo.n_average_dim - 1
+        else:
+            return self.runinfo.ndim - 1
+
+    def trim_continuous(self):
+        '''
+        Removes the unused capacity left by `reallocate` from the continuous scan dimension of the
+        save file datasets and measurement attribute arrays.
+        '''
+        if (not self.runinfo.has_continuous_scan) or (len(self.continuous_buffers) == 0):
+            return
+
+        continuous_n = self.runinfo.scans[self.runinfo.continuous_index].n
+        file_n = continuous_n - self.part_offset
+
+        with self.open_file() as f:
+            for name in ['iteration', *self.runinfo.measured]:
+                dataset_axis = self.split_axis(name)
+                shape = list(f[name].shape)
+                if shape[dataset_axis] != file_n:
+                    shape[dataset_axis] = file_n
+                    f[name].resize(tuple(shape))
+
+        for name, buffer in self.continuous_buffers.items():
+            if isinstance(buffer, GrowableArray):
+                buffer.resize(min(buffer.length, continuous_n))
+            self[name] = buffer.array.copy()
+        self.continuous_buffers = {}
+        self.continuous_offset = 0
+
+    def store_point(self, data, indicies, first=False, new_iteration=False):
+        '''
+        Allocates the data arrays if needed, then averages and saves a measured point. With an average
+        scan, the arrays hold the running mean of each measured key, along with `<key>_std`, `<key>_sem`,
+        and the number of repeats averaged at each point, `average_count`, see `rolling_average`.
 
         Parameters
         ----------
         data :
             ItemAttribute instance of newly measured data point
+        indicies : tuple
+            Indicies of all scans at the point, as `runinfo.indicies`
+        first : bool
+            True for the first point of the experiment, which preallocates the data arrays
+        new_iteration : bool
+            True for the first point of a new continuous scan iteration, which extends the data arrays
+        '''
+        if first:
+            self.preallocate(self.average_keys(data) if self.runinfo.has_average_scan else data)
+        elif new_iteration:
+            self.reallocate(data)
+
+        if self.runinfo.has_average_scan:
+            # the averages are updated in the data arrays, which save_point then writes
+            self.rolling_average(data, indicies)
+            self.save_point(None, indicies)
+        else:
+            self.save_point(data, indicies)
+
+    def average_keys(self, data):
+        '''
+        Returns the measured data of a point with the keys saved when averaging: each key of `data`, followed
+        by `<key>_std` and `<key>_sem` of the same shape, and `average_count`. Used to preallocate the arrays.
+
+        Parameters
+        ----------
+        data : ItemAttribute
+            ItemAttribute instance containing data from self.runinfo.measure_function
         '''
+        keys = ItemAttribute()
         for key, value in data.items():
+            keys[key] = value
+            keys[key + '_std'] = value
+            keys[key + '_sem'] = value
+        keys.average_count = 0
+        return keys
 
-            # two cases: 1. self[key] is a list 2. self[key] is not a list
-            if is_list_type(self[key]):
-                if is_list_type(value):
-                    value = np.array(value).astype(float)
+    def fetch_point(self, fetch_function, handle, indicies, first=False, new_iteration=False, point=None):
+        '''
+        Fetches the data of a point measured with `runinfo.pipeline` and stores it with `store_point`.
+        Runs in the pipeline's worker thread while the scans move to the next point.
 
-                if self.runinfo.average_index == 0:
-                    self[key][self.runinfo.average_indicies] = value
-                else:
-                    self[key][self.runinfo.average_indicies] *= (
-                        self.runinfo.average_index / (self.runinfo.average_index + 1))
-                    self[key][self.runinfo.average_indicies] += (
-                        value / (self.runinfo.average_index + 1))
-            else:
-                if self.runinfo.average_index == 0:
-                    self[key] = value
+        Parameters
+        ----------
+        fetch_function : func
+            `runinfo.fetch_function`
+        handle :
+            Value returned by `runinfo.trigger_function` at the point
+        indicies, first, new_iteration :
+            See `store_point`
+        point : int, optional
+            Number of the point in `point_timing`, which records the fetch and save durations if given
+        '''
+        start = perf_counter()
+        data = fetch_function(self, handle)
+        if isawaitable(data):
+            data = self.run_async(data)
+        fetched = perf_counter()
+        wait_time = self.writer.wait_time
+        self.store_point(data, indicies, first, new_iteration)
 
-                else:
-                    self[key] *= (
-                        self.runinfo.average_index / (self.runinfo.average_index + 1))
-                    self[key] += (
-                        value / (self.runinfo.average_index + 1))
+        if (point is not None) and (self.point_timing is not None):
+            waited = self.writer.wait_time - wait_time
+            self.point_timing.record(point, 'fetch', fetched - start)
+            self.point_timing.record(point, 'save', perf_counter() - fetched - waited)
+            self.point_timing.record(point, 'writer_wait', waited)
 
-    def save_point(self, data):
+    def point_index(self, indicies):
         '''
-        Saves single point of data for current scan indicies. Does not return anything.
+        Returns the index of a point in the data arrays, which is `indicies` without the index of the
+        average scan, if any
+
+        Parameters
+        ----------
+        indicies : tuple
+            Indicies of all scans, as `runinfo.indicies`
         '''
+        if not self.runinfo.has_average_scan:
+            return tuple(indicies)
+        average_index = self.runinfo.average_index
+        return tuple(i for k, i in enumerate(indicies) if k != average_index)
 
-        save_path = self.runinfo.data_path / '{}.hdf5'.format(self.runinfo.file_name)
-        save_name = str(save_path.absolute())
+    def rolling_average(self, data, indicies=None):
+        '''
+        Adds newly measured data to the running mean, standard deviation (`<key>_std`) and standard
+        error of the mean (`<key>_sem`) of its point, updated in place with `welford_update`. The number
+        of repeats averaged so far at each point is kept in `average_count`, so the arrays hold the
+        statistics of the completed repeats if the experiment is stopped partway through an average.
 
-        if self.runinfo.has_average_scan:
-            indicies = self.runinfo.average_indicies
-        else:
+        Parameters
+        ----------
+        data :
+            ItemAttribute instance of newly measured data point
+        indicies : tuple, optional
+            Indicies of all scans at the point, defaults to the current `runinfo.indicies`
+        '''
+        if indicies is None:
             indicies = self.runinfo.indicies
+        memory_indicies = self.memory_index(self.point_index(indicies))
+
+        if is_list_type(self.average_count):
+            count = self.average_count[memory_indicies]
+            n = 1 if np.isnan(count) else int(count) + 1
+            self.average_count[memory_indicies] = n
+        else:
+            n = 1 if np.isnan(self.average_count) else int(self.average_count) + 1
+            self.average_count = n
 
         for key, value in data.items():
             if is_list_type(self[key]):
-                self[key][indicies] = value
+                # views of the point, including 0-d views of single values
+                point = (*memory_indicies, Ellipsis)
+                welford_update(self[key][point], self[key + '_std'][point], self[key + '_sem'][point],
+                               np.asarray(value, dtype=float), n)
             else:
-                self[key] = value
+                mean, std, sem = (np.array(self[name], dtype=float) for name in [key, key + '_std', key + '_sem'])
+                welford_update(mean, std, sem, value, n)
+                self[key], self[key + '_std'], self[key + '_sem'] = float(mean), float(std), float(sem)
 
-        with h5py.File(save_name, 'a') as f:
-            for key in self.runinfo.measured:
+    def save_point(self, data, indicies=None):
+        '''
+        Saves single point of data for the given, or current, scan indicies. Does not return anything.
+
+        If `runinfo.save_lines` is greater than 0, the point is kept in memory and written to the
+        hdf5 file together with the rest of its scan0 line(s) by `write_pending`.
+
+        Parameters
+        ----------
+        data :
+            ItemAttribute instance of newly measured data point, or None to save the point as it already is
+            in the data arrays, e.g. after `rolling_average`
+        indicies : tuple, optional
+            Indicies of all scans at the point, defaults to the current `runinfo.indicies`. Passed by
+            `store_point` so that a pipelined point is saved where it was measured.
+        '''
+
+        if indicies is None:
+            indicies = self.runinfo.indicies
+        progress = self.checkpoint(indicies)
+        indicies = self.point_index(indicies)
+
+        memory_indicies = self.memory_index(indicies)
+
+        if data is not None:
+            for key, value in data.items():
                 if is_list_type(self[key]):
-                    f[key][*indicies, ...] = self[key][*indicies, ...]
+                    self[key][memory_indicies] = value
                 else:
-                    f[key][:] = self[key]
+                    self[key] = value
+
+        if self.runinfo.save_lines and (len(indicies) > 0):
+            self.buffer_point(indicies, progress)
+            return
+
+        values = {}
+        for key in self.runinfo.measured:
+            if is_list_type(self[key]):
+                values[key] = self[key][*memory_indicies, ...]
+            else:
+                values[key] = self[key]
+
+        self.write_region(indicies, values, progress)
+
+    def checkpoint(self, indicies):
+        '''
+        Returns the checkpoint of a point, which is written to the '_checkpoint' group of the hdf5 file
+        once the point is saved, so that an interrupted experiment can be continued with `resume`.
+        Experiments with a `.ContinuousScan` are not checkpointed.
+
+        Parameters
+        ----------
+        indicies : tuple
+            Indicies of all scans at the point, as `runinfo.indicies`
+
+        Returns
+        -------
+        tuple or None
+            (position, indicies), where position is the number of the point in `plan`, or None if the
+            experiment is not checkpointed
+        '''
+        if (self.plan is None) or self.runinfo.has_continuous_scan:
+            return None
+        return (self.plan.position(indicies), tuple(indicies))
+
+    def buffer_point(self, indicies, progress=None):
+        '''
+        Registers a point saved in memory but not yet written to the hdf5 file. Pending points are
+        written by `write_pending` once `runinfo.save_lines` scan0 lines are complete, or when the
+        scan moves to a new outer index.
+
+        Parameters
+        ----------
+        indicies : tuple
+            Indicies of the saved point in the experiment's data arrays
+        progress : tuple, optional
+            Checkpoint of the point, written with the pending points, see `checkpoint`
+        '''
+
+        i0 = indicies[0]
+        outer = tuple(indicies[1:])
+
+        if (outer not in self.pending_lines) and (len(self.pending_lines) > 0):
+            last_outer = list(self.pending_lines.keys())[-1]
+            if (len(self.pending_lines) >= self.runinfo.save_lines) or (outer[1:] != last_outer[1:]):
+                self.write_pending()
+
+        low, high = self.pending_lines.get(outer, (i0, i0))
+        low, high = min(low, i0), max(high, i0)
+        self.pending_lines[outer] = (low, high)
+        self.pending_progress = progress
+
+        line_length = self[self.runinfo.measured[0]].shape[0]
+        if (len(self.pending_lines) >= self.runinfo.save_lines) and (high - low + 1 == line_length):
+            self.write_pending()
+
+    def write_pending(self):
+        '''
+        Writes points buffered by `buffer_point` to the hdf5 file, using one slice write per measured key
+        that covers all of the pending lines.
+        '''
+
+        if len(self.pending_lines) == 0:
+            return
+
+        outers = list(self.pending_lines.keys())
+        ranges = list(self.pending_lines.values())
+
+        region = [slice(min(r[0] for r in ranges), max(r[1] for r in ranges) + 1)]
+        for axis in range(len(outers[0])):
+            region.append(slice(min(o[axis] for o in outers), max(o[axis] for o in outers) + 1))
+        region = tuple(region)
+
+        memory_region = self.memory_index(region)
+        values = {key: self[key][(*memory_region, Ellipsis)] for key in self.runinfo.measured}
+
+        progress = self.pending_progress
+        self.pending_lines = {}
+        self.pending_progress = None
+        self.write_region(region, values, progress)
+
+    def write_region(self, indicies, values, progress=None):
+        '''
+        Writes values to the hdf5 file through the experiment's writer, or by opening the file
+        if no writer is open.
+
+        Parameters
+        ----------
+        indicies : tuple
+            Indicies or slices of the region to write
+        values : dict
+            key:value pairs of dataset names and the data to write
+        progress : tuple, optional
+            Checkpoint of the last point in the region, see `checkpoint`
+        '''
+
+        indicies = self.file_index(indicies)
+
+        if (self.writer is not None) and self.writer.is_open:
+            self.writer.write_point(indicies, values, progress)
+        else:
+            with self.open_file() as f:
+                write_values(f, indicies, values)
+                if (progress is not None) and ('_checkpoint' in f):
+                    f['_checkpoint/indicies'][...] = progress[1]
+                    f['_checkpoint/position'][()] = progress[0]
+
+    def save_timing(self):
+        '''
+        Saves `point_timing` to the '_timing' group of the experiment's first hdf5 file. Datasets can not be
+        created in a file in single-writer/multiple-reader mode, so this is called once the writer is closed.
+        '''
+        if self.point_timing is None:
+            return
+        self.point_timing.finish()
+
+        save_path = self.runinfo.data_path / '{}.hdf5'.format(self.runinfo.file_name)
+        try:
+            with h5py.File(str(save_path.absolute()), 'a') as f:
+                self.point_timing.save(f)
+        except OSError as e:
+            # e.g. the file is still open in a reader, the timings stay available in point_timing
+            warnings.warn('Could not save the point timing to {}: {}'.format(save_path, e))
+
+    def save_grid(self):
+        '''
+        Saves the samples of an `.AdaptiveScan` interpolated on a regular grid, see `AdaptiveScan.grid`, to the
+        '_grid' group of the hdf5 file. Like `save_timing`, this is called once the writer is closed.
+        '''
+        scans = self.runinfo.scans
+        if (len(scans) != 1) or (not isinstance(scans[0], AdaptiveScan)) or (len(self.runinfo.measured) == 0):
+            return
+
+        try:
+            grid = scans[0].grid(self)
+            with h5py.File(self.save_name, 'a') as f:
+                if '_grid' in f:
+                    del f['_grid']
+                group = f.create_group('_grid')
+                for key, value in grid.items():
+                    group.create_dataset(key, data=value)
+        except Exception as e:
+            # called while the run ends, so an error here must not replace the run's own error
+            warnings.warn('Could not save the grid to {}: {}'.format(self.save_name, e))
+
+    def timing_report(self, percentiles=(50, 90, 99)):
+        '''
+        Summarizes the phase durations of the last run, which must have been run with `runinfo.timing = True`.
+        See `pyscan.measurement.point_timing.timing_report`.
+
+        Parameters
+        ----------
+        percentiles : tuple of float
+            Percentiles of the durations to report, defaults to (50, 90, 99)
+
+        Returns
+        -------
+        ItemAttribute
+        '''
+        assert self.point_timing is not None, 'Run the experiment with runinfo.timing = True to time its points'
+        return timing_report(self.point_timing, percentiles)
 
     def save_metadata(self, metadata_name):
         '''
-        Formats and saves metadata to the hdf5 file
+        Formats and saves metadata to the hdf5 file. Arrays with at least `runinfo.metadata_array_size`
+        elements are saved as datasets in the file's '_metadata' group and referenced from the JSON.
 
         Parameters
         ----------
         metadata_name : str
             Name of the metadata to be saved, ex. "runinfo", "devices"
         '''
-        save_path = self.runinfo.data_path / '{}.hdf5'.format(self.runinfo.file_name)
-        save_name = str(save_path.absolute())
+        with self.open_file() as f:
+            # large arrays, such as fine scan values, are stored as datasets referenced from the JSON
+            if ('_metadata' in f) and (metadata_name in f['_metadata']):
+                del f['_metadata'][metadata_name]
+            group = f.require_group('_metadata').create_group(metadata_name)
+
+            def store(array):
+                dataset = group.create_dataset(str(len(group)), data=array)
+                return dataset.name
 
-        with h5py.File(save_name, 'a') as f:
-            f.attrs[metadata_name] = json.dumps(self[metadata_name], cls=PyscanJSONEncoder)
+            f.attrs[metadata_name] = json.dumps(
+                self[metadata_name], cls=PyscanJSONEncoder,
+                array_store=store, array_size=getattr(self.runinfo, 'metadata_array_size', 1000))
+
+        if metadata_name == 'runinfo':
+            self.update_catalog()
+
+    def update_catalog(self):
+        '''
+        Adds or updates the experiment's entry in the `.Catalog` of `runinfo.data_path` if `runinfo.catalog`
+        is True. A catalog that cannot be written only raises a warning, so it never stops an experiment.
+        '''
+        if not getattr(self.runinfo, 'catalog', False):
+            return
+
+        path = self.runinfo.data_path / '{}.hdf5'.format(self.runinfo.file_name)
+        try:
+            Catalog(self.runinfo.data_path).record(
+                self.runinfo.file_name, path.absolute(), self.runinfo,
+                complete=getattr(self.runinfo, 'complete', False), n_parts=self.part + 1)
+        except sqlite3.Error as e:
+            warnings.warn('Could not update the catalog of {}: {}'.format(self.runinfo.data_path, e))
 
     def start_thread(self):
         '''
@@ -332,12 +1266,22 @@ class Experiment(ItemAttribute):
         self.expt_thread.start()
         self.runinfo.running = True
 
-    def stop(self):
+    def stop(self, interrupt=True):
         '''
-        Stops the experiment after the next data point is take ensuring that the data
-        is saved properly. Sets the associated runinfo.complete setting to 'stopped' and runinfo.running to `False`.
+        Stops the experiment. Sets the associated runinfo.complete setting to 'stopped' and runinfo.running to `False`.
+        The run loop then flushes and closes the experiment's hdf5 file.
+
+        Parameters
+        ----------
+        interrupt : bool
+            If True (default) and the experiment is running, sets `cancel_event`, which interrupts the waits
+            of its scans and the ramps of its devices, and the point being set is not measured, so the experiment
+            stops within milliseconds with its last complete point saved. A point whose measure function has
+            returned is still saved. If False, the current point is finished and saved first.
         '''
 
+        if interrupt and getattr(self.runinfo, 'running', False):
+            self.cancel_event.set()
         self.runinfo.running = False
         self.runinfo.complete = 'stopped'
 
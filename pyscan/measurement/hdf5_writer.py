@@ -0,0 +1,470 @@
+import h5py
+import numpy as np
+
+from pathlib import Path
+from queue import Queue, Empty
+from threading import RLock, Thread
+from time import monotonic, perf_counter
+
+
+def chunk_shape(shape, n_scan_dims, chunks='auto', itemsize=8, grow_axis=None, target_bytes=2**20):
+    '''
+    Returns the hdf5 chunk shape for a dataset of scan data
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the dataset, scan dimensions followed by the shape of a single measured point
+    n_scan_dims : int
+        Number of leading scan dimensions in `shape`
+    chunks : str, tuple, or None
+        Chunking policy, defaults to 'auto'
+            - 'auto': chunks span whole scan0 lines, and are extended along the next scan dimensions
+              (or cut down along scan0) until they are about `target_bytes` in size
+            - 'point': one chunk per measured point
+            - tuple: explicit chunk shape, either for all dimensions or only for the scan dimensions, in
+              which case the point dimensions are not chunked
+            - None: a single chunk containing the whole dataset
+    itemsize : int
+        Size of one element in bytes, defaults to 8
+    grow_axis : int or None
+        Scan dimension that is resized while running (e.g. a `.ContinuousScan`), treated as unbounded
+    target_bytes : int
+        Approximate chunk size in bytes used by 'auto', defaults to 1 MiB
+
+    Returns
+    -------
+    tuple
+    '''
+
+    shape = tuple(int(n) for n in shape)
+    scan_shape = shape[:n_scan_dims]
+    point_shape = shape[n_scan_dims:]
+
+    if chunks is None:
+        return tuple(max(n, 1) for n in shape)
+
+    elif isinstance(chunks, str) and (chunks == 'point'):
+        return (*(1 for _ in scan_shape), *point_shape) if len(point_shape) > 0 else tuple(1 for _ in shape)
+
+    elif isinstance(chunks, str) and (chunks == 'auto'):
+        point_bytes = int(np.prod(point_shape)) * itemsize
+
+        # a single point larger than the target is split along its first dimension
+        if (point_bytes > target_bytes) or (n_scan_dims == 0):
+            points = list(point_shape)
+            if (len(points) > 0) and (point_bytes > target_bytes):
+                row_bytes = point_bytes // points[0]
+                points[0] = max(1, min(points[0], target_bytes // max(row_bytes, 1)))
+            return (*(1 for _ in scan_shape), *points)
+
+        n_points = max(1, target_bytes // max(point_bytes, 1))
+        scan_chunks = []
+        for axis, n in enumerate(scan_shape):
+            # resizable dimensions are chunked in blocks of up to 1024 iterations
+            extent = min(n_points, 1024) if axis == grow_axis else n
+            chunk = max(1, min(extent, n_points))
+            scan_chunks.append(chunk)
+            n_points = n_points // chunk
+        return (*scan_chunks, *point_shape)
+
+    else:
+        chunks = tuple(int(n) for n in chunks)
+        if len(chunks) == n_scan_dims:
+            chunks = (*chunks, *point_shape)
+        assert len(chunks) == len(shape), \
+            'chunks {} must have one value per scan dimension or one value per dataset dimension'.format(chunks)
+        assert all(n > 0 for n in chunks), 'chunks {} must be positive'.format(chunks)
+        return tuple(
+            c if axis == grow_axis else min(c, max(n, 1))
+            for axis, (c, n) in enumerate(zip(chunks, shape)))
+
+
+def grow_dataset(dataset, axis, length):
+    '''
+    Resizes a dataset so that it holds at least `length` elements along `axis`, doubling its size as
+    many times as needed so that repeated growth is amortized O(1) per element.
+
+    Parameters
+    ----------
+    dataset : h5py.Dataset
+        Chunked dataset that is resizable along `axis`
+    axis : int
+        Axis to grow
+    length : int
+        Minimum length along `axis`
+    '''
+    if dataset.shape[axis] < length:
+        capacity = max(dataset.shape[axis], 1)
+        while capacity < length:
+            capacity *= 2
+
+        shape = list(dataset.shape)
+        shape[axis] = capacity
+        dataset.resize(tuple(shape))
+
+
+def write_values(f, indicies, values):
+    '''
+    Writes a single point of data to the open hdf5 file `f`
+
+    Parameters
+    ----------
+    f : h5py.File or DatasetCache
+        Open hdf5 file containing preallocated datasets
+    indicies : tuple
+        Scan indicies of the point, each value is written to ``f[key][(*indicies, ...)]``
+    values : dict
+        key:value pairs of dataset names and the data to write
+    '''
+    for key, value in values.items():
+        f[key][(*indicies, Ellipsis)] = value
+
+
+class DatasetCache(dict):
+    '''
+    Dictionary of open h5py.Dataset objects of a file, datasets are opened on first access. Keeping
+    datasets open preserves their chunk cache between writes, so compressed chunks are not
+    recompressed on every point.
+
+    Parameters
+    ----------
+    f : h5py.File
+        The open file
+    '''
+
+    def __init__(self, f):
+        super().__init__()
+        self.file = f
+
+    def __missing__(self, key):
+        dataset = self.file[key]
+        self[key] = dataset
+        return dataset
+
+
+class HDF5Writer(object):
+    '''
+    Holds a single h5py.File handle open for the duration of an experiment run so that data points
+    can be saved without reopening the file for every point.
+
+    Parameters
+    ----------
+    file_name : str or pathlib.Path
+        Path to the hdf5 file
+    flush_points : int, optional
+        Number of saved points between flushes to disk, defaults to 100. `None` disables point
+        based flushing.
+    flush_interval : float, optional
+        Time in seconds between flushes to disk, defaults to 1. `None` disables time based flushing.
+    swmr : bool, optional
+        If True, the file is created with the latest hdf5 file format so that `start_swmr` can switch it
+        to single-writer/multiple-reader mode, defaults to False.
+
+    Attributes
+    ----------
+    file : h5py.File or None
+        The open file, `None` when the writer is closed
+    datasets : DatasetCache or None
+        Datasets of the open file that have been written to
+    n_unflushed : int
+        Number of points saved since the last flush
+    progress : tuple or None
+        Checkpoint of the last point written, (position, indicies), which `flush` writes to the
+        '_checkpoint' group of the file if it has one, see `Experiment.resume`
+    wait_time : float
+        Total seconds that `write_point` has waited for the writer, e.g. for the lock held by a reader of the
+        open file, or for space in the queue of an `.AsyncHDF5Writer`
+
+    Methods
+    -------
+    open(mode)
+    start_swmr()
+    write_point(indicies, values, progress=None)
+    point_saved()
+    drain()
+    write_progress()
+    flush()
+    close()
+    '''
+
+    def __init__(self, file_name, flush_points=100, flush_interval=1.0, swmr=False):
+        '''
+        Constructor method
+        '''
+        self.file_name = str(Path(file_name).absolute())
+        self.flush_points = flush_points
+        self.flush_interval = flush_interval
+        self.swmr = swmr
+
+        self.file = None
+        self.datasets = None
+        self.n_unflushed = 0
+        self.last_flush = monotonic()
+        self.wait_time = 0
+        self.progress = None
+        self.lock = RLock()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def is_open(self):
+        '''
+        Returns True if the file handle is open
+        '''
+        return self.file is not None
+
+    def open(self, mode='a'):
+        '''
+        Opens the file if it is not already open
+
+        Parameters
+        ----------
+        mode : str
+            h5py file mode, defaults to 'a'
+
+        Returns
+        -------
+        h5py.File
+        '''
+        with self.lock:
+            if self.file is None:
+                # a large chunk cache keeps partially written chunks in memory between flushes
+                if self.swmr:
+                    self.file = h5py.File(self.file_name, mode, libver='latest', rdcc_nbytes=64 * 2**20)
+                else:
+                    self.file = h5py.File(self.file_name, mode, rdcc_nbytes=64 * 2**20)
+                self.datasets = DatasetCache(self.file)
+                self.n_unflushed = 0
+                self.last_flush = monotonic()
+                self.progress = None
+            return self.file
+
+    def start_swmr(self):
+        '''
+        Switches the open file to single-writer/multiple-reader mode if the writer was created with
+        `swmr=True`. Datasets and attributes can not be created after this is called.
+        '''
+        with self.lock:
+            if self.swmr and (self.file is not None) and (not self.file.swmr_mode):
+                self.file.flush()
+                self.file.swmr_mode = True
+
+    def write_point(self, indicies, values, progress=None):
+        '''
+        Writes a single point of data and registers it with `point_saved`
+
+        Parameters
+        ----------
+        indicies : tuple
+            Scan indicies of the point
+        values : dict
+            key:value pairs of dataset names and the data to write
+        progress : tuple, optional
+            Checkpoint of the point, (position, indicies), kept in `progress` once the point is written
+        '''
+        start = perf_counter()
+        with self.lock:
+            self.wait_time += perf_counter() - start
+            write_values(self.datasets, indicies, values)
+            if progress is not None:
+                self.progress = progress
+            self.point_saved()
+
+    def drain(self):
+        '''
+        Waits until all submitted points are written. Points are written immediately, so this does nothing.
+        '''
+        pass
+
+    def point_saved(self):
+        '''
+        Registers that a point was saved and flushes the file if `flush_points` points
+        have been saved or `flush_interval` seconds have passed since the last flush.
+        '''
+        with self.lock:
+            if self.file is None:
+                return
+
+            self.n_unflushed += 1
+
+            if (self.flush_points is not None) and (self.n_unflushed >= self.flush_points):
+                self.flush()
+            elif (self.flush_interval is not None) and (monotonic() - self.last_flush >= self.flush_interval):
+                self.flush()
+
+    def write_progress(self):
+        '''
+        Writes `progress` to the '_checkpoint' group of the file, if both exist. Called before the file is
+        flushed, so the checkpoint on disk never runs ahead of the data.
+        '''
+        with self.lock:
+            if (self.progress is not None) and (self.file is not None) and ('_checkpoint' in self.file):
+                position, indicies = self.progress
+                self.datasets['_checkpoint/indicies'][...] = indicies
+                self.datasets['_checkpoint/position'][()] = position
+
+    def flush(self):
+        '''
+        Writes the checkpoint, then flushes buffered data to disk
+        '''
+        with self.lock:
+            if self.file is not None:
+                self.write_progress()
+                self.file.flush()
+            self.n_unflushed = 0
+            self.last_flush = monotonic()
+
+    def close(self):
+        '''
+        Flushes and closes the file. Safe to call more than once.
+        '''
+        with self.lock:
+            if self.file is not None:
+                try:
+                    self.write_progress()
+                    self.file.flush()
+                finally:
+                    self.datasets = None
+                    self.file.close()
+                    self.file = None
+            self.n_unflushed = 0
+
+
+class AsyncHDF5Writer(HDF5Writer):
+    '''
+    `.HDF5Writer` that writes points from a background thread so that the experiment loop does not
+    block on disk access. Points are pushed onto a bounded queue; when the queue is full `write_point`
+    blocks until the writer thread catches up. Errors raised in the writer thread are re-raised in the
+    experiment thread on the next call to `write_point` or `drain`.
+
+    Parameters
+    ----------
+    file_name : str or pathlib.Path
+        Path to the hdf5 file
+    flush_points : int, optional
+        Number of saved points between flushes to disk, defaults to 100.
+    flush_interval : float, optional
+        Time in seconds between flushes to disk, defaults to 1.
+    swmr : bool, optional
+        If True, the file can be switched to single-writer/multiple-reader mode, defaults to False.
+    queue_size : int, optional
+        Maximum number of points waiting to be written, defaults to 1000.
+    batch_size : int, optional
+        Maximum number of queued points written in one pass of the writer thread, defaults to 100.
+    '''
+
+    def __init__(self, file_name, flush_points=100, flush_interval=1.0, swmr=False, queue_size=1000, batch_size=100):
+        '''
+        Constructor method
+        '''
+        super().__init__(file_name, flush_points=flush_points, flush_interval=flush_interval, swmr=swmr)
+
+        self.batch_size = batch_size
+        self.queue = Queue(maxsize=queue_size)
+        self.error = None
+        self.thread = None
+
+    def open(self, mode='a'):
+        '''
+        Opens the file and starts the writer thread
+
+        Parameters
+        ----------
+        mode : str
+            h5py file mode, defaults to 'a'
+
+        Returns
+        -------
+        h5py.File
+        '''
+        f = super().open(mode)
+        if (self.thread is None) or (not self.thread.is_alive()):
+            self.error = None
+            self.thread = Thread(target=self.write_loop, daemon=True)
+            self.thread.start()
+        return f
+
+    def write_point(self, indicies, values, progress=None):
+        '''
+        Queues a single point of data to be written by the writer thread. Values are copied so that
+        later changes to the experiment's arrays do not affect queued points.
+
+        Parameters
+        ----------
+        indicies : tuple
+            Scan indicies of the point
+        values : dict
+            key:value pairs of dataset names and the data to write
+        progress : tuple, optional
+            Checkpoint of the point, (position, indicies), kept in `progress` once the point is written
+        '''
+        self.raise_error()
+        values = {key: np.array(value, copy=True) for key, value in values.items()}
+        start = perf_counter()
+        self.queue.put((tuple(indicies), values, progress))
+        self.wait_time += perf_counter() - start
+
+    def write_loop(self):
+        '''
+        Target of the writer thread, writes queued points in batches until `None` is received
+        '''
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Empty:
+                    break
+
+            stop = any(record is None for record in batch)
+            try:
+                with self.lock:
+                    for record in batch:
+                        if (record is not None) and (self.error is None):
+                            indicies, values, progress = record
+                            write_values(self.datasets, indicies, values)
+                            if progress is not None:
+                                self.progress = progress
+                            self.point_saved()
+            except Exception as e:
+                self.error = e
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+            if stop:
+                break
+
+    def raise_error(self):
+        '''
+        Re-raises an exception from the writer thread in the calling thread
+        '''
+        if self.error is not None:
+            error = self.error
+            self.error = None
+            raise error
+
+    def drain(self):
+        '''
+        Blocks until all queued points are written, then re-raises any writer thread exception
+        '''
+        if (self.thread is not None) and self.thread.is_alive():
+            self.queue.join()
+        self.raise_error()
+
+    def close(self):
+        '''
+        Writes the remaining queued points, stops the writer thread, and closes the file. Writer
+        thread errors are kept in `error` and not raised here, use `drain` to surface them.
+        '''
+        if (self.thread is not None) and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.thread = None
+        super().close()
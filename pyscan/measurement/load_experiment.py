@@ -1,12 +1,15 @@
 import h5py
 import pickle
 import json
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from itemattribute import ItemAttribute
 from .pyscan_json_decoder import PyscanJSONDecoder
 
 
-def load_experiment(file_name):
+def load_experiment(file_name, live=False, stitch=False, lazy=False, keys=None):
     '''
     Function to load experimental data created by pyscan
 
@@ -14,6 +17,18 @@ def load_experiment(file_name):
     ----------
     file_name : str
         Path to file that is to be loaded
+    live : bool, optional
+        If True, returns a `LiveExperiment` that reads a file written with `runinfo.swmr = True` while the
+        experiment is still running, defaults to False.
+    stitch : bool, optional
+        If True, returns a `StitchedExperiment` that reads the parts of a file rotated with
+        `runinfo.rotate_size`, `runinfo.rotate_iterations` or `runinfo.rotate_interval` as single datasets,
+        defaults to False.
+    lazy : bool, optional
+        If True, returns a `LazyExperiment` whose datasets are `LazyArray` proxies that only read the
+        requested slices from the file and keep their saved dtype, defaults to False.
+    keys : list of str, optional
+        Names of the datasets to read, defaults to all datasets. `runinfo` and `devices` are always loaded.
 
     '''
     if '.pkl' in file_name:
@@ -30,6 +45,18 @@ def load_experiment(file_name):
         else:
             assert 0, 'Cannot locate {}'.format(file_name)
 
+    if live:
+        assert data_version == 0.2, 'live loading requires an hdf5 file'
+        return LiveExperiment(file_name)
+
+    if stitch:
+        assert data_version == 0.2, 'stitching requires an hdf5 file'
+        return StitchedExperiment(file_name)
+
+    if lazy:
+        assert data_version == 0.2, 'lazy loading requires an hdf5 file'
+        return LazyExperiment(file_name)
+
     if data_version == 0.1:
         meta_data = pickle.load(
             open('{}.pkl'.format(file_name), "rb"))
@@ -47,7 +74,8 @@ def load_experiment(file_name):
         data = h5py.File('{}.hdf5'.format(file_name), 'r')
         with h5py.File('{}.hdf5'.format(file_name), 'r') as f:
             for key, value in data.items():
-                expt[key] = (f[key][:]).astype('float64')
+                if (keys is None) or (key in keys):
+                    expt[key] = (f[key][:]).astype('float64')
 
         return expt
 
@@ -57,19 +85,136 @@ def load_experiment(file_name):
         expt.devices = ItemAttribute()
 
         f = h5py.File('{}'.format(file_name), 'r')
-        expt.runinfo = json.loads(f.attrs['runinfo'], cls=PyscanJSONDecoder)
+        expt.runinfo = json.loads(f.attrs['runinfo'], cls=PyscanJSONDecoder, file=file_name)
 
-        expt.devices = json.loads(f.attrs['devices'], cls=PyscanJSONDecoder)
+        expt.devices = json.loads(f.attrs['devices'], cls=PyscanJSONDecoder, file=file_name)
 
-        for key, value in f.items():
-            expt[key] = (f[key][:]).astype('float64')
-        all_datasets = [key for key in f.keys()]
+        all_datasets = dataset_keys(f)
+        for key in all_datasets:
+            if (keys is None) or (key in keys):
+                expt[key] = (f[key][:]).astype('float64')
         expt.runinfo.measured = find_measured_datasets(expt.runinfo, all_datasets)
         f.close()
 
         return expt
 
 
+def load_experiments(paths, keys=None, workers=None, processes=False, stack=False):
+    '''
+    Loads many experiments in parallel with `load_experiment`
+
+    Parameters
+    ----------
+    paths : list of str
+        Paths of the files to load
+    keys : list of str, optional
+        Names of the datasets to read from each file, defaults to all datasets
+    workers : int, optional
+        Number of files loaded at the same time, defaults to the executor's default
+    processes : bool, optional
+        If True, files are loaded in a process pool instead of a thread pool, which also parallelizes
+        decoding the metadata and converting the data, defaults to False
+    stack : bool, optional
+        If True, returns a single ItemAttribute in which each dataset is stacked along a new first axis,
+        which requires the dataset to have the same shape in every experiment, defaults to False
+
+    Returns
+    -------
+    list of ItemAttribute
+        Experiments in the same order as `paths`, or an ItemAttribute of stacked datasets if `stack` is True,
+        with the experiments in its `experiments` attribute
+    '''
+    paths = [str(path) for path in paths]
+
+    if processes:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    with executor:
+        experiments = list(executor.map(partial(load_experiment, keys=keys), paths))
+
+    if not stack:
+        return experiments
+
+    return stack_experiments(experiments, keys)
+
+
+def stack_experiments(experiments, keys=None):
+    '''
+    Stacks the datasets of experiments along a new first axis
+
+    Parameters
+    ----------
+    experiments : list of ItemAttribute
+        Loaded experiments
+    keys : list of str, optional
+        Names of the datasets to stack, defaults to the datasets of the first experiment
+
+    Returns
+    -------
+    ItemAttribute
+        Stacked datasets, with the experiments in the `experiments` attribute
+    '''
+    assert len(experiments) > 0, 'No experiments to stack'
+
+    if keys is None:
+        keys = [key for key in experiments[0].keys() if key not in ['runinfo', 'devices']]
+
+    stacked = ItemAttribute()
+    for key in keys:
+        shapes = [np.shape(expt[key]) for expt in experiments]
+        assert all(shape == shapes[0] for shape in shapes), \
+            'Cannot stack {}, its shape differs between experiments: {}'.format(key, shapes)
+        stacked[key] = np.stack([expt[key] for expt in experiments])
+    stacked.experiments = experiments
+
+    return stacked
+
+
+def load_grid(file_name):
+    '''
+    Loads the regular grid view saved with the samples of an `.AdaptiveScan`
+
+    Parameters
+    ----------
+    file_name : str
+        Path to the hdf5 file, with or without the '.hdf5' extension
+
+    Returns
+    -------
+    ItemAttribute
+        The grid values of each scanned device, `<device>_<prop>`, and the gridded values of each measured key
+    '''
+    file_path = Path(file_name)
+    if file_path.suffix != '.hdf5':
+        file_path = file_path.with_name(file_path.name + '.hdf5')
+
+    grid = ItemAttribute()
+    with h5py.File(str(file_path), 'r') as f:
+        assert '_grid' in f, '{} has no grid, it is saved by experiments with an AdaptiveScan'.format(file_path)
+        for key, dataset in f['_grid'].items():
+            grid[key] = dataset[()]
+
+    return grid
+
+
+def dataset_keys(f):
+    '''
+    Returns the names of the datasets in the root of an experiment's hdf5 file, which excludes the
+    '_metadata' group of arrays stored by `Experiment.save_metadata`
+
+    Parameters
+    ----------
+    f : h5py.File
+
+    Returns
+    -------
+    list of str
+    '''
+    return [key for key, value in f.items() if isinstance(value, h5py.Dataset)]
+
+
 def find_measured_datasets(runinfo, all_datasets):
     """
     HDF5 files contain two types of datasets.  Measured datasets are data from
@@ -111,3 +256,315 @@ def find_measured_datasets(runinfo, all_datasets):
     measured = set(all_datasets).symmetric_difference(generated)
 
     return list(measured)
+
+
+class LiveExperiment(ItemAttribute):
+    '''
+    Read-only view of an experiment's hdf5 file while the experiment is writing it. The file must be
+    written with `runinfo.swmr = True`, and can only be opened once the experiment has saved its first
+    point. The reader never blocks or modifies the file being written.
+
+    Parameters
+    ----------
+    file_name : str
+        Path to the hdf5 file
+
+    Methods
+    -------
+    refresh(keys)
+    close()
+    '''
+
+    def __init__(self, file_name):
+        '''
+        Constructor method
+        '''
+        self._file = h5py.File(file_name, 'r', libver='latest', swmr=True)
+
+        self.runinfo = json.loads(self._file.attrs['runinfo'], cls=PyscanJSONDecoder, file=self._file)
+        self.devices = json.loads(self._file.attrs['devices'], cls=PyscanJSONDecoder, file=self._file)
+        self.runinfo.measured = find_measured_datasets(self.runinfo, dataset_keys(self._file))
+
+        # number of scan dimensions of the measured datasets, an `.AverageScan` has none
+        scans = []
+        while 'scan{}'.format(len(scans)) in self.runinfo:
+            scans.append(self.runinfo['scan{}'.format(len(scans))])
+        self._averaged = any(getattr(scan, 'device_names', None) == ['average'] for scan in scans)
+        self._scan_ndim = len(scans) - int(self._averaged)
+
+        self.refresh()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def refresh(self, keys=None):
+        '''
+        Updates the experiment's arrays with the data written since the last refresh. Points are written once
+        in scan order, so each dataset is only read from the first slice, along its outermost scan dimension,
+        that was not completely written at the last refresh, see `first_unwritten`. This also covers datasets
+        that have grown along that dimension (e.g. from a `.ContinuousScan`), whose capacity grows ahead of the
+        data. Datasets are read in full if their shape changed otherwise, or if the experiment has an
+        `.AverageScan`, whose repeats rewrite points that were already written.
+
+        Parameters
+        ----------
+        keys : list of str, optional
+            Datasets to refresh, defaults to all datasets
+        '''
+        if keys is None:
+            keys = dataset_keys(self._file)
+
+        for key in keys:
+            dataset = self._file[key]
+            dataset.refresh()
+
+            old = self[key] if key in self else None
+            # measured datasets start with the scan dimensions, the scan datasets are one dimensional
+            axis = self._scan_ndim - 1 if key in self.runinfo.measured else 0
+            if (old is None) or (old.ndim != dataset.ndim) or self._averaged or (axis < 0) or (dataset.ndim == 0):
+                self[key] = dataset[()]
+                continue
+
+            same = all(dataset.shape[i] == old.shape[i] for i in range(dataset.ndim) if i != axis)
+            start = first_unwritten(old, axis)
+            if (not same) or (dataset.shape[axis] < old.shape[axis]) or (start is None):
+                self[key] = dataset[()]
+                continue
+
+            if start == dataset.shape[axis]:
+                # complete at the last refresh
+                continue
+
+            region = tuple(slice(start, None) if i == axis else slice(None) for i in range(dataset.ndim))
+            kept = tuple(slice(0, start) if i == axis else slice(None) for i in range(dataset.ndim))
+            self[key] = np.concatenate([old[kept], dataset[region]], axis=axis)
+
+    def close(self):
+        '''
+        Closes the file
+        '''
+        self._file.close()
+
+
+def first_unwritten(array, axis):
+    '''
+    Returns the first index along `axis` of a slice of `array` that still holds the NaN fill value of
+    its dataset, i.e. the logical end of the data written when the array was read
+
+    Parameters
+    ----------
+    array : np.ndarray
+        Data read from a dataset
+    axis : int
+        Axis along which the dataset is written
+
+    Returns
+    -------
+    int or None
+        `array.shape[axis]` if every slice is complete, None if the dtype has no NaN fill value
+    '''
+    if not np.issubdtype(array.dtype, np.floating):
+        return None
+
+    missing = np.isnan(array)
+    other = tuple(i for i in range(array.ndim) if i != axis)
+    if len(other) > 0:
+        missing = np.any(missing, axis=other)
+    unwritten = np.flatnonzero(missing)
+    if len(unwritten) == 0:
+        return array.shape[axis]
+    return int(unwritten[0])
+
+
+def find_parts(file_name):
+    '''
+    Returns the paths of the parts of a rotated experiment file, in order, starting with `file_name`
+
+    Parameters
+    ----------
+    file_name : str
+        Path to the first part, `<file_name>.hdf5`
+
+    Returns
+    -------
+    list of str
+    '''
+    path = Path(file_name)
+    parts = sorted(path.parent.glob('{}-part[0-9][0-9][0-9].hdf5'.format(path.stem)))
+    return [str(path.absolute())] + [str(part.absolute()) for part in parts]
+
+
+class LazyArray(object):
+    '''
+    Read-only proxy of an hdf5 dataset that reads data only when it is indexed or converted to an array.
+    Supports numpy-style indexing, `np.asarray` and numpy functions, and keeps the dataset's dtype.
+
+    Parameters
+    ----------
+    dataset : h5py.Dataset
+        Dataset to read from, which must stay open while the proxy is used
+
+    Attributes
+    ----------
+    dataset : h5py.Dataset
+        Dataset to read from
+    '''
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    @property
+    def shape(self):
+        return self.dataset.shape
+
+    @property
+    def dtype(self):
+        return self.dataset.dtype
+
+    @property
+    def ndim(self):
+        return self.dataset.ndim
+
+    @property
+    def size(self):
+        return self.dataset.size
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, key):
+        try:
+            return self.dataset[key]
+        except (TypeError, ValueError):
+            # h5py only supports a subset of numpy indexing (e.g. no negative steps or unsorted lists)
+            return self.dataset[()][key]
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.dataset[()]
+        return self.dataset[()].astype(dtype)
+
+    def __repr__(self):
+        return '<LazyArray {} shape={} dtype={}>'.format(self.dataset.name, self.shape, self.dtype)
+
+
+class LazyExperiment(ItemAttribute):
+    '''
+    Experiment loaded from an hdf5 file that stays open, with each dataset available as a `LazyArray`.
+    Data is only read when it is indexed, e.g. `expt.x1[0, :]`, or converted with `np.asarray(expt.x1)`.
+    Use as a context manager, or call `close()`, to close the file.
+
+    Parameters
+    ----------
+    file_name : str
+        Path to the hdf5 file
+
+    Methods
+    -------
+    close()
+    '''
+
+    def __init__(self, file_name):
+        '''
+        Constructor method
+        '''
+        self._file = h5py.File(file_name, 'r')
+
+        self.runinfo = json.loads(self._file.attrs['runinfo'], cls=PyscanJSONDecoder, file=self._file)
+        self.devices = json.loads(self._file.attrs['devices'], cls=PyscanJSONDecoder, file=self._file)
+        self.runinfo.measured = find_measured_datasets(self.runinfo, dataset_keys(self._file))
+
+        for key in dataset_keys(self._file):
+            self[key] = LazyArray(self._file[key])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        '''
+        Closes the file, after which the `LazyArray` datasets can no longer be read. Metadata arrays of
+        `runinfo` and `devices` that were not read yet reopen the file by its path when they are used.
+        '''
+        self._file.close()
+
+
+class StitchedExperiment(LazyExperiment):
+    '''
+    Experiment whose file was split into parts by `runinfo.rotate_size`, `runinfo.rotate_iterations` or
+    `runinfo.rotate_interval`. Datasets that are split between parts are joined along the continuous scan
+    dimension as `LazyArray` proxies of hdf5 virtual datasets, so data is only read from the parts when the
+    datasets are indexed, e.g. `expt.x1[-10:]`. Other datasets are loaded from the first part.
+
+    Parameters
+    ----------
+    file_name : str
+        Path to the first part, `<file_name>.hdf5`
+
+    Attributes
+    ----------
+    parts : list of str
+        Paths of the parts, in order
+
+    Methods
+    -------
+    close()
+    '''
+
+    def __init__(self, file_name):
+        '''
+        Constructor method
+        '''
+        self.parts = find_parts(file_name)
+
+        with h5py.File(self.parts[0], 'r') as f:
+            self.runinfo = json.loads(f.attrs['runinfo'], cls=PyscanJSONDecoder, file=self.parts[0])
+            self.devices = json.loads(f.attrs['devices'], cls=PyscanJSONDecoder, file=self.parts[0])
+            self.runinfo.measured = find_measured_datasets(self.runinfo, dataset_keys(f))
+
+            split = {}
+            for key in dataset_keys(f):
+                dataset = f[key]
+                if 'continuous_axis' in dataset.attrs:
+                    split[key] = (int(dataset.attrs['continuous_axis']), dataset.dtype)
+                else:
+                    self[key] = dataset[()].astype('float64')
+
+        shapes = {key: [] for key in split}
+        for part in self.parts:
+            with h5py.File(part, 'r') as f:
+                for key in split:
+                    shapes[key].append(f[key].shape)
+
+        # the virtual datasets only map the parts, so their file is kept in memory. It is reopened read-only
+        # from its image so that the parts are also opened read-only and can be loaded more than once.
+        name = '{}-stitched-{}'.format(file_name, id(self))
+        with h5py.File(name, 'w', driver='core', backing_store=False) as f:
+            for key, (axis, dtype) in split.items():
+                shape = list(shapes[key][0])
+                shape[axis] = sum(part_shape[axis] for part_shape in shapes[key])
+                layout = h5py.VirtualLayout(shape=tuple(shape), dtype=dtype)
+
+                start = 0
+                for part, part_shape in zip(self.parts, shapes[key]):
+                    stop = start + part_shape[axis]
+                    region = tuple(slice(start, stop) if i == axis else slice(None) for i in range(len(shape)))
+                    layout[region] = h5py.VirtualSource(part, key, shape=part_shape)
+                    start = stop
+
+                f.create_virtual_dataset(key, layout, fillvalue=np.nan)
+
+            f.flush()
+            image = f.id.get_file_image()
+
+        fapl = h5py.h5p.create(h5py.h5p.FILE_ACCESS)
+        fapl.set_fapl_core(backing_store=False)
+        fapl.set_file_image(image)
+        self._file = h5py.File(h5py.h5f.open(name.encode(), h5py.h5f.ACC_RDONLY, fapl=fapl))
+        for key in split:
+            self[key] = LazyArray(self._file[key])
@@ -0,0 +1,292 @@
+import h5py
+import numpy as np
+
+from pathlib import Path
+from threading import Lock
+from time import perf_counter, time
+from itemattribute import ItemAttribute
+
+
+class PointTiming(object):
+    '''
+    Records how long each phase of every point of an experiment run takes, see `runinfo.timing`.
+    Each point is a row with the time at which it started, in seconds since the start of the run,
+    followed by the duration of each phase in seconds, np.nan for phases that did not run at that point.
+    Rows are compacted into numpy blocks as the run goes, so recording costs 8 bytes per phase per point.
+
+    Parameters
+    ----------
+    phases : list of str
+        Names of the timed phases, e.g. ['iterate_scan0', 'measure', 'save', 'writer_wait']
+    block_size : int
+        Number of rows kept as python lists before they are compacted, defaults to 4096
+
+    Attributes
+    ----------
+    columns : list of str
+        'timestamp' followed by `phases`
+    n : int
+        Number of points started
+    start_time : float
+        Unix time at which timing started
+    elapsed : float
+        Seconds from the start of timing to `finish()`, or to now if `finish()` has not been called
+
+    Methods
+    -------
+    start_point()
+    lap(phase)
+    record(point, phase, duration)
+    finish()
+    arrays()
+    save(f)
+    '''
+
+    def __init__(self, phases, block_size=4096):
+        assert block_size > 0, 'block_size must be > 0'
+
+        self.columns = ['timestamp'] + list(phases)
+        self.index = {column: i for i, column in enumerate(self.columns)}
+        self.block_size = block_size
+
+        self.blocks = []
+        self.rows = []
+        self.offset = 0
+        self.row = None
+        self.n = 0
+        self.lock = Lock()
+
+        self.start = perf_counter()
+        self.start_time = time()
+        self.mark = self.start
+        self.stop = None
+
+    def start_point(self):
+        '''
+        Starts the row of a new point and the lap of its first phase
+
+        Returns
+        -------
+        int
+            Number of the point, used by `record`
+        '''
+        now = perf_counter()
+        row = [np.nan] * len(self.columns)
+        row[0] = now - self.start
+
+        with self.lock:
+            # the last two rows stay as lists, the previous point may still be fetched by the pipeline
+            if len(self.rows) > self.block_size:
+                self.blocks.append(np.array(self.rows[:-2], dtype=float))
+                self.offset += len(self.rows) - 2
+                del self.rows[:-2]
+            self.rows.append(row)
+
+        self.row = row
+        self.mark = now
+        self.n += 1
+        return self.n - 1
+
+    def lap(self, phase, exclude=0):
+        '''
+        Records the time since the start of the point, or since the previous lap, as the duration of
+        `phase` at the current point. Only used by the thread that started the point.
+
+        Parameters
+        ----------
+        phase : str
+        exclude : float
+            Seconds of the lap recorded as another phase, e.g. 'writer_wait' during 'save', which are not
+            counted in `phase`, defaults to 0
+        '''
+        now = perf_counter()
+        self.row[self.index[phase]] = now - self.mark - exclude
+        self.mark = now
+
+    def record(self, point, phase, duration):
+        '''
+        Records the duration of `phase` at a given point, which may be called from another thread
+
+        Parameters
+        ----------
+        point : int
+            Number returned by `start_point`
+        phase : str
+        duration : float
+            Duration in seconds
+        '''
+        with self.lock:
+            self.rows[point - self.offset][self.index[phase]] = duration
+
+    def finish(self):
+        '''
+        Stops the clock of `elapsed`
+        '''
+        self.stop = perf_counter()
+
+    @property
+    def elapsed(self):
+        stop = perf_counter() if self.stop is None else self.stop
+        return stop - self.start
+
+    def arrays(self):
+        '''
+        Returns the recorded timings
+
+        Returns
+        -------
+        ItemAttribute
+            One array of length `n` per column, with `start_time` and `elapsed`
+        '''
+        with self.lock:
+            table = np.concatenate(
+                self.blocks + [np.array(self.rows, dtype=float).reshape(-1, len(self.columns))])
+
+        timing = ItemAttribute()
+        for i, column in enumerate(self.columns):
+            timing[column] = table[:, i].copy()
+        timing.start_time = self.start_time
+        timing.elapsed = self.elapsed
+        return timing
+
+    def save(self, f):
+        '''
+        Saves the recorded timings to the '_timing' group of an hdf5 file, replacing any saved before
+
+        Parameters
+        ----------
+        f : h5py.File
+            File open for writing
+        '''
+        timing = self.arrays()
+        if '_timing' in f:
+            del f['_timing']
+        group = f.create_group('_timing')
+        for column in self.columns:
+            group.create_dataset(column, data=timing[column])
+        group.attrs['columns'] = self.columns
+        group.attrs['start_time'] = timing.start_time
+        group.attrs['elapsed'] = timing.elapsed
+
+
+class NoTiming(object):
+    '''
+    Stand-in for `PointTiming` when `runinfo.timing` is False, every method does nothing
+    '''
+
+    def start_point(self):
+        return None
+
+    def lap(self, phase, exclude=0):
+        pass
+
+    def record(self, point, phase, duration):
+        pass
+
+
+def load_timing(file_name):
+    '''
+    Loads the timings saved by an experiment run with `runinfo.timing = True`
+
+    Parameters
+    ----------
+    file_name : str or Path
+        Path to the hdf5 file, with or without the '.hdf5' extension
+
+    Returns
+    -------
+    ItemAttribute
+        One array per column ('timestamp' and each phase), with `start_time` and `elapsed`
+    '''
+    file_path = Path(file_name)
+    if file_path.suffix != '.hdf5':
+        file_path = file_path.with_name(file_path.name + '.hdf5')
+
+    with h5py.File(str(file_path), 'r') as f:
+        assert '_timing' in f, '{} has no timing, run the experiment with runinfo.timing = True'.format(file_path)
+        group = f['_timing']
+        timing = ItemAttribute()
+        for column in group.attrs['columns']:
+            timing[str(column)] = group[column][()]
+        timing.start_time = float(group.attrs['start_time'])
+        timing.elapsed = float(group.attrs['elapsed'])
+
+    return timing
+
+
+def timing_report(timing, percentiles=(50, 90, 99)):
+    '''
+    Summarizes the duration of each phase of a timed run
+
+    Parameters
+    ----------
+    timing : PointTiming, ItemAttribute, str or Path
+        Timings of a run, as `Experiment.point_timing`, the arrays returned by `load_timing`,
+        or the path of an hdf5 file to load them from
+    percentiles : tuple of float
+        Percentiles of the durations to report, defaults to (50, 90, 99)
+
+    Returns
+    -------
+    ItemAttribute
+        One entry per phase with `count`, `total`, `mean`, `min`, `max`, `p<percentile>` for each
+        percentile, and `fraction`, the share of the run's elapsed time spent in the phase.
+        Durations are in seconds, phases that did not run at a point are not counted.
+    '''
+    if isinstance(timing, (str, Path)):
+        timing = load_timing(timing)
+    elif isinstance(timing, PointTiming):
+        timing = timing.arrays()
+
+    report = ItemAttribute()
+    for phase, values in timing.items():
+        if (phase == 'timestamp') or (not isinstance(values, np.ndarray)):
+            continue
+
+        values = values[~np.isnan(values)]
+        summary = ItemAttribute()
+        summary.count = len(values)
+        summary.total = float(np.sum(values))
+        if len(values) > 0:
+            summary.mean = float(np.mean(values))
+            summary.min = float(np.min(values))
+            summary.max = float(np.max(values))
+        else:
+            summary.mean = summary.min = summary.max = np.nan
+        for p, value in zip(percentiles, np.percentile(values, percentiles) if len(values) > 0
+                            else [np.nan] * len(percentiles)):
+            summary['p{:g}'.format(p)] = float(value)
+        summary.fraction = summary.total / timing.elapsed if timing.elapsed > 0 else np.nan
+        report[phase] = summary
+
+    return report
+
+
+def format_timing_report(report):
+    '''
+    Formats a `timing_report` as a table with one row per phase and durations in microseconds
+
+    Parameters
+    ----------
+    report : ItemAttribute
+        Returned by `timing_report`
+
+    Returns
+    -------
+    str
+    '''
+    if len(report.keys()) == 0:
+        return ''
+
+    columns = [key for key in list(report.values())[0].keys() if key not in ['count', 'fraction']]
+    width = max(len(phase) for phase in report.keys())
+
+    lines = ['{:<{}} {:>8} '.format('phase', width, 'count')
+             + ' '.join('{:>10}'.format(column + ' us') for column in columns) + ' {:>8}'.format('fraction')]
+    for phase, summary in report.items():
+        lines.append(
+            '{:<{}} {:>8d} '.format(phase, width, summary.count)
+            + ' '.join('{:>10.1f}'.format(summary[column] * 1e6) for column in columns)
+            + ' {:>8.1%}'.format(summary.fraction))
+
+    return '\n'.join(lines)
@@ -1,9 +1,27 @@
+import h5py
 import json
+import numpy as np
 from itemattribute import ItemAttribute
+from ..general.scan_values import scan_values_from_dict
 
 
 class PyscanJSONDecoder(json.JSONDecoder):
-    def __init__(self, *args, **kwargs):
+    '''
+    JSON decoder that converts dictionaries into ItemAttribute objects.
+
+    Arrays that `PyscanJSONEncoder` stored as datasets are encoded as {"_pyscan_dataset": name}. If `file`
+    is given, these references are decoded as `MetadataArray` objects that read the dataset from `file`
+    when they are first used, otherwise they are left as ItemAttribute objects. `ScanValues` are decoded
+    from their parameters.
+
+    Parameters
+    ----------
+    file : str or h5py.File, optional
+        Path to, or open handle of, the hdf5 file containing the referenced datasets
+    '''
+
+    def __init__(self, *args, file=None, **kwargs):
+        self.file = file
         super().__init__(object_hook=self.item_attribute_object_hook, *args, **kwargs)
 
     def item_attribute_object_hook(self, data):
@@ -20,9 +38,86 @@ class PyscanJSONDecoder(json.JSONDecoder):
         -------
         ItemAttribute
         '''
-        if type(data) is dict:
+        if (self.file is not None) and (list(data.keys()) == ['_pyscan_dataset']):
+            new_data = MetadataArray(self.file, data['_pyscan_dataset'])
+        elif '_pyscan_scan_values' in data:
+            new_data = scan_values_from_dict(data)
+        elif type(data) is dict:
             new_data = ItemAttribute(data)
         else:
             new_data = data
 
         return new_data
+
+
+class MetadataArray(object):
+    '''
+    Array of the saved metadata that is stored as a dataset of the hdf5 file instead of in the JSON.
+    The dataset is read when the array is first used, e.g. indexed or converted with `np.asarray`. If the
+    array was decoded with an open file handle that has since been closed (e.g. by `LazyExperiment.close`),
+    the file is reopened by its path for the read.
+
+    Parameters
+    ----------
+    file : str or h5py.File
+        Path to, or open handle of, the hdf5 file
+    name : str
+        Name of the dataset in the file
+    '''
+
+    def __init__(self, file, name):
+        self.file = file
+        self.name = name
+        self.path = file.filename if isinstance(file, h5py.File) else file
+        self._value = None
+
+    @property
+    def value(self):
+        '''
+        Returns the array, reading it from the file the first time
+        '''
+        if self._value is None:
+            if isinstance(self.file, h5py.File) and self.file.id.valid:
+                self._value = self.file[self.name][()]
+            else:
+                with h5py.File(self.path, 'r') as f:
+                    self._value = f[self.name][()]
+        return self._value
+
+    @property
+    def shape(self):
+        return self.value.shape
+
+    @property
+    def dtype(self):
+        return self.value.dtype
+
+    def tolist(self):
+        return self.value.tolist()
+
+    def __len__(self):
+        return len(self.value)
+
+    def __iter__(self):
+        return iter(self.value)
+
+    def __getitem__(self, key):
+        return self.value[key]
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.value
+        return self.value.astype(dtype)
+
+    def __getstate__(self):
+        # open files can not be pickled, so the array is read before
+        state = self.__dict__.copy()
+        if isinstance(self.file, h5py.File):
+            state['_value'] = np.asarray(self.value)
+            state['file'] = self.path
+        return state
+
+    def __repr__(self):
+        if self._value is None:
+            return '<MetadataArray {} (not loaded)>'.format(self.name)
+        return '<MetadataArray {} shape={}>'.format(self.name, self._value.shape)
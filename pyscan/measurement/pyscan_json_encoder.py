@@ -2,6 +2,9 @@ import json
 import numpy as np
 from itemattribute import ItemAttribute
 from ..drivers.instrument_driver import InstrumentDriver
+from ..general.growable_array import GrowableArray
+from ..general.ring_buffer import RingBuffer
+from ..general.scan_values import ScanValues, scan_values_to_dict
 from pyvisa.resources import (
     # FirewireInstrument,
     GPIBInstrument,
@@ -24,8 +27,17 @@ class PyscanJSONEncoder(json.JSONEncoder):
     The encoder attempts to serialize various non-standard objects to a JSON-compatible format, applying
     specific conversions based on the object type. If an object is already JSON serializable, the encoder
     falls back to the default method provided by the superclass.
+
+    Numeric arrays with at least `array_size` elements can be stored outside of the JSON by passing
+    `array_store`, a function that saves an array and returns a name for it. The array is then encoded as
+    the reference {"_pyscan_dataset": name}, which `PyscanJSONDecoder` resolves.
     """
 
+    def __init__(self, *args, array_store=None, array_size=1000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.array_store = array_store
+        self.array_size = array_size
+
     def default(self, obj, debug=False):
         """
         Convert non-serializable objects to a serializable format.
@@ -55,7 +67,13 @@ class PyscanJSONEncoder(json.JSONEncoder):
         elif isinstance(obj, np.floating):
             return float(obj)
         elif isinstance(obj, np.ndarray):
+            if (self.array_store is not None) and (obj.size >= self.array_size) and (obj.dtype.kind in 'biufc'):
+                return {'_pyscan_dataset': self.array_store(obj)}
             return obj.tolist()
+        elif isinstance(obj, (GrowableArray, RingBuffer)):
+            return self.default(obj.array)
+        elif isinstance(obj, ScanValues):
+            return scan_values_to_dict(obj)
         elif callable(obj):
             return inspect.getsource(obj)
         elif isinstance(obj, (WindowsPath, Path)):
@@ -1,11 +1,14 @@
 from itemattribute import ItemAttribute
 from .get_pyscan_version import get_pyscan_version
-from .scans import PropertyScan, AverageScan, ContinuousScan
+from .scans import PropertyScan, AverageScan, ContinuousScan, SweepScan, AdaptiveScan
 import pyscan as ps
 import re
 import numpy as np
 
 
+SCAN_KEY = re.compile(r'scan\d+$')
+
+
 class RunInfo(ItemAttribute):
     '''
     Object that contains information of how to run the experiment.
@@ -22,8 +25,75 @@ class RunInfo(ItemAttribute):
         It should accept a ps.Experiment object as its only parameter,
         and returns an ItemAttribute object containing the measured data. The names of the measured data,
         each being an attribute of the return object, will appear as keys of the experiment after it is run.
+        It can be an `async def` function, which is run by the experiment's event loop so that it can read
+        several instruments at the same time, e.g. with `asyncio.gather` and `InstrumentDriver.async_query`.
+        `trigger_function` and `fetch_function` can be `async def` functions in the same way.
     initial_pause : float
         Pause before first setting instruments in seconds, defaults to 0.1.
+    pipeline : bool
+        If True, the experiment measures each point with `trigger_function` and `fetch_function` instead of
+        `measure_function`, and fetches and saves each point in a background thread while the scans move to
+        the next point. Defaults to False.
+    trigger_function : func
+        User-defined function that starts the measurement at the current point when `pipeline` is True.
+        It should accept a ps.Experiment object as its only parameter, and return a handle, e.g. the raw
+        reading or anything needed to retrieve it, which is passed to `fetch_function`.
+    fetch_function : func
+        User-defined function that completes the measurement of a point when `pipeline` is True. It should
+        accept a ps.Experiment object and the handle returned by `trigger_function`, and return an
+        ItemAttribute object like `measure_function`. It runs while the next point is being set, so it must
+        not depend on the instruments' state or the scans' current indicies. The next point's
+        `trigger_function` is called once it has returned.
+    flush_points : int or None
+        Number of saved points between flushes of the hdf5 file while running, defaults to 100.
+    flush_interval : float or None
+        Time in seconds between flushes of the hdf5 file while running, defaults to 1.
+    async_save : bool
+        If True, data points are written to the hdf5 file by a background thread, defaults to False.
+    save_queue_size : int
+        Maximum number of points waiting to be written when `async_save` is True, defaults to 1000.
+    save_lines : int
+        If greater than 0, points are buffered in memory and written to the hdf5 file once
+        `save_lines` scan0 lines are complete, with one write per measured dataset. Defaults to 0,
+        which writes every point as it is measured.
+    chunks : str, tuple, or None
+        Chunk layout of measured datasets in the hdf5 file. 'auto' (default) uses chunks of about 1 MiB
+        aligned to scan0 lines, 'point' uses one chunk per point, a tuple sets an explicit chunk shape,
+        and None stores each dataset as a single chunk. See `pyscan.measurement.hdf5_writer.chunk_shape`.
+    compression : str or None
+        hdf5 compression filter for measured datasets, 'gzip' or 'lzf', defaults to None. Compressed chunks
+        are rewritten on every flush, so pair compression with `save_lines` or a larger `flush_points`.
+    compression_opts : int or None
+        Compression level for 'gzip' (0-9), defaults to None.
+    shuffle : bool
+        If True, applies the hdf5 shuffle filter to measured datasets, defaults to False.
+    swmr : bool
+        If True, the hdf5 file is switched to single-writer/multiple-reader mode after the first point so
+        that it can be read with `load_experiment(file_name, live=True)` while running, defaults to False.
+    rotate_size : int or None
+        For experiments with a `.ContinuousScan`, closes the hdf5 file once it is larger than `rotate_size`
+        bytes and continues in `<file_name>-partNNN.hdf5`, defaults to None. Parts are read back together with
+        `load_experiment(file_name, stitch=True)`.
+    rotate_iterations : int or None
+        Like `rotate_size`, continues in a new part after `rotate_iterations` continuous iterations, defaults to None.
+    rotate_interval : float or None
+        Like `rotate_size`, continues in a new part after `rotate_interval` seconds, defaults to None.
+    metadata_array_size : int
+        Arrays in the runinfo and devices metadata with at least this many elements, such as the values of
+        long scans, are saved as datasets of the hdf5 file instead of inside the metadata's JSON, defaults to 1000.
+    catalog : bool
+        If True, the experiment is added to the `.Catalog` of `data_path` when its metadata is saved,
+        and its entry is updated when it ends, defaults to True.
+    scan_order : str
+        Order in which the points of multi-dimensional scans are measured. 'raster' (default) restarts every
+        scan from its first value, 'serpentine' runs every scan except the outermost backwards on alternate
+        passes, so that ramped sources do not return to their start value at the end of each line.
+        Data is saved at the same indicies in either order.
+    timing : bool
+        If True, the experiment records when each point started and how long each of its phases took: iterating
+        each scan, measuring (or triggering, waiting for and fetching pipelined points), saving, and waiting for
+        the hdf5 writer. The timings are kept in `Experiment.point_timing` and saved to the '_timing' group of
+        the hdf5 file when the run ends, see `Experiment.timing_report()`. Defaults to False.
     _pyscan_version : str
         Current version of pyscan to be saved as metadata.
 
@@ -44,29 +114,124 @@ class RunInfo(ItemAttribute):
         Returns tuple of the current scan iteration indicies, excludingb averaged scan
     average_index : int
         Returns the index of the scan to be averaged, -1 if no average scan is present
+    has_continuous_scan : bool
+        True if a continuous scan is present, False otherwise
+    continuous_index : int
+        Returns the index of the continuous scan, -1 if no continuous scan is present
+
+    The list of scans and the positions of the average and continuous scans are computed once by `compile()`
+    and cached, so that these properties are cheap to use at every point of a run. The cache is cleared
+    whenever a scan<#> attribute is set or deleted.
 
     Methods
     -------
     check()
+    compile()
     check_sequential_scans()
     check_property_scan()
     check_repeat_scan()
     check_average_scan()
     check_continuous_scan()
+    check_sweep_scan()
+    check_adaptive_scan()
     '''
 
+    # the compiled scan structure is kept out of __dict__ so that it is not saved with the metadata
+    __slots__ = ('_structure',)
+
     def __init__(self):
         """
         Constructor method
         """
 
+        self._structure = None
+
         self.measured = []
         self.measure_function = None
 
         self.initial_pause = 0.1
 
+        self.pipeline = False
+        self.trigger_function = None
+        self.fetch_function = None
+
+        self.flush_points = 100
+        self.flush_interval = 1.0
+
+        self.async_save = False
+        self.save_queue_size = 1000
+        self.save_lines = 0
+
+        self.chunks = 'auto'
+        self.compression = None
+        self.compression_opts = None
+        self.shuffle = False
+
+        self.swmr = False
+
+        self.rotate_size = None
+        self.rotate_iterations = None
+        self.rotate_interval = None
+
+        self.metadata_array_size = 1000
+
+        self.catalog = True
+
+        self.scan_order = 'raster'
+
+        self.timing = False
+
         self._pyscan_version = get_pyscan_version()
 
+    def __setattr__(self, key, value):
+        if key.startswith('scan') and SCAN_KEY.match(key):
+            object.__setattr__(self, '_structure', None)
+        super().__setattr__(key, value)
+
+    def __delattr__(self, key):
+        if key.startswith('scan') and SCAN_KEY.match(key):
+            object.__setattr__(self, '_structure', None)
+        super().__delattr__(key)
+
+    def compile(self):
+        '''
+        Computes the list of scans and the positions of the average and continuous scans, which are then
+        used by the scan properties until a scan<#> attribute is set or deleted. Called by `check()`.
+
+        Returns
+        -------
+        ItemAttribute
+            Structure with scans, ndim, average_index, has_average_scan, continuous_index,
+            and has_continuous_scan
+        '''
+        scans = []
+        i = 0
+        while hasattr(self, f'scan{i}'):
+            scans.append(getattr(self, f'scan{i}'))
+            i += 1
+
+        structure = ItemAttribute()
+        structure.scans = tuple(scans)
+        structure.ndim = len(scans)
+        structure.average_index = next(
+            (i for i, scan in enumerate(scans) if isinstance(scan, AverageScan)), -1)
+        structure.has_average_scan = structure.average_index != -1
+        structure.continuous_index = next(
+            (i for i, scan in enumerate(scans) if isinstance(scan, ContinuousScan)), -1)
+        structure.has_continuous_scan = structure.continuous_index != -1
+
+        self._structure = structure
+        return structure
+
+    @property
+    def structure(self):
+        '''
+        Returns the compiled scan structure, see `compile()`
+        '''
+        if self._structure is None:
+            return self.compile()
+        return self._structure
+
     def check(self):
         '''
         Checks to see if runinfo is properly formatted. Called by Experiment object's `run()` methods.
@@ -75,6 +240,8 @@ class RunInfo(ItemAttribute):
         instance of `.AverageScan`) to average over.
         '''
 
+        self.compile()
+
         self.check_sequential_scans()
 
         self.check_property_scans()
@@ -85,6 +252,16 @@ class RunInfo(ItemAttribute):
 
         self.check_continuous_scan()
 
+        self.check_sweep_scan()
+
+        self.check_adaptive_scan()
+
+        assert self.scan_order in ['raster', 'serpentine'], "scan_order must be 'raster' or 'serpentine'"
+
+        if self.pipeline:
+            assert callable(self.trigger_function) and callable(self.fetch_function), \
+                'A pipelined runinfo needs a trigger_function and a fetch_function'
+
     def check_sequential_scans(self):
 
         scan_indicies = []
@@ -152,6 +329,26 @@ class RunInfo(ItemAttribute):
         if self.has_continuous_scan:
             assert self.continuous_index == (self.ndim - 1), 'Error, continuous scan must be the last scan'
 
+    def check_sweep_scan(self):
+        '''
+        Checks that a `.SweepScan` is scan0 of a raster ordered runinfo, as the hardware sweep covers
+        whole lines in one direction
+        '''
+        for i, scan in enumerate(self.scans):
+            if isinstance(scan, SweepScan):
+                assert i == 0, 'A SweepScan must be scan0'
+                assert self.scan_order == 'raster', "A SweepScan requires scan_order 'raster'"
+
+    def check_adaptive_scan(self):
+        '''
+        Checks that an `.AdaptiveScan` is the only scan, as it chooses each point from the data measured
+        before, and that the runinfo is not pipelined, which measures each point after the next is chosen
+        '''
+        for scan in self.scans:
+            if isinstance(scan, AdaptiveScan):
+                assert self.ndim == 1, 'An AdaptiveScan must be the only scan'
+                assert not self.pipeline, 'An AdaptiveScan can not be pipelined'
+
     def stop_continuous(self, plus_one=False):
         stop = False
         if self.has_continuous_scan:
@@ -172,20 +369,15 @@ class RunInfo(ItemAttribute):
         '''
         Returns array of all scans
         '''
-        i = 0
-        scans = []
-        while hasattr(self, f'scan{i}'):
-            scans.append(getattr(self, f'scan{i}'))
-            i += 1
-        return scans
+        return list(self.structure.scans)
 
     @property
     def dims(self):
         '''
         Returns tuple containing the length of each scan, in order from scan0 to scan3, and excludes scans of size 1
         '''
-        dims = [scan.n for scan in self.scans]
-        self._dims = tuple(dims)
+        # scan lengths are not cached, a continuous scan grows while running
+        self._dims = tuple([scan.n for scan in self.structure.scans])
         return self._dims
 
     @property
@@ -193,7 +385,7 @@ class RunInfo(ItemAttribute):
         '''
         Returns tuple of the current scan iteration indicies,
         '''
-        self._indicies = [scan.i for scan in self.scans]
+        self._indicies = [scan.i for scan in self.structure.scans]
         return tuple(self._indicies)
 
     @property
@@ -201,7 +393,7 @@ class RunInfo(ItemAttribute):
         '''
         Returns number of scans
         '''
-        self._ndim = len(self.dims)
+        self._ndim = self.structure.ndim
         return self._ndim
 
     # Properties modified due to the presence of an average scan
@@ -210,16 +402,7 @@ class RunInfo(ItemAttribute):
         '''
         Returns a boolean of whether or not an average scan is present.
         '''
-        num_av_scans = 0
-        for scan in self.scans:
-            if isinstance(scan, AverageScan):
-                num_av_scans += 1
-
-        if num_av_scans > 0:
-            self._has_average_scan = True
-        else:
-            self._has_average_scan = False
-
+        self._has_average_scan = self.structure.has_average_scan
         return self._has_average_scan
 
     @property
@@ -227,16 +410,7 @@ class RunInfo(ItemAttribute):
         '''
         Returns the index of the scan to be averaged. Used by `pyscan.AverageExperiment`.
         '''
-        if self.has_average_scan:
-            i = 0
-            for scan in self.scans:
-                if isinstance(scan, AverageScan):
-                    return i
-                i += 1
-            self._average_index = self.indicies[self.average_dims]
-            return self._average_index
-        else:
-            return -1
+        return self.structure.average_index
 
     @property
     def average_dims(self):
@@ -256,9 +430,10 @@ class RunInfo(ItemAttribute):
         Returns tuple of the current scan iteration indicies, excluding scans of size 1 and averaged scan.
         Used by `.AverageExperiment`.
         '''
-        if self.has_average_scan:
-            self._average_indicies = list(self.indicies)
-            self._average_indicies.pop(self.average_index)
+        structure = self.structure
+        if structure.has_average_scan:
+            self._average_indicies = [scan.i for scan in structure.scans]
+            self._average_indicies.pop(structure.average_index)
             return tuple(self._average_indicies)
         else:
             return ()
@@ -277,33 +452,17 @@ class RunInfo(ItemAttribute):
         '''
         Returns a boolean of whether or not an continuous scan is present.
         '''
-        num_av_scans = 0
-        for scan in self.scans:
-            if isinstance(scan, ContinuousScan):
-                num_av_scans += 1
-
-        if num_av_scans > 0:
-            self._has_continuous_scan = True
-        else:
-            self._has_continuous_scan = False
-
+        self._has_continuous_scan = self.structure.has_continuous_scan
         return self._has_continuous_scan
 
     @property
     def continuous_index(self):
         '''
-        Returns the index of the scan to be averaged. Used by `pyscan.AverageExperiment`.
+        Returns the index of the continuous scan, -1 if no continuous scan is present.
         '''
-        if self.has_continuous_scan:
-            i = 0
-            for i in range(self.ndim):
-                if isinstance(self.scans[i], ContinuousScan):
-                    return i
-                self._continuous_index = i
-        else:
-            self._continuous_index = -1
+        self._continuous_index = self.structure.continuous_index
         return self._continuous_index
 
     @property
     def iterators(self):
-        return [scan.iterator() for scan in self.scans]
+        return [scan.iterator() for scan in self.structure.scans]
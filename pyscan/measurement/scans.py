@@ -1,7 +1,45 @@
+import asyncio
 import numpy as np
-from time import sleep
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+from inspect import isawaitable
 from itemattribute import ItemAttribute
 from ..general.same_length import same_length
+from ..general.growable_array import GrowableArray
+from ..general.ring_buffer import RingBuffer
+from ..general.scan_values import ScanValues
+from ..general.interruptible_sleep import interruptible_sleep
+
+
+# shared by all parallel PropertyScans, threads are only started as they are needed
+_set_executor = None
+
+
+def get_set_executor():
+    '''
+    Returns the thread pool used by `PropertyScan`s with `parallel=True`
+    '''
+    global _set_executor
+    if _set_executor is None:
+        _set_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='pyscan-set')
+    return _set_executor
+
+
+class PropertyScanError(Exception):
+    '''
+    Raised by a `PropertyScan` with `parallel=True` when setting one or more devices failed.
+
+    Attributes
+    ----------
+    errors : dict{str: Exception}
+        Exception raised by each device that failed, by device name
+    '''
+
+    def __init__(self, prop, errors):
+        self.prop = prop
+        self.errors = errors
+        message = ', '.join('{}: {!r}'.format(dev, error) for dev, error in errors.items())
+        super().__init__('Setting {} failed for {}'.format(prop, message))
 
 
 class AbstractScan(ItemAttribute):
@@ -11,7 +49,8 @@ class AbstractScan(ItemAttribute):
 
     def iterate(self, index, devices):
         '''
-        A function to be implemented by inheriting Scan classes.
+        A function to be implemented by inheriting Scan classes. It can return an awaitable, such as the
+        coroutine of an `async def` iterate, which is awaited by the experiment's event loop.
         '''
         pass
 
@@ -31,15 +70,20 @@ class PropertyScan(AbstractScan):
     ----------
     input_dict : dict{string:array}
         key:value pairs of device name strings and arrays of values representing the new `prop`
-        values you want to set for each device.
+        values you want to set for each device. Values can also be `ps.ScanValues`, such as
+        `ps.DRange(0, 0.001, 10)`, which are computed as the scan runs instead of being stored.
     prop : str
         String that indicates the property of the device(s) to be changed
     dt : float
         Wait time in seconds after changing a single property value, and before the measure_function
         is called. Used by experiment classes, defaults to 0.
+    parallel : bool
+        If True, the devices are set concurrently by a thread pool, and `dt` starts once all of them
+        are set. Only use with devices that can be written to independently, e.g. on separate
+        interfaces. A `PropertyScanError` reports the devices that failed. Defaults to False.
     '''
 
-    def __init__(self, input_dict, prop, dt=0):
+    def __init__(self, input_dict, prop, dt=0, parallel=False):
         '''
         Constructor method
         '''
@@ -51,6 +95,7 @@ class PropertyScan(AbstractScan):
         self.device_names = list(input_dict.keys())
 
         self.dt = dt
+        self.parallel = parallel
         self.i = 0
 
         self.check_same_length()
@@ -58,6 +103,7 @@ class PropertyScan(AbstractScan):
     def iterate(self, expt, i, d):
         '''
         Changes `prop` of the listed `devices` to the value of `PropertyScan`'s input_dict at the given `index`.
+        If `parallel` is True, the devices are set concurrently.
 
         :param index: The index of the data array
         :param devices: ItemAttribute instance of experimental devices
@@ -69,10 +115,34 @@ class PropertyScan(AbstractScan):
         if d == 0:
             return 0
 
-        for dev in self.device_names:
+        if self.parallel and (len(self.device_names) > 1):
+            self.set_parallel(expt, i)
+        else:
+            for dev in self.device_names:
+                expt.devices[dev][self.prop] = self.scan_dict[dev + '_' + self.prop][i]
+
+        interruptible_sleep(self.dt, expt.cancel_event)
+
+    def set_parallel(self, expt, i):
+        '''
+        Sets `prop` of all devices to their values at index `i` concurrently, and waits until all are set.
+        Raises a `PropertyScanError` with the exception of each device that failed.
+        '''
+
+        def set_device(dev):
             expt.devices[dev][self.prop] = self.scan_dict[dev + '_' + self.prop][i]
 
-        sleep(self.dt)
+        executor = get_set_executor()
+        futures = {dev: executor.submit(set_device, dev) for dev in self.device_names}
+
+        errors = {}
+        for dev, future in futures.items():
+            error = future.exception()
+            if error is not None:
+                errors[dev] = error
+
+        if len(errors) > 0:
+            raise PropertyScanError(self.prop, errors) from list(errors.values())[0]
 
     def check_same_length(self):
         '''
@@ -103,8 +173,9 @@ class FunctionScan(AbstractScan):
     ----------
     function : func
         Function to be applied during each iteration. Must take a single argument representing one
-        item in the `values` array. The function's return value is not used.
-    values : list
+        item in the `values` array. The function's return value is not used. It can be an `async def`
+        function, which is awaited by the experiment's event loop, see `.Experiment.run_async`.
+    values : list or ps.ScanValues
         An array of values to run the function on.
     dt: float
         Wait time in seconds after running `function` once, and before the ``runinfo.measure_function``
@@ -115,7 +186,10 @@ class FunctionScan(AbstractScan):
 
         self.scan_dict = {}
 
-        self.scan_dict[function.__name__] = np.array(values)
+        if isinstance(values, ScanValues):
+            self.scan_dict[function.__name__] = values
+        else:
+            self.scan_dict[function.__name__] = np.array(values)
 
         self.function = function
         self.dt = dt
@@ -140,8 +214,18 @@ class FunctionScan(AbstractScan):
         if d == 0:
             return 0
 
-        self.function(self.scan_dict[self.function.__name__][i])
-        sleep(self.dt)
+        result = self.function(self.scan_dict[self.function.__name__][i])
+        if isawaitable(result):
+            # an async function is awaited by the experiment's event loop, followed by dt
+            return self.await_function(result, expt.cancel_event)
+        interruptible_sleep(self.dt, expt.cancel_event)
+
+    async def await_function(self, result, cancel_event=None):
+        '''
+        Awaits the result of an `async def` function, then waits `dt` or until `cancel_event` is set
+        '''
+        await result
+        await asyncio.get_running_loop().run_in_executor(None, interruptible_sleep, self.dt, cancel_event)
 
     def check_same_length(self):
         pass
@@ -190,7 +274,7 @@ class RepeatScan(AbstractScan):
         if d == 0:
             return 0
 
-        sleep(self.dt)
+        interruptible_sleep(self.dt, expt.cancel_event)
 
     def check_same_length(self):
         '''
@@ -216,15 +300,25 @@ class ContinuousScan(AbstractScan):
         Wait time in seconds after each iteration. Used by experiment classes, defaults to 0.
     n_max : int, optional
         Maximum number of iterations to run. If not specified, the scan will run indefinitely.
+    n_retain : int, optional
+        If specified, only the last `n_retain` iterations are kept in the experiment's memory, while all
+        iterations are still saved to the hdf5 file. Defaults to None, which keeps every iteration.
     '''
 
-    def __init__(self, n_max=None, dt=0):
+    def __init__(self, n_max=None, dt=0, n_retain=None):
 
         assert n_max is None or isinstance(n_max, int), "n_max must be an int or None"
-        assert n_max > 0, "n_max must be > 0 or None"
+        assert n_max is None or n_max > 0, "n_max must be > 0 or None"
+        assert n_retain is None or (isinstance(n_retain, int) and n_retain > 0), "n_retain must be an int > 0 or None"
 
         self.scan_dict = {}
         self.scan_dict['iteration'] = np.ndarray((0))
+        if n_retain is None:
+            self.iteration_buffer = GrowableArray(self.scan_dict['iteration'])
+        else:
+            self.iteration_buffer = RingBuffer(self.scan_dict['iteration'], n_retain)
+
+        self.n_retain = n_retain
 
         self.device_names = ['iteration']
         self.dt = dt
@@ -242,13 +336,15 @@ class ContinuousScan(AbstractScan):
         if d == 0:
             return 0
 
-        self.scan_dict['iteration'] = np.append(self.scan_dict['iteration'], i)
+        self.iteration_buffer.append(i)
+        self.scan_dict['iteration'] = self.iteration_buffer.array
         expt.iteration = self.scan_dict['iteration']
 
-        sleep(self.dt)
+        interruptible_sleep(self.dt, expt.cancel_event)
 
         if self.n == self.n_max:
-            expt.stop()
+            # the last iteration's first point is still measured
+            expt.stop(interrupt=False)
 
     def iterator(self):
         '''
@@ -262,7 +358,10 @@ class ContinuousScan(AbstractScan):
 
 class AverageScan(AbstractScan):
     '''
-    Class for averaging inner loops.
+    Class for averaging inner loops. The experiment saves the mean of each measured key over the repeats,
+    with its sample standard deviation as `<key>_std`, its standard error as `<key>_sem`, and the number
+    of repeats averaged at each point as `average_count`. Only the running statistics are kept, not the
+    individual repeats, see `Experiment.rolling_average`.
 
     Parameters
     ----------
@@ -294,7 +393,7 @@ class AverageScan(AbstractScan):
         if d == 0:
             return 0
 
-        sleep(self.dt)
+        interruptible_sleep(self.dt, expt.cancel_event)
 
     def check_same_length(self):
         '''
@@ -307,3 +406,465 @@ class AverageScan(AbstractScan):
         The following iterates over n
         '''
         return range(self.n)
+
+
+class SweepScan(AbstractScan):
+    '''
+    Class for scanning the innermost axis as one hardware-timed sweep: an `.Agilent33500` plays the
+    values as an arbitrary waveform while a `.Stanford830` records its buffer at the same sample rate.
+    Must be scan0. At the first point of each line, the lock-in buffer is armed, the sweep is triggered,
+    and the whole line is read from the buffer at once. The other points of the line only index the
+    values that were read, so a line takes one set of GPIB transfers instead of a set and a query per point.
+    The waveform is uploaded once per experiment. Inherits from `pyscan.measurement.scans.AbstractScan`.
+
+    The measure function reads the buffered values of the current point with `point()`, e.g.
+    `runinfo.measure_function = lambda expt: expt.runinfo.scan0.point()`.
+
+    Parameters
+    ----------
+    input_dict : dict{string:array}
+        Name of the `.Agilent33500` device and the voltages to sweep, e.g. {'awg': ps.drange(0, 0.01, 1)}
+    lockin : str
+        Name of the `.Stanford830` device that records the buffer
+    sample_rate : float
+        Sample rate in Hz of both the waveform and the lock-in buffer, one of the lock-in's sample rates
+    channels : dict{string:int}
+        Names of the buffered values and their lock-in buffer channels, defaults to {'x': 1, 'y': 2}
+    prop : str
+        Name of the swept property, used to save the values as `<device>_<prop>`, defaults to 'voltage'
+    trigger : func, optional
+        Function that starts the sweep and the buffer, called with the experiment. Defaults to None,
+        which starts the lock-in buffer and then sends a bus trigger to the waveform generator.
+    timeout : float, optional
+        Time in seconds to wait for the buffer beyond the sweep time, defaults to 1.
+    dt : float
+        Wait time in seconds after each sweep, defaults to 0.
+    '''
+
+    def __init__(self, input_dict, lockin, sample_rate, channels=None, prop='voltage', trigger=None,
+                 timeout=1, dt=0):
+        assert len(input_dict) == 1, 'SweepScan sweeps the values of a single device'
+
+        self.prop = prop
+        self.scan_dict = {}
+        for device, array in input_dict.items():
+            self.scan_dict['{}_{}'.format(device, prop)] = np.asarray(array, dtype=float)
+
+        self.device_names = list(input_dict.keys())
+        self.lockin = lockin
+        self.sample_rate = sample_rate
+        self.channels = {'x': 1, 'y': 2} if channels is None else channels
+        self.trigger = trigger
+        self.timeout = timeout
+
+        self.dt = dt
+        self.i = 0
+
+        self.data = ItemAttribute()
+        self.loaded = None
+
+        self.check_same_length()
+
+    def iterate(self, expt, i, d):
+        '''
+        Sweeps the whole line at its first point, then selects the buffered values of point `i`.
+        '''
+
+        self.i = i
+
+        if (i == 0) and (d != 0):
+            self.sweep(expt)
+
+    def sweep(self, expt):
+        '''
+        Plays the sweep and reads the lock-in buffer into `data`, uploading the waveform and setting up
+        the buffer first if this is the first sweep of the experiment.
+        '''
+
+        source = expt.devices[self.device_names[0]]
+        lockin = expt.devices[self.lockin]
+        values = self.scan_dict['{}_{}'.format(self.device_names[0], self.prop)]
+
+        # upload once per experiment, each experiment has a new file_name
+        if self.loaded != expt.runinfo.file_name:
+            lockin.set_buffer_mode(self.sample_rate)
+            source.sweep_mode(values, self.sample_rate)
+            if self.trigger is None:
+                source.trigger_source = 'BUS'
+            self.loaded = expt.runinfo.file_name
+
+        # arm
+        lockin.wait_for_trigger()
+
+        if self.trigger is None:
+            lockin.start()
+            source.trigger()
+        else:
+            self.trigger(expt)
+
+        # a stopped experiment does not save the line, so the buffer is left as it is
+        if interruptible_sleep(self.n / self.sample_rate, expt.cancel_event):
+            lockin.pause()
+            return
+        deadline = monotonic() + self.timeout
+        while lockin.buffer_points < self.n:
+            if monotonic() > deadline:
+                lockin.pause()
+                raise TimeoutError('The lock-in buffer has {} of {} points'.format(lockin.buffer_points, self.n))
+            if interruptible_sleep(0.01, expt.cancel_event):
+                lockin.pause()
+                return
+        lockin.pause()
+
+        data = ItemAttribute()
+        for name, channel in self.channels.items():
+            data[name] = lockin.read_binary_buffer(channel, 0, self.n)
+        self.data = data
+
+        interruptible_sleep(self.dt, expt.cancel_event)
+
+    def point(self):
+        '''
+        Returns an ItemAttribute with the buffered values of the current point
+
+        Returns
+        -------
+        ItemAttribute
+        '''
+        d = ItemAttribute()
+        for name, values in self.data.items():
+            d[name] = values[self.i]
+        return d
+
+    def check_same_length(self):
+        '''
+        Sets `n` to the number of swept values
+        '''
+        self.n = len(list(self.scan_dict.values())[0])
+
+    def iterator(self):
+        '''
+        The following iterates over n
+        '''
+        return range(self.n)
+
+
+class AdaptiveScan(AbstractScan):
+    '''
+    Class for scanning one or two properties with the points concentrated where the measured signal changes,
+    e.g. on the lines of a resonance or ESR spectrum, instead of on a uniform grid. Must be the only scan.
+    Inherits from `pyscan.measurement.scans.AbstractScan`.
+
+    The scan starts with a coarse grid of `n_initial` values per device, then repeatedly splits the cell of
+    samples with the largest error estimate of the measured `key` in half along each axis and measures the new
+    points, until `n_max` points have been measured. In coordinates scaled to [0, 1], the error of a cell is
+
+    - 'gradient': sqrt(size**2 + dz**2), where size is the length of the cell's diagonal and dz the spread
+      of the values at its corners, i.e. the length of a 1D interval on the measured curve
+    - 'curvature': size + the largest deviation of the values measured when the cell was made from the
+      linear interpolation of its parent cell, so that straight slopes are sampled like flat regions
+
+    Samples are measured and saved in the order they are chosen, so the experiment's datasets are an
+    unstructured sample table: `<device>_<prop>` hold the coordinates of each sample and the measured
+    datasets its data. At the end of the run the samples are interpolated on a regular grid of `grid_size`
+    points per device, see `grid()`, which is saved to the '_grid' group of the hdf5 file.
+
+    Parameters
+    ----------
+    input_dict : dict{string:tuple}
+        One or two key:value pairs of device names and the (start, stop) range of `prop` to scan
+    prop : str
+        String that indicates the property of the device(s) to be changed
+    n_max : int
+        Number of points to measure
+    key : str, optional
+        Measured value used to estimate the errors, defaults to the first key returned by the measure function.
+        Values with more than one number per point are refined on their norm.
+    n_initial : int
+        Number of values per device of the initial grid, defaults to 5
+    loss : str
+        Error estimate, 'gradient' (default) or 'curvature'
+    grid_size : int
+        Number of points per device of the interpolated grid, defaults to 201
+    dt : float
+        Wait time in seconds after setting each point, defaults to 0.
+    '''
+
+    # number of times the cells of the initial grid can be halved
+    max_depth = 20
+
+    def __init__(self, input_dict, prop, n_max, key=None, n_initial=5, loss='gradient', grid_size=201, dt=0):
+        assert len(input_dict) in [1, 2], 'AdaptiveScan scans one or two devices'
+        assert loss in ['gradient', 'curvature'], "AdaptiveScan loss must be 'gradient' or 'curvature'"
+        assert isinstance(n_initial, int) and (n_initial >= 2), 'n_initial must be an int >= 2'
+        assert isinstance(n_max, int) and (n_max >= n_initial ** len(input_dict)), \
+            'n_max must be an int of at least the {} points of the initial grid'.format(n_initial ** len(input_dict))
+
+        self.prop = prop
+        self.scan_dict = {}
+        self.ranges = []
+        for device, (start, stop) in input_dict.items():
+            self.scan_dict['{}_{}'.format(device, prop)] = np.full(n_max, np.nan)
+            self.ranges.append((start, stop))
+
+        self.device_names = list(input_dict.keys())
+        self.n_axes = len(input_dict)
+        self.key = key
+        self.n_initial = n_initial
+        self.loss = loss
+        self.grid_size = grid_size
+        self.dt = dt
+
+        # lattice coordinates of every value that the refinement can reach
+        self.lattice_size = (n_initial - 1) * 2 ** self.max_depth
+
+        self.i = 0
+        self.n = n_max
+
+        self.reset()
+
+    def reset(self):
+        '''
+        Clears the samples, cells and saved coordinates, and queues the points of the initial grid
+        '''
+        for values in self.scan_dict.values():
+            values[:] = np.nan
+
+        self.points = []
+        self.samples = {}
+        self.queue = []
+        self.new_points = []
+
+        m = 2 ** self.n_axes
+        self.cells = GrowableArray(np.zeros((0, 2 * self.n_axes)))
+        self.corners = GrowableArray(np.zeros((0, m)))
+        self.errors = GrowableArray(np.zeros(0))
+        self.active = GrowableArray(np.zeros(0))
+
+        step = 2 ** self.max_depth
+        ticks = [k * step for k in range(self.n_initial)]
+        if self.n_axes == 1:
+            for u in ticks:
+                self.sample_index((u,))
+            for u0, u1 in zip(ticks[:-1], ticks[1:]):
+                self.add_cell((u0, u1), [self.samples[u0], self.samples[u1]])
+        else:
+            for v in ticks:
+                for u in ticks:
+                    self.sample_index((u, v))
+            for v0, v1 in zip(ticks[:-1], ticks[1:]):
+                for u0, u1 in zip(ticks[:-1], ticks[1:]):
+                    self.add_cell((u0, u1, v0, v1), [self.sample_index(p) for p in [(u0, v0), (u1, v0), (u0, v1), (u1, v1)]])
+
+    def sample_index(self, point):
+        '''
+        Returns the index of the sample at lattice coordinates `point`, queueing it if it is new
+        '''
+        key = point[0] if self.n_axes == 1 else point[0] * (self.lattice_size + 1) + point[1]
+        if key not in self.samples:
+            self.samples[key] = len(self.points)
+            self.points.append(point)
+            self.queue.append(point)
+        return self.samples[key]
+
+    def add_cell(self, bounds, corners, error=np.nan):
+        '''
+        Adds a cell with lattice bounds (u0, u1[, v0, v1]) and the sample indicies of its corners
+        '''
+        self.cells.append(bounds)
+        self.corners.append(corners)
+        self.errors.append(error)
+        self.active.append(1)
+
+    def iterate(self, expt, i, d):
+        '''
+        Sets the devices to the next queued point, refining the cell with the largest error first if the
+        queue is empty. Stops the experiment if every cell is as small as the refinement allows.
+        '''
+
+        self.i = i
+
+        if d == 0:
+            return 0
+
+        if i == 0:
+            self.reset()
+
+        if (len(self.queue) == 0) and (not self.refine(expt)):
+            expt.stop()
+            return
+
+        point = self.queue.pop(0)
+        for axis, (name, dev) in enumerate(zip(self.scan_dict.keys(), self.device_names)):
+            start, stop = self.ranges[axis]
+            value = start + (stop - start) * point[axis] / self.lattice_size
+            self.scan_dict[name][i] = value
+            expt.devices[dev][self.prop] = value
+
+        # the scan's datasets are created with the first point
+        if i > 0:
+            with expt.open_file() as f:
+                for name, values in self.scan_dict.items():
+                    f[name][i] = values[i]
+
+        interruptible_sleep(self.dt, expt.cancel_event)
+
+    def values(self, expt, n):
+        '''
+        Returns the measured `key` of the first `n` samples as a 1D array
+        '''
+        key = expt.runinfo.measured[0] if self.key is None else self.key
+        assert key in expt.runinfo.measured, 'AdaptiveScan key {} is not measured'.format(key)
+
+        values = np.asarray(expt[key], dtype=float)[:n]
+        if values.ndim > 1:
+            values = np.linalg.norm(values.reshape(n, -1), axis=1)
+        return values
+
+    def refine(self, expt):
+        '''
+        Splits the cell with the largest error and queues its new points
+
+        Returns
+        -------
+        bool
+            False if no cell can be split
+        '''
+        values = self.values(expt, self.i)
+
+        # the errors of the last split's cells, now that their points are measured
+        for child, predictions in self.new_points:
+            deviations = [abs(values[s] - np.mean(values[p])) for s, p in predictions]
+            self.errors.array[child] = np.max(deviations)
+        self.new_points = []
+
+        span = np.nanmax(values) - np.nanmin(values) if np.any(np.isfinite(values)) else 0
+        if not (np.isfinite(span) and (span > 0)):
+            span = 1
+
+        cells = self.cells.array
+        z = values[self.corners.array.astype(int)]
+        with np.errstate(invalid='ignore'):
+            dz = (np.nanmax(z, axis=1) - np.nanmin(z, axis=1)) / span
+        widths = cells[:, 1::2] - cells[:, 0::2]
+        size = np.sqrt(np.sum((widths / self.lattice_size) ** 2, axis=1))
+
+        if self.loss == 'gradient':
+            loss = np.sqrt(size ** 2 + dz ** 2)
+        else:
+            # cells of the initial grid have no parent to compare with
+            errors = np.where(np.isnan(self.errors.array), dz * span, self.errors.array)
+            loss = size + errors / span
+
+        # cells with unmeasured values are refined by size only
+        loss = np.where(np.isfinite(loss), loss, size)
+        loss[(self.active.array == 0) | np.any(widths < 2, axis=1)] = -1
+
+        j = int(np.argmax(loss))
+        if loss[j] < 0:
+            return False
+        self.split(j)
+        return True
+
+    def split(self, j):
+        '''
+        Replaces cell `j` by its halves (1D) or quarters (2D), and queues their new points
+        '''
+        self.active.array[j] = 0
+        bounds = [int(u) for u in self.cells.array[j]]
+        corners = [int(c) for c in self.corners.array[j]]
+
+        if self.n_axes == 1:
+            u0, u1 = bounds
+            um = (u0 + u1) // 2
+            m = self.sample_index((um,))
+            children = [((u0, um), [corners[0], m]), ((um, u1), [m, corners[1]])]
+            predictions = [(m, corners)]
+        else:
+            u0, u1, v0, v1 = bounds
+            um, vm = (u0 + u1) // 2, (v0 + v1) // 2
+            c00, c10, c01, c11 = corners
+            bottom, left, centre = self.sample_index((um, v0)), self.sample_index((u0, vm)), self.sample_index((um, vm))
+            right, top = self.sample_index((u1, vm)), self.sample_index((um, v1))
+            children = [((u0, um, v0, vm), [c00, bottom, left, centre]),
+                        ((um, u1, v0, vm), [bottom, c10, centre, right]),
+                        ((u0, um, vm, v1), [left, centre, c01, top]),
+                        ((um, u1, vm, v1), [centre, right, top, c11])]
+            predictions = [(bottom, [c00, c10]), (left, [c00, c01]), (centre, corners),
+                           (right, [c10, c11]), (top, [c01, c11])]
+
+        for child_bounds, child_corners in children:
+            self.add_cell(child_bounds, child_corners)
+            child = len(self.errors) - 1
+            # the deviations of the new points at the child's corners
+            self.new_points.append((child, [(s, p) for s, p in predictions if s in child_corners]))
+
+    def grid(self, expt):
+        '''
+        Interpolates the measured samples on a regular grid of `grid_size` points per device. In 1D the
+        samples are interpolated linearly. In 2D each cell whose corners were measured is interpolated
+        bilinearly, smaller cells replacing the larger cells they were split from.
+
+        Parameters
+        ----------
+        expt : ps.Experiment
+            The experiment that ran the scan
+
+        Returns
+        -------
+        ItemAttribute
+            The grid values of each device, `<device>_<prop>`, and the gridded values of each measured key,
+            with shape (grid_size[, grid_size], ...)
+        '''
+        # the points that were set, the queued points were not reached
+        n = min(len(self.points) - len(self.queue), self.n)
+        lattice = np.linspace(0, self.lattice_size, self.grid_size)
+
+        grid = ItemAttribute()
+        for axis, name in enumerate(self.scan_dict.keys()):
+            start, stop = self.ranges[axis]
+            grid[name] = start + (stop - start) * lattice / self.lattice_size
+
+        points = np.array(self.points[:n], dtype=float).reshape(n, self.n_axes)
+        for key in expt.runinfo.measured:
+            values = np.asarray(expt[key], dtype=float)[:n]
+            shape = values.shape[1:]
+            values = values.reshape(n, -1)
+            valid = np.all(np.isfinite(values), axis=1)
+
+            if self.n_axes == 1:
+                order = np.argsort(points[valid, 0])
+                x = points[valid, 0][order]
+                gridded = np.full((self.grid_size, values.shape[1]), np.nan)
+                if len(x) > 0:
+                    for column in range(values.shape[1]):
+                        gridded[:, column] = np.interp(lattice, x, values[valid, column][order])
+                grid[key] = gridded.reshape((self.grid_size, *shape))
+            else:
+                gridded = np.full((self.grid_size, self.grid_size, values.shape[1]), np.nan)
+                for bounds, corners in zip(self.cells.array, self.corners.array.astype(int)):
+                    if np.any(corners >= n) or (not np.all(valid[corners])):
+                        continue
+                    u0, u1, v0, v1 = bounds
+                    iu = slice(np.searchsorted(lattice, u0, 'left'), np.searchsorted(lattice, u1, 'right'))
+                    iv = slice(np.searchsorted(lattice, v0, 'left'), np.searchsorted(lattice, v1, 'right'))
+                    tu = ((lattice[iu] - u0) / (u1 - u0))[:, np.newaxis, np.newaxis]
+                    tv = ((lattice[iv] - v0) / (v1 - v0))[np.newaxis, :, np.newaxis]
+                    z00, z10, z01, z11 = values[corners]
+                    gridded[iu, iv] = (z00 * (1 - tu) * (1 - tv) + z10 * tu * (1 - tv)
+                                       + z01 * (1 - tu) * tv + z11 * tu * tv)
+                grid[key] = gridded.reshape((self.grid_size, self.grid_size, *shape))
+
+        return grid
+
+    def check_same_length(self):
+        '''
+        Not used, the scan has `n_max` points
+        '''
+        return 1
+
+    def iterator(self):
+        '''
+        The following iterates over n_max
+        '''
+        return range(self.n)
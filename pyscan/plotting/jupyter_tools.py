@@ -1,10 +1,39 @@
 import os
-import glob
+import re
 from pathlib import Path
 from ipywidgets import get_ipython
 import pyscan as ps
 
 
+def modified_times(directory):
+    '''
+    Returns the latest modification time of each dataset in a directory and its rotated parts, listing the
+    directory once
+
+    Parameters
+    ----------
+    directory : str or Path
+
+    Returns
+    -------
+    dict
+        {stem of the dataset's first part: modification time}, only for datasets whose first part exists
+    '''
+    part = re.compile(r'-part\d{3}$')
+    times = {}
+    first_parts = set()
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if (not entry.name.endswith('.hdf5')) or (not entry.is_file()):
+                continue
+            stem = entry.name[:-len('.hdf5')]
+            base = part.sub('', stem)
+            if base == stem:
+                first_parts.add(stem)
+            times[base] = max(times.get(base, 0), entry.stat().st_mtime)
+    return {stem: time for stem, time in times.items() if stem in first_parts}
+
+
 class JupyterTools(object):
     '''
     Utility class for loading plotting data in jupyter notebooks
@@ -28,20 +57,36 @@ class JupyterTools(object):
         self.default_vrange = [-0.02, 0.02]
         self.plot_size = None
 
-    def get_last_scan_name(self):
+    def get_last_file(self):
         '''
-        Finds most recent dataset in self.path_name
+        Returns the path of the most recently modified dataset in self.path_name. The parts of a rotated
+        dataset count as its first part. The directory's `ps.Catalog` entry is returned if it is that
+        dataset, so files missing from the catalog (e.g. saved with `runinfo.catalog = False` or copied in)
+        are still found.
         '''
         if self.path_name[-1] == '/':
             self.path_name = self.path_name[0:-1]
 
-        newest = max(glob.iglob('{}/{}'.format(
-            self.path_name, '*.hdf5')), key=os.path.getctime)
+        times = modified_times(self.path_name)
+        newest = max(times, key=times.get)
 
-        file_name = newest.replace(self.path_name + '\\', '')
-        file_name = file_name.split('.')[0]
+        catalog = ps.Catalog(self.path_name)
+        if catalog.path.is_file():
+            last = catalog.last()
+            if (last is not None) and Path(last.path).is_file():
+                # the catalog's entry is returned unless a dataset was modified after it
+                stem = Path(last.path).stem
+                last_time = times[stem] if stem in times else os.path.getmtime(last.path)
+                if not any(time > last_time for time in times.values()):
+                    return last.path
 
-        return file_name
+        return str(Path(self.path_name) / (newest + '.hdf5'))
+
+    def get_last_scan_name(self):
+        '''
+        Finds most recent dataset in self.path_name
+        '''
+        return Path(self.get_last_file()).stem
 
     def load_last_scan(self):
         '''
@@ -52,17 +97,7 @@ class JupyterTools(object):
         ItemAttribute
         '''
 
-        if self.path_name[-1] == '/':
-            self.path_name = self.path_name[0:-1]
-        newest = max(glob.iglob('{}/{}'.format(
-            self.path_name, '*.hdf5')), key=os.path.getctime)
-
-        file_name = newest.replace(self.path_name + '\\', '')
-        file_name = file_name[0:-4]
-
-        file_name = str(Path(self.path_name) / Path(file_name))
-
-        self.last_scan = ps.load_experiment(file_name)
+        self.last_scan = ps.load_experiment(self.get_last_file())
 
         return self.last_scan
 
@@ -0,0 +1,60 @@
+'''
+Pytest functions to test the async wrappers of InstrumentDriver
+'''
+
+from pyscan.drivers.testing.test_voltage import TestVoltage
+from time import perf_counter, sleep
+import asyncio
+
+
+class SlowVoltage(TestVoltage):
+    '''
+    TestVoltage that takes 0.1 s to answer a query
+    '''
+
+    __test__ = False
+
+    def query(self, string):
+        sleep(0.1)
+        return super().query(string)
+
+
+def test_async_query():
+    v1 = TestVoltage()
+    v1.voltage = 2
+
+    assert asyncio.run(v1.async_query('VOLT?')) == '2'
+    assert asyncio.run(v1.async_get('voltage')) == 2.0
+
+    asyncio.run(v1.async_set('voltage', 3))
+    assert v1.voltage == 3
+
+    assert asyncio.run(v1.async_write('VOLT 4')) is None
+
+
+def test_async_queries_of_different_instruments_overlap():
+    devices = [SlowVoltage() for _ in range(3)]
+
+    async def read_all():
+        return await asyncio.gather(*[v.async_get('voltage') for v in devices])
+
+    t0 = perf_counter()
+    values = asyncio.run(read_all())
+    elapsed = perf_counter() - t0
+
+    assert values == [0.0, 0.0, 0.0]
+    assert elapsed < 0.25
+
+
+def test_async_queries_of_one_instrument_are_serialized():
+    v1 = SlowVoltage()
+
+    async def read_twice():
+        return await asyncio.gather(v1.async_query('VOLT?'), v1.async_query('VOLT?'))
+
+    t0 = perf_counter()
+    values = asyncio.run(read_twice())
+    elapsed = perf_counter() - t0
+
+    assert values == ['0', '0']
+    assert elapsed >= 0.2
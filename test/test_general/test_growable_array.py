@@ -0,0 +1,44 @@
+import pyscan as ps
+import numpy as np
+import pytest
+
+
+def test_growable_array_append_1D():
+    array = ps.GrowableArray(np.array([]))
+    for i in range(9):
+        array.append(i)
+
+    assert len(array) == 9
+    assert array.capacity == 16
+    assert np.allclose(array.array, np.arange(9))
+    assert np.allclose(np.asarray(array), np.arange(9))
+    assert np.all(np.isnan(array.buffer[9:]))
+
+
+@pytest.mark.parametrize('axis', [0, 1])
+def test_growable_array_resize_axis(axis):
+    initial = np.zeros((2, 1, 3)) if axis == 1 else np.zeros((1, 2, 3))
+    array = ps.GrowableArray(initial, axis=axis)
+
+    array.resize(5)
+
+    assert array.array.shape[axis] == 5
+    assert array.capacity == 8
+    assert np.all(array.array[array.index(0)] == 0)
+    assert np.all(np.isnan(array.array[array.index(slice(1, None))]))
+
+
+def test_growable_array_view_shares_buffer():
+    array = ps.GrowableArray(np.zeros(3))
+    view = array.array
+    view[1] = 5
+
+    assert array.buffer[1] == 5
+
+
+def test_growable_array_shrink():
+    array = ps.GrowableArray(np.arange(4))
+    array.resize(2)
+
+    assert np.allclose(array.array, [0, 1])
+    assert array.capacity == 4
@@ -0,0 +1,43 @@
+import pyscan as ps
+
+from threading import Event, Timer
+from time import perf_counter
+
+
+def test_interruptible_sleep():
+    t0 = perf_counter()
+    assert ps.interruptible_sleep(0.05) is False
+    assert perf_counter() - t0 >= 0.05
+
+    assert ps.interruptible_sleep(0) is False
+
+
+def test_interruptible_sleep_interrupted():
+    cancel_event = Event()
+    timer = Timer(0.05, cancel_event.set)
+    timer.start()
+    try:
+        t0 = perf_counter()
+        assert ps.interruptible_sleep(5, cancel_event) is True
+        assert perf_counter() - t0 < 1
+
+        # waits return immediately until the event is cleared
+        assert ps.interruptible_sleep(5, cancel_event) is True
+        assert ps.interruptible_sleep(0, cancel_event) is True
+    finally:
+        timer.join()
+
+    # waits without an event are not interrupted
+    assert ps.interruptible_sleep(0.01) is False
+
+
+def test_bind_cancel_event():
+    device = ps.TestVoltage()
+    cancel_event = Event()
+    assert ps.device_cancel_event(device) is None
+
+    ps.bind_cancel_event(device, cancel_event)
+    assert ps.device_cancel_event(device) is cancel_event
+
+    ps.bind_cancel_event(device, None)
+    assert ps.device_cancel_event(device) is None
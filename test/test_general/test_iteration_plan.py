@@ -0,0 +1,117 @@
+import pyscan as ps
+import pytest
+
+from itertools import islice
+
+
+@pytest.mark.parametrize('dims', [(5,), (3, 4), (2, 3, 4), (1, 3), (3, 1, 2), (2, 2, 2, 2)])
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 2**16])
+def test_iteration_plan_matches_delta_product(dims, chunk_size):
+    iterators = [range(n) for n in dims]
+
+    plan = ps.IterationPlan(iterators, chunk_size=chunk_size)
+    expected = list(ps.delta_product(iterators))
+
+    assert len(plan) == len(expected)
+    assert list(plan) == expected
+    assert plan.dims == dims
+
+
+@pytest.mark.parametrize('dims', [(1,), (3, 1), (2, 3, 1)])
+@pytest.mark.parametrize('chunk_size', [1, 4, 2**16])
+def test_iteration_plan_continuous(dims, chunk_size):
+    iterators = [range(n) for n in dims]
+    n = 50
+
+    plan = ps.IterationPlan(iterators, continuous=True, chunk_size=chunk_size)
+    expected = list(islice(ps.delta_product(iterators, True), n))
+
+    assert plan.n is None
+    assert plan.dims[-1] is None
+    assert list(islice(plan, n)) == expected
+
+    with pytest.raises(AssertionError):
+        len(plan)
+
+
+def test_iteration_plan_continuous_n_max():
+    # a continuous scan with n_max is a normal loop
+    iterators = [range(3), range(4)]
+
+    plan = ps.IterationPlan(iterators, continuous=True, chunk_size=5)
+
+    assert plan.n == 12
+    assert list(plan) == list(ps.delta_product(iterators, True))
+
+
+def test_iteration_plan_types():
+    plan = ps.IterationPlan([range(2), range(2)])
+
+    for indicies, deltas in plan:
+        assert type(indicies) is tuple
+        assert all(type(i) is int for i in indicies)
+        assert all(type(d) is int for d in deltas)
+
+
+def test_iteration_plan_chunk():
+    plan = ps.IterationPlan([range(3), range(2)])
+
+    indicies, deltas = plan.chunk(2, 5)
+
+    assert indicies.tolist() == [[2, 0], [0, 1], [1, 1]]
+    assert deltas.tolist() == [[1, 0], [-1, 1], [1, 0]]
+
+
+def test_iteration_plan_requires_ranges():
+    with pytest.raises(AssertionError):
+        ps.IterationPlan([[0, 1, 2]])
+
+    with pytest.raises(AssertionError):
+        ps.IterationPlan([range(1, 3)])
+
+
+@pytest.mark.parametrize('dims', [(4, 3), (3, 2), (2, 3, 4), (3, 3, 2, 2)])
+@pytest.mark.parametrize('chunk_size', [1, 5, 2**16])
+def test_iteration_plan_serpentine(dims, chunk_size):
+    plan = ps.IterationPlan([range(n) for n in dims], chunk_size=chunk_size, serpentine=True)
+    points = list(plan)
+
+    indicies = [p[0] for p in points]
+    assert sorted(indicies) == sorted(i for i, d in ps.delta_product([range(n) for n in dims]))
+    assert points[0] == ((0,) * len(dims), (-1,) * len(dims))
+
+    for (last, _), (current, deltas) in zip(points[:-1], points[1:]):
+        steps = [c - la for c, la in zip(current, last)]
+        # exactly one index moves, by one step
+        assert sorted(abs(s) for s in steps) == [0] * (len(dims) - 1) + [1]
+        assert list(deltas) == steps
+
+
+def test_iteration_plan_serpentine_2D_order():
+    plan = ps.IterationPlan([range(3), range(2)], serpentine=True)
+
+    assert [i for i, d in plan] == [(0, 0), (1, 0), (2, 0), (2, 1), (1, 1), (0, 1)]
+
+
+def test_iteration_plan_serpentine_continuous():
+    plan = ps.IterationPlan([range(2), range(1)], continuous=True, serpentine=True)
+
+    assert [i for i, d in islice(plan, 6)] == [(0, 0), (1, 0), (1, 1), (0, 1), (0, 2), (1, 2)]
+
+
+@pytest.mark.parametrize('serpentine', [False, True])
+@pytest.mark.parametrize('dims', [(), (4,), (4, 3), (2, 3, 4)])
+def test_iteration_plan_points_and_position(dims, serpentine):
+    plan = ps.IterationPlan([range(n) for n in dims], chunk_size=5, serpentine=serpentine)
+    points = list(plan)
+
+    for position, (indicies, deltas) in enumerate(points):
+        assert plan.position(indicies) == position
+
+        resumed = list(plan.points(position))
+        assert [i for i, d in resumed] == [i for i, d in points[position:]]
+        # a resumed plan sets every scan at its first point
+        assert resumed[0][1] == (-1,) * len(dims)
+        assert resumed[1:] == points[position + 1:]
+
+    assert list(plan.points(len(points))) == []
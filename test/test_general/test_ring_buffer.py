@@ -0,0 +1,57 @@
+import pyscan as ps
+import numpy as np
+import pytest
+
+
+def test_ring_buffer_append_1D():
+    array = ps.RingBuffer(np.array([]), 4)
+    for i in range(3):
+        array.append(i)
+
+    assert len(array) == 3
+    assert array.offset == 0
+    assert np.allclose(array.array, [0, 1, 2])
+
+    for i in range(3, 11):
+        array.append(i)
+        assert np.allclose(array.array, np.arange(max(0, i - 3), i + 1))
+
+    assert len(array) == 4
+    assert array.length == 11
+    assert array.offset == 7
+    assert np.allclose(np.asarray(array), [7, 8, 9, 10])
+    assert array.buffer.shape == (8,)
+
+
+def test_ring_buffer_initial_values():
+    array = ps.RingBuffer(np.arange(6), 4)
+
+    assert array.length == 6
+    assert np.allclose(array.array, [2, 3, 4, 5])
+
+
+@pytest.mark.parametrize('axis', [0, 1])
+def test_ring_buffer_resize_axis(axis):
+    initial = np.zeros((2, 0, 3)) if axis == 1 else np.zeros((0, 2, 3))
+    array = ps.RingBuffer(initial, 3, axis=axis)
+
+    for i in range(7):
+        array.resize(i + 1)
+        array.array[array.index(-1)] = i
+
+    assert array.array.shape[axis] == 3
+    for j, i in enumerate([4, 5, 6]):
+        assert np.all(array.array[array.index(j)] == i)
+
+
+def test_ring_buffer_resize_never_shrinks():
+    array = ps.RingBuffer(np.arange(3), 2)
+    array.resize(1)
+
+    assert array.length == 3
+    assert np.allclose(array.array, [1, 2])
+
+
+def test_ring_buffer_bad_size():
+    with pytest.raises(AssertionError):
+        ps.RingBuffer(np.arange(3), 0)
@@ -0,0 +1,49 @@
+import pyscan as ps
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('shape', [(), (3,), (2, 4)])
+def test_welford_update(shape):
+    rng = np.random.default_rng(0)
+    samples = rng.normal(5, 2, size=(10, *shape))
+
+    mean = np.full(shape, np.nan)
+    std = np.full(shape, np.nan)
+    sem = np.full(shape, np.nan)
+
+    for n, sample in enumerate(samples, start=1):
+        ps.welford_update(mean, std, sem, sample, n)
+
+        assert np.allclose(mean, samples[:n].mean(axis=0))
+        if n == 1:
+            assert np.all(np.isnan(std)) and np.all(np.isnan(sem))
+        else:
+            assert np.allclose(std, samples[:n].std(axis=0, ddof=1))
+            assert np.allclose(sem, samples[:n].std(axis=0, ddof=1) / np.sqrt(n))
+
+
+def test_welford_update_views():
+    # 0-d views of single elements are updated in place
+    mean = np.full((2, 2), np.nan)
+    std = np.full((2, 2), np.nan)
+    sem = np.full((2, 2), np.nan)
+
+    for n, sample in enumerate([1., 2., 6.], start=1):
+        ps.welford_update(mean[1, 0, ...], std[1, 0, ...], sem[1, 0, ...], sample, n)
+
+    assert mean[1, 0] == 3
+    assert std[1, 0] == pytest.approx(np.std([1, 2, 6], ddof=1))
+    assert np.isnan(mean[0, 0])
+
+
+def test_welford_update_is_stable():
+    # a large offset does not cancel the small variance
+    samples = 1e9 + np.array([4., 7., 13., 16.])
+
+    mean, std, sem = np.array(np.nan), np.array(np.nan), np.array(np.nan)
+    for n, sample in enumerate(samples, start=1):
+        ps.welford_update(mean, std, sem, sample, n)
+
+    assert mean == 1e9 + 10
+    assert std == pytest.approx(np.std([4., 7., 13., 16.], ddof=1), rel=1e-9)
@@ -0,0 +1,80 @@
+import pyscan as ps
+import numpy as np
+import pytest
+import json
+
+from pyscan.measurement.pyscan_json_encoder import PyscanJSONEncoder
+from pyscan.measurement.pyscan_json_decoder import PyscanJSONDecoder
+
+
+@pytest.mark.parametrize("start, step, end", [
+    (1, 0.01, 1),
+    (1, 0.01, 1.005),
+    (1, 0.01, 1.2),
+    (1, 0.015, 1.2),
+    (1.005, 0.01, 1),
+    (1.2, 0.01, 1),
+    (1.2, 0.015, 1),
+    (0, 1, 10),
+    (-3, 0.7, 5)])
+def test_drange_values_equal_drange(start, step, end):
+    values = ps.DRange(start, step, end)
+    expected = np.array(ps.drange(start, step, end), dtype=float)
+
+    assert len(values) == len(expected)
+    assert np.array_equal(np.asarray(values), expected)
+    assert np.array_equal([values[i] for i in range(len(values))], expected)
+    assert values[-1] == expected[-1]
+
+
+@pytest.mark.parametrize("start, stop, n", [(0, 1, 11), (2, -3, 1000), (0.5, 0.5, 1), (1, 2, 2)])
+def test_linspace_values_equal_linspace(start, stop, n):
+    values = ps.Linspace(start, stop, n)
+    expected = np.linspace(start, stop, n)
+
+    assert values.shape == (n,)
+    assert np.array_equal(np.asarray(values), expected)
+    assert np.array_equal(list(values), expected)
+    assert np.array_equal(values[3:n:2], expected[3:n:2])
+
+
+def test_logspace_values():
+    values = ps.Logspace(1e-3, 10, 9)
+
+    assert np.allclose(np.asarray(values), np.geomspace(1e-3, 10, 9))
+    assert np.array_equal(np.asarray(values), [values[i] for i in range(9)])
+    assert values[0] == 1e-3
+    assert values[-1] == 10
+
+    with pytest.raises(AssertionError):
+        ps.Logspace(0, 10, 9)
+
+
+def test_piecewise_values():
+    values = ps.Piecewise(ps.DRange(0, 0.1, 1), ps.Linspace(1.01, 1.2, 20), [1.5, 2])
+    expected = np.concatenate([ps.drange(0, 0.1, 1), np.linspace(1.01, 1.2, 20), [1.5, 2]])
+
+    assert len(values) == 33
+    assert np.array_equal(np.asarray(values), expected)
+    assert np.array_equal([values[i] for i in range(33)], expected)
+    assert values[-2] == 1.5
+    assert np.array_equal(values[[0, 11, 31]], expected[[0, 11, 31]])
+
+    with pytest.raises(IndexError):
+        values[33]
+
+
+@pytest.mark.parametrize('values', [
+    ps.Linspace(0, 1, 5),
+    ps.DRange(0, 0.3, 1),
+    ps.Logspace(1, 100, 3),
+    ps.ValueList([3, 1, 2]),
+    ps.Piecewise(ps.DRange(0, 0.5, 1), [5, 6], ps.Piecewise(ps.Linspace(7, 8, 3)))])
+def test_scan_values_json(values):
+    encoded = json.dumps({'values': values}, cls=PyscanJSONEncoder)
+    decoded = json.loads(encoded, cls=PyscanJSONDecoder)['values']
+
+    assert '_pyscan_scan_values' in encoded
+    assert type(decoded) is type(values)
+    assert np.array_equal(np.asarray(decoded), np.asarray(values))
+    assert repr(decoded) == repr(values)
@@ -0,0 +1,161 @@
+import pyscan as ps
+import numpy as np
+import pytest
+import os
+
+
+@pytest.fixture()
+def devices():
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+    devices.v2 = ps.TestVoltage()
+    return devices
+
+
+def measure_x(expt):
+    d = ps.ItemAttribute()
+    d.x = expt.runinfo.scan0.i
+    return d
+
+
+def measure_y(expt):
+    d = ps.ItemAttribute()
+    d.y = [expt.runinfo.scan0.i, 1]
+    return d
+
+
+def run(devices, data_dir, scan0, measure_function, **settings):
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = scan0
+    runinfo.measure_function = measure_function
+    runinfo.initial_pause = 0
+    for key, value in settings.items():
+        runinfo[key] = value
+
+    expt = ps.Experiment(runinfo, devices, data_dir=data_dir)
+    expt.run()
+    return expt
+
+
+@pytest.fixture()
+def experiments(devices, tmp_path):
+    def axis(value):
+        pass
+
+    return [
+        run(devices, tmp_path, ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.2)}, 'voltage'), measure_x),
+        run(devices, tmp_path, ps.PropertyScan({'v2': ps.drange(0, 0.1, 0.3)}, 'voltage'), measure_y),
+        run(devices, tmp_path, ps.FunctionScan(axis, [0, 1]), measure_x),
+    ]
+
+
+def test_catalog_records_experiments(experiments, tmp_path):
+    catalog = ps.Catalog(tmp_path)
+    entries = catalog.query()
+
+    assert [entry.file_name for entry in entries] == [expt.runinfo.file_name for expt in experiments[::-1]]
+
+    first = entries[-1]
+    assert first.path == str((tmp_path / '{}.hdf5'.format(experiments[0].runinfo.file_name)).absolute())
+    assert first.complete == 'True'
+    assert first.n_parts == 1
+    assert first.dims == [3]
+    assert first.measured == ['x']
+    assert first.scans == [{'device_names': ['v1'], 'prop': 'voltage'}]
+    assert first.created <= first.modified
+
+    assert catalog.last().file_name == experiments[2].runinfo.file_name
+
+
+def test_catalog_query(experiments, tmp_path):
+    catalog = ps.Catalog(tmp_path)
+    names = [expt.runinfo.file_name for expt in experiments]
+
+    assert [e.file_name for e in catalog.query(measured='x')] == [names[2], names[0]]
+    assert [e.file_name for e in catalog.query(measured='y')] == [names[1]]
+    assert [e.file_name for e in catalog.query(device='v2', prop='voltage')] == [names[1]]
+    assert [e.file_name for e in catalog.query(device='v1', prop='current')] == []
+    assert [e.file_name for e in catalog.query(device='axis')] == [names[2]]
+    assert [e.file_name for e in catalog.query(prop='voltage', limit=1)] == [names[1]]
+    assert len(catalog.query(complete=True)) == 3
+    assert catalog.query(complete='error') == []
+
+    created = catalog.query()[1].created
+    assert [e.file_name for e in catalog.query(after=created)] == [names[2], names[1]]
+    assert [e.file_name for e in catalog.query(before=created)] == [names[1], names[0]]
+
+    catalog.remove(names[2])
+    assert catalog.last().file_name == names[1]
+
+
+def test_catalog_error_state(devices, tmp_path):
+    def measure_error(expt):
+        if expt.runinfo.scan0.i == 1:
+            raise ValueError('instrument error')
+        return measure_x(expt)
+
+    with pytest.raises(ValueError):
+        run(devices, tmp_path, ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.2)}, 'voltage'), measure_error)
+
+    assert ps.Catalog(tmp_path).last().complete == 'error'
+
+
+def test_catalog_rebuild(experiments, devices, tmp_path):
+    catalog = ps.Catalog(tmp_path)
+    os.remove(catalog.path)
+
+    run(devices, tmp_path, ps.ContinuousScan(n_max=4), measure_x, rotate_iterations=2, catalog=False)
+    assert not catalog.path.is_file()
+
+    assert catalog.rebuild() == 4
+
+    entries = {entry.file_name: entry for entry in catalog.query()}
+    assert len(entries) == 4
+    entry = entries[experiments[1].runinfo.file_name]
+    assert entry.measured == ['y']
+    assert entry.dims == [4]
+    assert entry.complete is None
+    assert [entry.n_parts for entry in entries.values()].count(2) == 1
+
+
+def test_catalog_disabled(devices, tmp_path):
+    run(devices, tmp_path, ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.2)}, 'voltage'), measure_x, catalog=False)
+
+    assert not ps.Catalog(tmp_path).path.is_file()
+
+
+def test_jupyter_tools_last_scan(experiments, tmp_path):
+    tools = ps.JupyterTools()
+    tools.path_name = str(tmp_path)
+
+    assert tools.get_last_scan_name() == experiments[2].runinfo.file_name
+    expt = tools.load_last_scan()
+    assert np.allclose(expt.x, [0, 1])
+
+
+def test_jupyter_tools_last_scan_not_in_catalog(experiments, devices, tmp_path):
+    expt = run(devices, tmp_path, ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.3)}, 'voltage'), measure_x,
+               catalog=False)
+    # newer than the experiments in the catalog, even if they were saved in the same second
+    mtime = os.path.getmtime(experiments[2].save_name) + 10
+    os.utime(expt.save_name, (mtime, mtime))
+
+    tools = ps.JupyterTools()
+    tools.path_name = str(tmp_path)
+
+    assert ps.Catalog(tmp_path).last().file_name == experiments[2].runinfo.file_name
+    assert tools.get_last_scan_name() == expt.runinfo.file_name
+    assert np.allclose(tools.load_last_scan().x, [0, 1, 2, 3])
+
+
+def test_modified_times_groups_parts(tmp_path):
+    from pyscan.plotting.jupyter_tools import modified_times
+
+    for name, mtime in [('a', 10), ('a-part001', 30), ('b', 20), ('c-part001', 40)]:
+        path = tmp_path / (name + '.hdf5')
+        path.touch()
+        os.utime(path, (mtime, mtime))
+    (tmp_path / 'notes.txt').touch()
+
+    # parts count as their first part, parts without a first part are ignored
+    assert modified_times(tmp_path) == {'a': 30, 'b': 20}
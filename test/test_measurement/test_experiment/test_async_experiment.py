@@ -0,0 +1,136 @@
+import pyscan as ps
+import numpy as np
+import asyncio
+
+from time import perf_counter, sleep
+
+
+class SlowVoltage(ps.TestVoltage):
+    '''
+    TestVoltage that takes 0.05 s to answer a query
+    '''
+
+    __test__ = False
+
+    def query(self, string):
+        sleep(0.05)
+        return super().query(string)
+
+
+def make_devices():
+    devices = ps.ItemAttribute()
+    devices.v1 = SlowVoltage()
+    devices.v2 = SlowVoltage()
+    devices.v3 = SlowVoltage()
+    return devices
+
+
+async def measure_async(expt):
+    d = ps.ItemAttribute()
+    d.x1, d.x2, d.x3 = await asyncio.gather(
+        expt.devices.v1.async_get('voltage'),
+        expt.devices.v2.async_get('voltage'),
+        expt.devices.v3.async_get('voltage'))
+    return d
+
+
+def measure_sync(expt):
+    d = ps.ItemAttribute()
+    d.x1 = expt.devices.v1.voltage
+    d.x2 = expt.devices.v2.voltage
+    d.x3 = expt.devices.v3.voltage
+    return d
+
+
+def run_experiment(measure_function, tmp_path):
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.3)}, 'voltage')
+    runinfo.scan1 = ps.PropertyScan({'v2': ps.drange(0, 0.1, 0.1)}, 'voltage')
+    runinfo.measure_function = measure_function
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, make_devices(), data_dir=tmp_path)
+    t0 = perf_counter()
+    expt.run()
+    return expt, perf_counter() - t0
+
+
+def test_async_measure_function(tmp_path):
+    serial, serial_time = run_experiment(measure_sync, tmp_path)
+    expt, async_time = run_experiment(measure_async, tmp_path)
+
+    for key in ['x1', 'x2', 'x3']:
+        assert np.allclose(expt[key], serial[key])
+    assert np.allclose(expt.x1[:, 1], ps.drange(0, 0.1, 0.3))
+
+    # the three reads of each point overlap
+    assert async_time < 0.7 * serial_time
+
+    assert expt.event_loop is None
+    assert expt.runinfo.complete is True
+
+
+def test_async_function_scan(tmp_path):
+    devices = make_devices()
+    set_values = []
+
+    async def axis(value):
+        await devices.v3.async_set('voltage', value)
+        set_values.append(value)
+
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.FunctionScan(axis, [0.5, 1, 1.5])
+    runinfo.measure_function = measure_sync
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, devices, data_dir=tmp_path)
+    expt.run()
+
+    assert set_values == [0.5, 1, 1.5]
+    assert np.allclose(expt.x3, [0.5, 1, 1.5])
+
+
+class AsyncRepeatScan(ps.RepeatScan):
+    '''
+    RepeatScan with an async iterate method
+    '''
+
+    async def iterate(self, expt, i, d):
+        self.i = i
+        await asyncio.sleep(0)
+        expt.async_iterations = getattr(expt, 'async_iterations', 0) + 1
+
+
+def test_async_scan_iterate(tmp_path):
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = AsyncRepeatScan(4)
+    runinfo.measure_function = lambda expt: ps.ItemAttribute({'x': expt.runinfo.scan0.i})
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, make_devices(), data_dir=tmp_path)
+    expt.run()
+
+    assert expt.async_iterations == 4
+    assert np.allclose(expt.x, [0, 1, 2, 3])
+
+
+def test_async_pipeline(tmp_path):
+    async def trigger(expt):
+        return await expt.devices.v1.async_get('voltage')
+
+    async def fetch(expt, handle):
+        await asyncio.sleep(0.01)
+        return ps.ItemAttribute({'x': handle})
+
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.3)}, 'voltage')
+    runinfo.pipeline = True
+    runinfo.trigger_function = trigger
+    runinfo.fetch_function = fetch
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, make_devices(), data_dir=tmp_path)
+    expt.run()
+
+    assert np.allclose(expt.x, ps.drange(0, 0.1, 0.3))
+    assert expt.event_loop is None
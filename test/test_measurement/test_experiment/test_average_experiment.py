@@ -0,0 +1,110 @@
+import pyscan as ps
+import numpy as np
+import pytest
+
+
+def sample(v, repeat):
+    # a different, reproducible value for every repeat of every point
+    return v + np.sin(7 * repeat + 13 * v) + repeat ** 2
+
+
+def make_measure(samples):
+    def measure(expt):
+        v = expt.devices.v1.voltage
+        repeat = samples.setdefault(v, 0)
+        samples[v] += 1
+
+        d = ps.ItemAttribute()
+        d.x = sample(v, repeat)
+        d.y = [sample(v, repeat), 2 * sample(v, repeat)]
+        return d
+    return measure
+
+
+def expected(v, n):
+    values = np.array([sample(v, repeat) for repeat in range(n)])
+    return values.mean(), values.std(ddof=1), values.std(ddof=1) / np.sqrt(n)
+
+
+def make_experiment(tmp_path, average_first, scan_order='raster'):
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+
+    runinfo = ps.RunInfo()
+    scans = [ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.2)}, 'voltage'), ps.AverageScan(4)]
+    if average_first:
+        scans = scans[::-1]
+    runinfo.scan0, runinfo.scan1 = scans
+    runinfo.scan_order = scan_order
+    runinfo.initial_pause = 0
+    runinfo.measure_function = make_measure({})
+
+    return ps.Experiment(runinfo, devices, data_dir=tmp_path)
+
+
+@pytest.mark.parametrize('average_first', [False, True])
+@pytest.mark.parametrize('scan_order', ['raster', 'serpentine'])
+def test_average_statistics(tmp_path, average_first, scan_order):
+    expt = make_experiment(tmp_path, average_first, scan_order)
+    expt.run()
+
+    assert expt.runinfo.measured == ['x', 'x_std', 'x_sem', 'y', 'y_std', 'y_sem', 'average_count']
+    assert expt.x.shape == (3,)
+    assert expt.y.shape == (3, 2)
+    assert np.all(expt.average_count == 4)
+
+    for i, v in enumerate(ps.drange(0, 0.1, 0.2)):
+        mean, std, sem = expected(v, 4)
+        assert expt.x[i] == pytest.approx(mean)
+        assert expt.x_std[i] == pytest.approx(std)
+        assert expt.x_sem[i] == pytest.approx(sem)
+        assert np.allclose(expt.y[i], [mean, 2 * mean])
+        assert np.allclose(expt.y_std[i], [std, 2 * std])
+        assert np.allclose(expt.y_sem[i], [sem, 2 * sem])
+
+    loaded = ps.load_experiment(expt.save_name)
+    for key in expt.runinfo.measured:
+        assert np.allclose(loaded[key], expt[key])
+
+
+def test_average_only(tmp_path):
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+    devices.v1.voltage = 0.5
+
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.AverageScan(5)
+    runinfo.initial_pause = 0
+    runinfo.measure_function = make_measure({})
+
+    expt = ps.Experiment(runinfo, devices, data_dir=tmp_path)
+    expt.run()
+
+    mean, std, sem = expected(0.5, 5)
+    assert expt.x == pytest.approx(mean)
+    assert expt.x_std == pytest.approx(std)
+    assert expt.x_sem == pytest.approx(sem)
+    assert expt.average_count == 5
+    assert np.allclose(expt.y_std, [std, 2 * std])
+
+    loaded = ps.load_experiment(expt.save_name)
+    assert loaded.x_sem[0] == pytest.approx(sem)
+
+
+def test_stopped_average(tmp_path):
+    expt = make_experiment(tmp_path, average_first=False)
+    measure = expt.runinfo.measure_function
+
+    def stop_partway(expt):
+        d = measure(expt)
+        # stops after the first point of the third repeat
+        if (expt.runinfo.scan1.i == 2) and (expt.runinfo.scan0.i == 0):
+            expt.stop()
+        return d
+
+    expt.runinfo.measure_function = stop_partway
+    expt.run()
+
+    assert np.array_equal(expt.average_count, [3, 2, 2])
+    assert expt.x[0] == pytest.approx(expected(0, 3)[0])
+    assert expt.x_std[1] == pytest.approx(expected(0.1, 2)[1])
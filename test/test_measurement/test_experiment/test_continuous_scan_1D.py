@@ -1,6 +1,7 @@
 import pyscan as ps
 import pytest
 import numpy as np
+import h5py
 
 
 @pytest.fixture()
@@ -56,3 +57,109 @@ def test_experiment_post_measure_1D(runinfo, devices):
 #         ('complete', True)]:
 #         assert hasattr(expt.runinfo, key), 'RunInfo does not have key {}'.format(key)
 #         assert expt.runinfo[key] == value, 'Value of {} is not {}'.format(key, value)
+
+
+@pytest.mark.parametrize('n_max', [1, 3, 37])
+def test_continuous_growth_trimmed(runinfo, devices, n_max):
+    runinfo.scan0 = ps.ContinuousScan(n_max=n_max)
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    assert np.allclose(expt.iteration, np.arange(n_max))
+    assert np.allclose(expt.x1, np.arange(n_max))
+    assert expt.x3.shape == (n_max, 2, 2)
+    assert expt.continuous_buffers == {}
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert np.allclose(f['iteration'][:], np.arange(n_max))
+        assert np.allclose(f['x1'][:], np.arange(n_max))
+        assert f['x2'].shape == (n_max, 2)
+        assert f['x3'].shape == (n_max, 2, 2)
+
+
+def test_continuous_unbounded_stop(runinfo, devices):
+    def measure_and_stop(expt):
+        d = measure_up_to_3D(expt)
+        if expt.runinfo.scan0.i == 20:
+            expt.stop()
+        return d
+
+    runinfo.scan0 = ps.ContinuousScan()
+    runinfo.measure_function = measure_and_stop
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    assert np.allclose(expt.x1, np.arange(21))
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert np.allclose(f['x1'][:], np.arange(21))
+        assert np.allclose(f['iteration'][:], np.arange(21))
+
+
+def test_continuous_2D(devices):
+    def measure(expt):
+        d = ps.ItemAttribute()
+        d.x1 = expt.runinfo.scan0.i + 10 * expt.runinfo.scan1.i
+        d.x2 = [d.x1, d.x1]
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.2)}, 'voltage', dt=0)
+    runinfo.scan1 = ps.ContinuousScan(n_max=4)
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    assert expt.x1.shape == (3, 4)
+    assert expt.x2.shape == (3, 4, 2)
+    assert np.allclose(expt.x1[:, :3], [[0, 10, 20], [1, 11, 21], [2, 12, 22]])
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert f['x1'].shape == (3, 4)
+        assert np.allclose(f['x1'][:, :3], expt.x1[:, :3])
+
+
+@pytest.mark.parametrize('save_lines', [0, 2])
+def test_continuous_retain(runinfo, devices, save_lines):
+    def measure_and_stop(expt):
+        d = measure_up_to_3D(expt)
+        if expt.runinfo.scan0.i == 25:
+            expt.stop()
+        return d
+
+    runinfo.scan0 = ps.ContinuousScan(n_retain=5)
+    runinfo.measure_function = measure_and_stop
+    runinfo.save_lines = save_lines
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    assert np.allclose(expt.iteration, np.arange(21, 26))
+    assert np.allclose(expt.x1, np.arange(21, 26))
+    assert expt.x3.shape == (5, 2, 2)
+    assert np.allclose(expt.x3[:, 0, 0], np.arange(21, 26))
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert np.allclose(f['iteration'][:], np.arange(26))
+        assert np.allclose(f['x1'][:], np.arange(26))
+        assert np.allclose(f['x2'][:, 1], np.arange(26))
+
+
+def test_continuous_retain_2D(devices):
+    def measure(expt):
+        d = ps.ItemAttribute()
+        d.x1 = expt.runinfo.scan0.i + 10 * expt.runinfo.scan1.i
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.2)}, 'voltage', dt=0)
+    runinfo.scan1 = ps.ContinuousScan(n_max=8, n_retain=3)
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    assert expt.x1.shape == (3, 3)
+    assert np.allclose(expt.x1[:, :2], [[50, 60], [51, 61], [52, 62]])
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert f['x1'].shape == (3, 8)
+        assert np.allclose(f['x1'][:, :7], np.arange(3)[:, None] + 10 * np.arange(7)[None, :])
@@ -0,0 +1,165 @@
+import pyscan as ps
+import numpy as np
+import pytest
+
+from threading import Event, Timer
+from time import perf_counter
+
+
+class FakeYokogawa(object):
+    '''
+    pyvisa resource that answers the commands of a YokogawaGS200
+    '''
+
+    def __init__(self):
+        self.level = 0.0
+        self.writes = []
+
+    def query(self, string):
+        return str(self.level)
+
+    def write(self, string):
+        self.writes.append(string)
+        self.level = float(string.split()[-1])
+
+
+def test_stop_interrupts_scan_wait(tmp_path):
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+
+    def measure(expt):
+        d = ps.ItemAttribute()
+        d.x = expt.devices.v1.voltage
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.9)}, 'voltage', dt=0.4)
+    runinfo.measure_function = measure
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, devices, data_dir=tmp_path)
+
+    # stops during the wait of the third point
+    timer = Timer(1.0, expt.stop)
+    timer.start()
+    t0 = perf_counter()
+    expt.run()
+    elapsed = perf_counter() - t0
+    timer.join()
+
+    assert elapsed < 1.2
+    assert np.allclose(expt.x[:2], [0, 0.1])
+    assert np.all(np.isnan(expt.x[2:]))
+    assert not expt.cancel_event.is_set()
+    assert ps.device_cancel_event(devices.v1) is None
+
+    loaded = ps.load_experiment(expt.save_name)
+    assert np.allclose(loaded.x[:2], [0, 0.1])
+    assert np.all(np.isnan(loaded.x[2:]))
+
+
+def test_stop_without_interrupt_finishes_point(tmp_path):
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+
+    def measure(expt):
+        d = ps.ItemAttribute()
+        d.x = expt.devices.v1.voltage
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.9)}, 'voltage', dt=0.2)
+    runinfo.measure_function = measure
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, devices, data_dir=tmp_path)
+
+    timer = Timer(0.3, expt.stop, kwargs={'interrupt': False})
+    timer.start()
+    expt.run()
+    timer.join()
+
+    assert np.allclose(expt.x[:2], [0, 0.1])
+    assert np.all(np.isnan(expt.x[2:]))
+
+
+def test_stop_interrupts_driver_ramp():
+    instrument = FakeYokogawa()
+    yoko = ps.YokogawaGS200(instrument, dt=0.05, step_size=0.03)
+    cancel_event = Event()
+    ps.bind_cancel_event(yoko, cancel_event)
+
+    timer = Timer(0.2, cancel_event.set)
+    timer.start()
+    try:
+        t0 = perf_counter()
+        with pytest.warns(UserWarning, match='interrupted'):
+            yoko.voltage = 3
+        elapsed = perf_counter() - t0
+    finally:
+        timer.join()
+        ps.bind_cancel_event(yoko, None)
+
+    assert elapsed < 0.5
+    assert 0 < instrument.level < 1
+    assert yoko._voltage == instrument.level
+
+    # ramps run normally once the device is no longer bound to the event
+    yoko.dt = 0
+    yoko.voltage = 1.5
+    assert instrument.level == 1.5
+
+
+def ramp_experiment(tmp_path, yoko):
+    devices = ps.ItemAttribute()
+    devices.yoko = yoko
+
+    def measure(expt):
+        d = ps.ItemAttribute()
+        d.x = expt.devices.yoko._voltage
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.PropertyScan({'yoko': [0.03, 0.06]}, 'voltage')
+    runinfo.measure_function = measure
+    runinfo.initial_pause = 0
+
+    return ps.Experiment(runinfo, devices, data_dir=tmp_path)
+
+
+def test_stop_when_not_running(tmp_path):
+    instrument = FakeYokogawa()
+    yoko = ps.YokogawaGS200(instrument, dt=0, step_size=0.03)
+    expt = ramp_experiment(tmp_path, yoko)
+
+    # stopping an experiment that is not running does not cancel anything
+    expt.stop()
+    assert not expt.cancel_event.is_set()
+    assert ps.interruptible_sleep(0.01, expt.cancel_event) is False
+    yoko.voltage = 0.3
+    assert instrument.level == 0.3
+
+    expt.run()
+    assert np.allclose(expt.x, [0.03, 0.06])
+
+    # nor after it has run
+    expt.stop()
+    assert not expt.cancel_event.is_set()
+    assert ps.device_cancel_event(yoko) is None
+    yoko.voltage = 0.3
+    assert instrument.level == 0.3
+
+
+def test_stop_does_not_cancel_other_experiments(tmp_path):
+    first = ramp_experiment(tmp_path, ps.YokogawaGS200(FakeYokogawa(), dt=0, step_size=0.03))
+    second = ramp_experiment(tmp_path, ps.YokogawaGS200(FakeYokogawa(), dt=0, step_size=0.03))
+    second.runinfo.scan0.dt = 0.1
+
+    second.start_thread()
+    first.runinfo.running = True
+    first.stop()
+    second.expt_thread.join()
+
+    assert not second.cancel_event.is_set()
+    assert second.runinfo.complete is True
+    assert np.allclose(second.x, [0.03, 0.06])
@@ -0,0 +1,129 @@
+import pyscan as ps
+import numpy as np
+import pytest
+
+from time import perf_counter, sleep
+
+
+def trigger(expt):
+    # the reading at the point, as a lock-in buffer would hold it
+    return (expt.devices.v1.voltage, expt.devices.v2.voltage)
+
+
+def fetch(expt, handle):
+    sleep(0.01)
+    d = ps.ItemAttribute()
+    d.x1 = handle[0]
+    d.x2 = [handle[0], handle[1]]
+    return d
+
+
+def measure(expt):
+    return fetch(expt, trigger(expt))
+
+
+def make_runinfo(pipeline, dt=0):
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.4)}, 'voltage', dt=dt)
+    runinfo.scan1 = ps.PropertyScan({'v2': ps.drange(0, 0.1, 0.2)}, 'voltage', dt=dt)
+    runinfo.initial_pause = 0
+    if pipeline:
+        runinfo.pipeline = True
+        runinfo.trigger_function = trigger
+        runinfo.fetch_function = fetch
+    else:
+        runinfo.measure_function = measure
+    return runinfo
+
+
+def make_devices():
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+    devices.v2 = ps.TestVoltage()
+    return devices
+
+
+@pytest.mark.parametrize('save_lines', [0, 2])
+def test_pipeline_matches_serial(tmp_path, save_lines):
+    serial_runinfo = make_runinfo(False)
+    serial = ps.Experiment(serial_runinfo, make_devices(), data_dir=tmp_path)
+    serial.run()
+
+    runinfo = make_runinfo(True)
+    runinfo.save_lines = save_lines
+    expt = ps.Experiment(runinfo, make_devices(), data_dir=tmp_path)
+    expt.run()
+
+    assert expt.runinfo.complete is True
+    assert np.allclose(expt.x1, serial.x1)
+    assert np.allclose(expt.x2, serial.x2)
+
+    loaded = ps.load_experiment(expt.save_name)
+    assert np.allclose(loaded.x1, serial.x1)
+    assert np.allclose(loaded.x2, serial.x2)
+
+
+def test_pipeline_overlaps_set_and_fetch(tmp_path):
+    t0 = perf_counter()
+    ps.Experiment(make_runinfo(False, dt=0.01), make_devices(), data_dir=tmp_path).run()
+    serial = perf_counter() - t0
+
+    t0 = perf_counter()
+    ps.Experiment(make_runinfo(True, dt=0.01), make_devices(), data_dir=tmp_path).run()
+    pipelined = perf_counter() - t0
+
+    # 15 points of 10 ms settling and 10 ms fetching
+    assert pipelined < 0.85 * serial
+
+
+@pytest.mark.parametrize('n_retain', [None, 2])
+def test_pipeline_continuous_scan(tmp_path, n_retain):
+    experiments = []
+    for pipeline in [False, True]:
+        runinfo = make_runinfo(pipeline)
+        runinfo.scan1 = ps.ContinuousScan(n_max=4, n_retain=n_retain)
+        expt = ps.Experiment(runinfo, make_devices(), data_dir=tmp_path)
+        expt.run()
+        experiments.append(expt)
+
+    serial, expt = experiments
+    assert expt.x1.shape == serial.x1.shape
+    assert np.allclose(expt.x1, serial.x1, equal_nan=True)
+    assert np.allclose(expt.iteration, serial.iteration)
+
+    loaded = ps.load_experiment(expt.save_name)
+    assert np.allclose(loaded.x1[:, :3], np.tile(ps.drange(0, 0.1, 0.4)[:, np.newaxis], (1, 3)))
+
+
+def test_pipeline_average_scan(tmp_path):
+    runinfo = make_runinfo(True)
+    runinfo.scan1 = ps.AverageScan(2)
+    expt = ps.Experiment(runinfo, make_devices(), data_dir=tmp_path)
+    expt.run()
+
+    assert np.allclose(expt.x1, ps.drange(0, 0.1, 0.4))
+
+
+def test_pipeline_fetch_error(tmp_path):
+    def bad_fetch(expt, handle):
+        if handle[0] > 0.25:
+            raise ValueError('buffer overflow')
+        return fetch(expt, handle)
+
+    runinfo = make_runinfo(True)
+    runinfo.fetch_function = bad_fetch
+    expt = ps.Experiment(runinfo, make_devices(), data_dir=tmp_path)
+
+    with pytest.raises(ValueError):
+        expt.run()
+
+    assert expt.runinfo.complete == 'error'
+    assert np.allclose(expt.x1[:3, 0], [0, 0.1, 0.2])
+
+
+def test_pipeline_requires_functions():
+    runinfo = make_runinfo(True)
+    runinfo.fetch_function = None
+
+    with pytest.raises(AssertionError):
+        runinfo.check()
@@ -0,0 +1,121 @@
+import pyscan as ps
+import numpy as np
+import h5py
+import pytest
+
+
+class Crash(Exception):
+    pass
+
+
+def make_measure(calls, crash_at=None):
+    def measure(expt):
+        calls.append(expt.runinfo.indicies)
+        if len(calls) == crash_at:
+            raise Crash()
+        d = ps.ItemAttribute()
+        d.x = expt.devices.v1.voltage + 10 * expt.devices.v2.voltage
+        d.y = [expt.devices.v1.voltage, expt.devices.v2.voltage + sum(calls[-1]) % 3]
+        return d
+    return measure
+
+
+def make_experiment(tmp_path, calls, crash_at=None, average=False, **settings):
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+    devices.v2 = ps.TestVoltage()
+
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.3)}, 'voltage')
+    runinfo.scan1 = ps.PropertyScan({'v2': ps.drange(0, 0.1, 0.2)}, 'voltage')
+    if average:
+        runinfo.scan2 = ps.AverageScan(2)
+    runinfo.initial_pause = 0
+    runinfo.measure_function = make_measure(calls, crash_at)
+    for key, value in settings.items():
+        runinfo[key] = value
+
+    return ps.Experiment(runinfo, devices, data_dir=tmp_path)
+
+
+@pytest.mark.parametrize('settings', [
+    {},
+    {'save_lines': 2},
+    {'async_save': True},
+    {'scan_order': 'serpentine'},
+    {'swmr': True},
+])
+@pytest.mark.parametrize('average', [False, True])
+def test_resume(tmp_path, settings, average):
+    n = 24 if average else 12
+
+    reference = make_experiment(tmp_path, [], average=average, **settings)
+    reference.run()
+
+    crashed = make_experiment(tmp_path, [], crash_at=8, average=average, **settings)
+    with pytest.raises(Crash):
+        crashed.run()
+    assert crashed.runinfo.complete == 'error'
+
+    with h5py.File(crashed.save_name, 'r') as f:
+        position = f['_checkpoint/position'][()]
+        indicies = tuple(f['_checkpoint/indicies'][()])
+    # the seven points measured before the crash were saved
+    assert position == 6
+    assert crashed.plan.position(indicies) == 6
+
+    calls = []
+    expt = make_experiment(tmp_path, calls, average=average, **settings)
+    expt.resume(crashed.save_name)
+
+    assert expt.runinfo.complete is True
+    assert expt.save_name == crashed.save_name
+    # only the remaining points are measured, starting with the one that crashed
+    assert len(calls) == n - 7
+    assert calls[0] == tuple(crashed.plan.chunk(7, 8)[0][0])
+
+    loaded = ps.load_experiment(crashed.save_name)
+    for key in reference.runinfo.measured:
+        assert np.allclose(expt[key], reference[key], equal_nan=True), key
+        assert np.allclose(loaded[key], reference[key], equal_nan=True), key
+
+    with h5py.File(crashed.save_name, 'r') as f:
+        assert f['_checkpoint/position'][()] == n - 1
+
+
+def test_resume_complete_experiment(tmp_path):
+    reference = make_experiment(tmp_path, [])
+    reference.run()
+
+    calls = []
+    expt = make_experiment(tmp_path, calls)
+    expt.resume(reference.save_name)
+
+    assert calls == []
+    assert np.allclose(expt.x, reference.x)
+
+
+def test_resume_checks_scans(tmp_path):
+    crashed = make_experiment(tmp_path, [], crash_at=3)
+    with pytest.raises(Crash):
+        crashed.run()
+
+    expt = make_experiment(tmp_path, [])
+    expt.runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.5)}, 'voltage')
+    with pytest.raises(AssertionError):
+        expt.resume(crashed.save_name)
+
+    expt = make_experiment(tmp_path, [], scan_order='serpentine')
+    with pytest.raises(AssertionError):
+        expt.resume(crashed.save_name)
+
+
+def test_continuous_experiment_has_no_checkpoint(tmp_path):
+    expt = make_experiment(tmp_path, [])
+    expt.runinfo.scan2 = ps.ContinuousScan(n_max=2)
+    expt.run()
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert '_checkpoint' not in f
+    with pytest.raises(AssertionError):
+        make_experiment(tmp_path, []).resume(expt.save_name)
@@ -0,0 +1,123 @@
+import pyscan as ps
+import pytest
+import numpy as np
+import h5py
+
+from pyscan.measurement.load_experiment import find_parts
+
+
+@pytest.fixture()
+def devices():
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+    return devices
+
+
+def measure_and_stop(expt):
+    d = ps.ItemAttribute()
+    d.x1 = expt.runinfo.scan0.i
+    d.x2 = [d.x1, 2 * d.x1]
+
+    if expt.runinfo.scan0.i == 22:
+        expt.stop()
+
+    return d
+
+
+@pytest.mark.parametrize('async_save', [False, True])
+@pytest.mark.parametrize('save_lines', [0, 3])
+def test_rotate_iterations(devices, async_save, save_lines):
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure_and_stop
+    runinfo.scan0 = ps.ContinuousScan()
+    runinfo.rotate_iterations = 5
+    runinfo.async_save = async_save
+    runinfo.save_lines = save_lines
+
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    assert expt.part == 4
+    assert expt.part_name.endswith('{}-part004.hdf5'.format(runinfo.file_name))
+    assert expt.save_name.endswith('{}.hdf5'.format(runinfo.file_name))
+    assert np.allclose(expt.x1, np.arange(23))
+
+    # save_name stays on the first part, so the stitched view covers every part
+    stitched = ps.load_experiment(expt.save_name, stitch=True)
+    assert np.allclose(stitched.x1, np.arange(23))
+
+    parts = find_parts(str(runinfo.data_path / runinfo.file_name) + '.hdf5')
+    assert len(parts) == 5
+    for i, part in enumerate(parts):
+        with h5py.File(part, 'r') as f:
+            assert f.attrs['part'] == i
+            assert f.attrs['iteration_offset'] == 5 * i
+            assert 'runinfo' in f.attrs
+            assert np.allclose(f['x1'][:], np.arange(5 * i, min(5 * i + 5, 23)))
+            assert np.allclose(f['iteration'][:], f['x1'][:])
+
+    with ps.load_experiment(parts[0], stitch=True) as stitched:
+        assert isinstance(stitched, ps.StitchedExperiment)
+        assert sorted(stitched.runinfo.measured) == ['x1', 'x2']
+        assert stitched.x1.shape == (23,)
+        assert np.allclose(stitched.x1[:], np.arange(23))
+        assert np.allclose(stitched.x2[-3:], [[20, 40], [21, 42], [22, 44]])
+        assert np.allclose(stitched.iteration[:], np.arange(23))
+
+
+def test_rotate_2D(devices):
+    def measure(expt):
+        d = ps.ItemAttribute()
+        d.x1 = expt.runinfo.scan0.i + 10 * expt.runinfo.scan1.i
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.2)}, 'voltage', dt=0)
+    runinfo.scan1 = ps.ContinuousScan(n_max=7)
+    runinfo.rotate_iterations = 3
+
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    with ps.load_experiment(str(runinfo.data_path / runinfo.file_name), stitch=True) as stitched:
+        assert len(stitched.parts) == 3
+        assert np.allclose(stitched.v1_voltage, [0, 0.1, 0.2])
+        assert stitched.x1.shape == (3, 7)
+        assert np.allclose(stitched.x1[:, :6], expt.x1[:, :6])
+
+
+def test_rotate_size_and_interval(devices):
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure_and_stop
+    runinfo.scan0 = ps.ContinuousScan()
+    runinfo.rotate_size = 1
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    # every iteration is larger than one byte
+    assert expt.part == 22
+
+    runinfo.rotate_size = None
+    runinfo.rotate_interval = 0
+    runinfo.scan0 = ps.ContinuousScan()
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    assert expt.part == 22
+    with ps.load_experiment(str(runinfo.data_path / runinfo.file_name), stitch=True) as stitched:
+        assert np.allclose(stitched.x1[:], np.arange(23))
+
+
+def test_no_rotation_without_continuous_scan(devices):
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure_and_stop
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.5)}, 'voltage', dt=0)
+    runinfo.rotate_iterations = 1
+
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    assert expt.part == 0
+    with h5py.File(expt.save_name, 'r') as f:
+        assert 'part' not in f.attrs
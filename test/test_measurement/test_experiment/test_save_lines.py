@@ -0,0 +1,92 @@
+import pyscan as ps
+import numpy as np
+import pytest
+import h5py
+
+
+@pytest.fixture()
+def runinfo():
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure_up_to_3D
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.2)}, 'voltage', dt=0)
+    runinfo.scan1 = ps.PropertyScan({'v2': ps.drange(0, 0.1, 0.3)}, 'voltage', dt=0)
+    runinfo.scan2 = ps.RepeatScan(2)
+    return runinfo
+
+
+@pytest.fixture()
+def devices():
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+    devices.v2 = ps.TestVoltage()
+    return devices
+
+
+def measure_up_to_3D(expt):
+    d = ps.ItemAttribute()
+
+    d.x1 = expt.runinfo.scan0.i + 10 * expt.runinfo.scan1.i + 100 * expt.runinfo.scan2.i
+    d.x2 = [d.x1 for _ in range(2)]
+    d.x3 = [[d.x1, d.x1] for _ in range(2)]
+
+    return d
+
+
+@pytest.mark.parametrize('save_lines', [1, 2, 3, 5])
+@pytest.mark.parametrize('async_save', [False, True])
+def test_save_lines_matches_memory(runinfo, devices, save_lines, async_save):
+    runinfo.save_lines = save_lines
+    runinfo.async_save = async_save
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    assert expt.pending_lines == {}
+    assert not np.any(np.isnan(expt.x1))
+
+    with h5py.File(expt.save_name, 'r') as f:
+        for key in ['x1', 'x2', 'x3']:
+            assert np.allclose(f[key][:], expt[key]), f'{key} saved with save_lines={save_lines} does not match'
+
+
+def test_save_lines_buffers_until_line_complete(runinfo, devices):
+    runinfo.save_lines = 1
+    expt = ps.Experiment(runinfo, devices)
+    expt.check_runinfo()
+
+    data = expt.runinfo.measure_function(expt)
+    expt.preallocate(data)
+    expt.save_point(data)
+
+    expt.runinfo.scan0.iterate(expt, 1, 1)
+    data = expt.runinfo.measure_function(expt)
+    expt.save_point(data)
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert np.all(np.isnan(f['x1'][:, 0, 0])), 'Incomplete line was written'
+
+    expt.runinfo.scan0.iterate(expt, 2, 1)
+    data = expt.runinfo.measure_function(expt)
+    expt.save_point(data)
+
+    assert expt.pending_lines == {}
+    with h5py.File(expt.save_name, 'r') as f:
+        assert np.allclose(f['x1'][:, 0, 0], [0, 1, 2])
+        assert np.all(np.isnan(f['x1'][:, 1, 0]))
+
+
+def test_save_lines_written_on_stop(runinfo, devices):
+    def measure_and_stop(expt):
+        d = measure_up_to_3D(expt)
+        if (expt.runinfo.scan0.i == 1) and (expt.runinfo.scan1.i == 1):
+            expt.stop()
+        return d
+
+    runinfo.save_lines = 2
+    runinfo.measure_function = measure_and_stop
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert np.allclose(f['x1'][:, 0, 0], [0, 1, 2])
+        assert np.allclose(f['x1'][:2, 1, 0], [10, 11])
+        assert np.isnan(f['x1'][2, 1, 0])
@@ -0,0 +1,42 @@
+import pyscan as ps
+import numpy as np
+import h5py
+
+
+def test_experiment_with_scan_values(tmp_path):
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+    devices.v2 = ps.TestVoltage()
+    set_values = []
+
+    def axis(value):
+        set_values.append(value)
+
+    def measure(expt):
+        d = ps.ItemAttribute()
+        d.x1 = expt.devices.v1.voltage
+        d.x2 = expt.devices.v2.voltage
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.DRange(0, 0.15, 1), 'v2': ps.Linspace(0, -1, 8)}, 'voltage', dt=0)
+    runinfo.scan1 = ps.FunctionScan(axis, ps.Logspace(1, 100, 3))
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, devices, data_dir=tmp_path)
+    expt.run()
+
+    assert np.allclose(expt.x1[:, 0], ps.drange(0, 0.15, 1))
+    assert np.allclose(expt.x2[:, 2], np.linspace(0, -1, 8))
+    assert np.allclose(expt.v1_voltage, ps.drange(0, 0.15, 1))
+    assert np.allclose(set_values, [1, 10, 100])
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert np.allclose(f['axis'][:], [1, 10, 100])
+        assert len(f.attrs['runinfo']) < 3000
+
+    loaded = ps.load_experiment(expt.save_name)
+    assert isinstance(loaded.runinfo.scan0.scan_dict['v1_voltage'], ps.DRange)
+    assert isinstance(loaded.runinfo.scan1.scan_dict['axis'], ps.Logspace)
+    assert np.allclose(loaded.v2_voltage, np.linspace(0, -1, 8))
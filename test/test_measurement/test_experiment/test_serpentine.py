@@ -0,0 +1,72 @@
+import pyscan as ps
+import numpy as np
+import pytest
+
+
+def run_2D(tmp_path, scan_order, save_lines=0):
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+    devices.v2 = ps.TestVoltage()
+    set_values = []
+    measured_values = []
+
+    def axis(value):
+        set_values.append(value)
+
+    def measure(expt):
+        d = ps.ItemAttribute()
+        d.x1 = expt.devices.v1.voltage
+        d.x2 = expt.devices.v2.voltage
+        d.x3 = [expt.devices.v1.voltage, expt.devices.v2.voltage]
+        measured_values.append(d.x3)
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.3)}, 'voltage', dt=0)
+    runinfo.scan1 = ps.PropertyScan({'v2': ps.drange(0, 0.1, 0.2)}, 'voltage', dt=0)
+    runinfo.scan2 = ps.FunctionScan(axis, [0, 1])
+    runinfo.initial_pause = 0
+    runinfo.scan_order = scan_order
+    runinfo.save_lines = save_lines
+
+    expt = ps.Experiment(runinfo, devices, data_dir=tmp_path)
+    expt.run()
+
+    return expt, set_values, np.array(measured_values)
+
+
+@pytest.mark.parametrize('save_lines', [0, 1, 2])
+def test_serpentine_matches_raster(tmp_path, save_lines):
+    raster, _, _ = run_2D(tmp_path, 'raster', save_lines)
+    serpentine, _, _ = run_2D(tmp_path, 'serpentine', save_lines)
+
+    for key in ['x1', 'x2', 'x3']:
+        assert np.allclose(serpentine[key], raster[key])
+
+    loaded = ps.load_experiment(serpentine.save_name)
+    assert loaded.runinfo.scan_order == 'serpentine'
+    for key in ['x1', 'x2', 'x3']:
+        assert np.allclose(loaded[key], raster[key])
+
+    assert np.allclose(loaded.x1, np.tile(ps.drange(0, 0.1, 0.3)[:, np.newaxis, np.newaxis], (1, 3, 2)))
+
+
+def test_serpentine_does_not_reset_scans(tmp_path):
+    expt, set_values, measured_values = run_2D(tmp_path, 'serpentine')
+
+    assert set_values == [0, 1]
+    assert len(measured_values) == 24
+    # consecutive points only step one voltage by 0.1, neither ramps back to its start value
+    steps = np.abs(np.diff(measured_values, axis=0))
+    assert np.all(steps.max(axis=1) < 0.1 + 1e-9)
+    assert np.allclose(measured_values[3:6], [[0.3, 0], [0.3, 0.1], [0.2, 0.1]])
+
+
+def test_bad_scan_order():
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.RepeatScan(2)
+    runinfo.scan_order = 'random'
+
+    with pytest.raises(AssertionError):
+        runinfo.check()
@@ -0,0 +1,130 @@
+import pyscan as ps
+import numpy as np
+import h5py
+import pytest
+
+from time import sleep
+
+
+def measure(expt):
+    sleep(0.002)
+    d = ps.ItemAttribute()
+    d.x = expt.devices.v1.voltage
+    return d
+
+
+def trigger(expt):
+    return expt.devices.v1.voltage
+
+
+def fetch(expt, handle):
+    sleep(0.002)
+    d = ps.ItemAttribute()
+    d.x = handle
+    return d
+
+
+def make_experiment(tmp_path, timing=True, pipeline=False):
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+    devices.v2 = ps.TestVoltage()
+
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.3)}, 'voltage')
+    runinfo.scan1 = ps.PropertyScan({'v2': ps.drange(0, 0.1, 0.2)}, 'voltage')
+    runinfo.initial_pause = 0
+    runinfo.timing = timing
+    if pipeline:
+        runinfo.pipeline = True
+        runinfo.trigger_function = trigger
+        runinfo.fetch_function = fetch
+    else:
+        runinfo.measure_function = measure
+
+    return ps.Experiment(runinfo, devices, data_dir=tmp_path)
+
+
+def point_totals(expt):
+    '''
+    Returns the wall time of each point, from its start to the start of the next point or the end of the run
+    '''
+    timing = expt.point_timing.arrays()
+    return np.diff(np.append(timing.timestamp, timing.elapsed))
+
+
+def phase_sum(expt, phases):
+    timing = expt.point_timing.arrays()
+    return np.sum([np.nan_to_num(timing[phase]) for phase in phases], axis=0)
+
+
+def test_timing_disabled(tmp_path):
+    expt = make_experiment(tmp_path, timing=False)
+    expt.run()
+
+    assert expt.point_timing is None
+    with h5py.File(expt.save_name, 'r') as f:
+        assert '_timing' not in f
+    with pytest.raises(AssertionError):
+        expt.timing_report()
+
+
+def test_timing(tmp_path):
+    expt = make_experiment(tmp_path)
+    expt.run()
+
+    timing = expt.point_timing.arrays()
+    assert expt.point_timing.columns == [
+        'timestamp', 'iterate_scan0', 'iterate_scan1', 'measure', 'save', 'writer_wait']
+    for column in expt.point_timing.columns:
+        assert timing[column].shape == (12,)
+    assert np.all(np.diff(timing.timestamp) > 0)
+    assert np.all(timing.measure >= 0.002)
+    assert np.all(timing.save >= 0)
+    assert np.all(timing.writer_wait >= 0)
+    assert np.all(timing.iterate_scan0 >= 0)
+    # each phase is counted once, so the phases of a point take no longer than the point
+    assert np.all(phase_sum(expt, expt.point_timing.columns[1:]) <= point_totals(expt) + 1e-9)
+
+    report = expt.timing_report(percentiles=(50, 99))
+    assert report.measure.count == 12
+    assert report.measure.p50 >= 0.002
+    assert 0 < report.measure.fraction < 1
+
+    # the timings are saved with the data, which loads as before
+    loaded = ps.load_timing(expt.save_name)
+    for column in expt.point_timing.columns:
+        assert np.array_equal(loaded[column], timing[column])
+    assert ps.timing_report(expt.save_name).measure.count == 12
+
+    data = ps.load_experiment(expt.save_name)
+    assert np.allclose(data.x, expt.x)
+    assert data.runinfo.measured == ['x']
+
+
+def test_pipeline_timing(tmp_path):
+    expt = make_experiment(tmp_path, pipeline=True)
+    expt.run()
+
+    timing = expt.point_timing.arrays()
+    assert expt.point_timing.columns == [
+        'timestamp', 'iterate_scan0', 'iterate_scan1', 'pipeline_wait', 'trigger', 'fetch', 'save', 'writer_wait']
+    assert np.all(timing.trigger >= 0)
+    assert np.all(timing.fetch >= 0.002)
+    assert np.all(timing.save >= 0)
+    # the first point has no previous point to wait for
+    assert np.isnan(timing.pipeline_wait[0])
+    assert np.all(timing.pipeline_wait[1:] >= 0)
+    # fetch, save and writer_wait overlap the next point in the pipeline's worker, the other phases do not
+    assert np.all(phase_sum(expt, ['iterate_scan0', 'iterate_scan1', 'pipeline_wait', 'trigger'])
+                  <= point_totals(expt) + 1e-9)
+    assert np.all(phase_sum(expt, ['fetch', 'save', 'writer_wait']) <= timing.elapsed)
+
+
+def test_async_writer_timing(tmp_path):
+    expt = make_experiment(tmp_path)
+    expt.runinfo.async_save = True
+    expt.run()
+
+    assert expt.timing_report().writer_wait.count == 12
+    assert np.all(phase_sum(expt, expt.point_timing.columns[1:]) <= point_totals(expt) + 1e-9)
+    assert np.allclose(ps.load_experiment(expt.save_name).x, expt.x)
@@ -0,0 +1,183 @@
+import pyscan as ps
+import numpy as np
+import pytest
+import h5py
+
+
+@pytest.fixture()
+def runinfo():
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure_up_to_3D
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.3)}, 'voltage', dt=0)
+    return runinfo
+
+
+@pytest.fixture()
+def devices():
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+    return devices
+
+
+def measure_up_to_3D(expt):
+    d = ps.ItemAttribute()
+
+    d.x1 = expt.runinfo.scan0.i
+    d.x2 = [d.x1 for _ in range(2)]
+    d.x3 = [[expt.runinfo.scan0.i, expt.runinfo.scan0.i] for _ in range(2)]
+
+    return d
+
+
+def test_writer_open_close(tmp_path):
+    writer = ps.HDF5Writer(tmp_path / 'writer.hdf5')
+    assert not writer.is_open
+
+    f = writer.open()
+    assert writer.is_open
+    assert writer.open() is f, 'open() should reuse the open handle'
+
+    writer.close()
+    assert not writer.is_open
+    writer.close()
+
+
+def test_writer_flush_points(tmp_path):
+    with ps.HDF5Writer(tmp_path / 'writer.hdf5', flush_points=3, flush_interval=None) as writer:
+        writer.point_saved()
+        writer.point_saved()
+        assert writer.n_unflushed == 2
+        writer.point_saved()
+        assert writer.n_unflushed == 0
+
+
+def test_writer_flush_interval(tmp_path):
+    with ps.HDF5Writer(tmp_path / 'writer.hdf5', flush_points=None, flush_interval=0) as writer:
+        writer.point_saved()
+        assert writer.n_unflushed == 0
+
+
+def test_experiment_closes_writer(runinfo, devices):
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    assert not expt.writer.is_open
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert np.allclose(f['x1'][:], [0, 1, 2, 3])
+        assert 'runinfo' in f.attrs
+
+
+def test_experiment_closes_writer_on_stop(runinfo, devices):
+    def measure_and_stop(expt):
+        d = measure_up_to_3D(expt)
+        if expt.runinfo.scan0.i == 1:
+            expt.stop()
+        return d
+
+    runinfo.measure_function = measure_and_stop
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    assert not expt.writer.is_open
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert np.allclose(f['x1'][:2], [0, 1])
+        assert np.all(np.isnan(f['x1'][2:]))
+
+
+def test_experiment_closes_writer_on_exception(runinfo, devices):
+    def measure_and_fail(expt):
+        if expt.runinfo.scan0.i == 2:
+            raise ValueError('instrument error')
+        return measure_up_to_3D(expt)
+
+    runinfo.measure_function = measure_and_fail
+    expt = ps.Experiment(runinfo, devices)
+
+    with pytest.raises(ValueError):
+        expt.run()
+
+    assert not expt.writer.is_open
+    assert expt.runinfo.running is False
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert np.allclose(f['x1'][:2], [0, 1])
+
+
+@pytest.mark.parametrize('queue_size', [1, 1000])
+def test_async_experiment(runinfo, devices, queue_size):
+    runinfo.async_save = True
+    runinfo.save_queue_size = queue_size
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    assert isinstance(expt.writer, ps.AsyncHDF5Writer)
+    assert not expt.writer.is_open
+    assert expt.writer.thread is None
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert np.allclose(f['x1'][:], [0, 1, 2, 3])
+        assert np.allclose(f['x2'][:], [[0, 0], [1, 1], [2, 2], [3, 3]])
+        assert np.allclose(f['x3'][3], [[3, 3], [3, 3]])
+
+
+def test_async_writer_error_propagation(tmp_path):
+    writer = ps.AsyncHDF5Writer(tmp_path / 'writer.hdf5')
+    writer.open()
+    writer.file.create_dataset('x1', shape=(2,), dtype='float64')
+
+    writer.write_point((0,), {'x1': 1.0})
+    writer.write_point((1,), {'missing': 1.0})
+
+    with pytest.raises(KeyError):
+        writer.drain()
+
+    writer.close()
+    assert not writer.is_open
+
+    with h5py.File(tmp_path / 'writer.hdf5', 'r') as f:
+        assert f['x1'][0] == 1.0
+
+
+@pytest.mark.parametrize('shape,n_scan_dims,chunks,grow_axis,expected', [
+    ((10, 20), 2, None, None, (10, 20)),
+    ((10, 20, 512), 2, 'point', None, (1, 1, 512)),
+    ((10, 20), 2, 'point', None, (1, 1)),
+    ((10, 20), 2, 'auto', None, (10, 20)),
+    ((100, 1000, 5), 3, 'auto', None, (100, 1000, 1)),
+    ((100, 50, 1024), 2, 'auto', None, (100, 1, 1024)),
+    ((1000, 5, 1024), 2, 'auto', None, (128, 1, 1024)),
+    ((4, 262144), 1, 'auto', None, (1, 131072)),
+    ((1,), 1, 'auto', 0, (1024,)),
+    ((100, 1, 2), 2, 'auto', 1, (100, 655, 2)),
+    ((10, 20, 30), 3, (5, 5, 5), None, (5, 5, 5)),
+    ((10, 20, 30), 2, (20, 1), None, (10, 1, 30)),
+    ((1,), 1, (100,), 0, (100,))])
+def test_chunk_shape(shape, n_scan_dims, chunks, grow_axis, expected):
+    result = ps.measurement.hdf5_writer.chunk_shape(shape, n_scan_dims, chunks, grow_axis=grow_axis)
+    assert result == expected, f'chunk_shape({shape}, {n_scan_dims}, {chunks}) gave {result} not {expected}'
+
+
+def test_chunk_shape_bad_explicit():
+    with pytest.raises(AssertionError):
+        ps.measurement.hdf5_writer.chunk_shape((10, 20, 30), 2, (5, 5, 5, 5))
+
+
+@pytest.mark.parametrize('chunks,compression,shuffle', [
+    ('auto', None, False),
+    ('point', 'gzip', True),
+    (None, 'lzf', False),
+    ((1, ), 'gzip', False)])
+def test_experiment_chunks_and_compression(runinfo, devices, chunks, compression, shuffle):
+    runinfo.chunks = chunks
+    runinfo.compression = compression
+    runinfo.shuffle = shuffle
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert f['x3'].compression == compression
+        assert f['x3'].shuffle == shuffle
+        assert f['x3'].chunks == ps.measurement.hdf5_writer.chunk_shape((4, 2, 2), 1, chunks)
+        assert np.allclose(f['x3'][:], expt.x3)
@@ -0,0 +1,185 @@
+import pyscan as ps
+import numpy as np
+import pytest
+import h5py
+
+from pyscan.measurement.load_experiment import first_unwritten
+
+
+@pytest.fixture()
+def devices():
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+    return devices
+
+
+def measure_up_to_3D(expt):
+    d = ps.ItemAttribute()
+
+    d.x1 = expt.runinfo.scan0.i
+    d.x2 = [d.x1 for _ in range(2)]
+    d.x3 = [[expt.runinfo.scan0.i, expt.runinfo.scan0.i] for _ in range(2)]
+
+    return d
+
+
+@pytest.mark.parametrize('async_save', [False, True])
+def test_live_experiment_reads_running_experiment(devices, async_save):
+    snapshots = []
+
+    def measure_and_read(expt):
+        d = measure_up_to_3D(expt)
+        i = expt.runinfo.scan0.i
+        if i == 2:
+            expt.writer.drain()
+            expt.writer.flush()
+            expt.live = ps.load_experiment(expt.save_name, live=True)
+            snapshots.append(expt.live.x1.copy())
+        elif i == 4:
+            expt.writer.drain()
+            expt.writer.flush()
+            expt.live.refresh()
+            snapshots.append(expt.live.x1.copy())
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure_and_read
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.5)}, 'voltage', dt=0)
+    runinfo.swmr = True
+    runinfo.async_save = async_save
+    runinfo.flush_points = 1
+
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    assert isinstance(expt.live, ps.LiveExperiment)
+    assert sorted(expt.live.runinfo.measured) == ['x1', 'x2', 'x3']
+    assert np.allclose(snapshots[0][:2], [0, 1])
+    assert np.all(np.isnan(snapshots[0][2:]))
+    assert np.allclose(snapshots[1][:4], [0, 1, 2, 3])
+    assert np.all(np.isnan(snapshots[1][4:]))
+
+    expt.live.refresh()
+    assert np.allclose(expt.live.x1, expt.x1)
+    assert np.allclose(expt.live.x3, expt.x3)
+    expt.live.close()
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert f.swmr_mode is False
+        assert np.allclose(f['x1'][:], expt.x1)
+
+
+def test_live_experiment_continuous(devices):
+    lengths = []
+
+    def measure_and_read(expt):
+        d = measure_up_to_3D(expt)
+        i = expt.runinfo.scan0.i
+        if i == 1:
+            expt.writer.flush()
+            expt.live = ps.load_experiment(expt.save_name, live=True)
+            lengths.append(len(expt.live.x1))
+        elif i == 3:
+            expt.writer.flush()
+            expt.live.refresh()
+            lengths.append(len(expt.live.x1))
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure_and_read
+    runinfo.scan0 = ps.ContinuousScan(n_max=5)
+    runinfo.swmr = True
+
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    expt.live.refresh()
+    assert np.allclose(expt.live.x1, [0, 1, 2, 3, 4])
+    assert np.allclose(expt.live.x2, expt.x2)
+    assert lengths[0] < lengths[1]
+    expt.live.close()
+
+
+def test_live_experiment_refresh_within_capacity(devices):
+    snapshots = []
+
+    def measure_and_read(expt):
+        d = measure_up_to_3D(expt)
+        i = expt.runinfo.scan0.i
+        if i == 1:
+            expt.writer.flush()
+            expt.live = ps.load_experiment(expt.save_name, live=True)
+        elif i in [6, 9]:
+            # at iteration 6 the datasets have a capacity of 8, iteration 6 is written after this refresh
+            expt.writer.flush()
+            expt.live.refresh()
+            snapshots.append(expt.live.x2.copy())
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure_and_read
+    runinfo.scan0 = ps.ContinuousScan(n_max=12)
+    runinfo.swmr = True
+
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    assert snapshots[0].shape[0] == 8
+    assert np.allclose(snapshots[0][:6, 0], range(6))
+    assert np.all(np.isnan(snapshots[0][6:]))
+    assert snapshots[1].shape[0] == 16
+    assert np.allclose(snapshots[1][:9, 0], range(9))
+    assert np.all(np.isnan(snapshots[1][9:]))
+    expt.live.close()
+
+
+def test_live_experiment_reads_only_new_slices(devices):
+    devices.v2 = ps.TestVoltage()
+
+    def measure_and_read(expt):
+        d = measure_up_to_3D(expt)
+        i, j = expt.runinfo.indicies
+        if (i, j) == (0, 1):
+            expt.writer.flush()
+            expt.live = ps.load_experiment(expt.save_name, live=True)
+            # marks the complete first line, which is not read again
+            expt.live.x1[:, 0] = -1
+            expt.live.v1_voltage[0] = -1
+        elif (i, j) == (2, 2):
+            expt.writer.flush()
+            expt.live.refresh()
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure_and_read
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.3)}, 'voltage', dt=0)
+    runinfo.scan1 = ps.PropertyScan({'v2': ps.drange(0, 0.1, 0.2)}, 'voltage', dt=0)
+    runinfo.swmr = True
+    runinfo.flush_points = 1
+
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+
+    live = expt.live
+    assert np.all(live.x1[:, 0] == -1)
+    assert live.v1_voltage[0] == -1
+    assert np.allclose(live.x1[:, 1], expt.x1[:, 1])
+    assert np.allclose(live.x1[:2, 2], expt.x1[:2, 2])
+    assert np.all(np.isnan(live.x1[2:, 2]))
+    assert np.allclose(live.x3[:, 1], expt.x3[:, 1])
+    live.close()
+
+
+def test_first_unwritten():
+    array = np.full((5, 2), np.nan)
+    array[:2] = 1
+    array[2, 0] = 1
+    assert first_unwritten(array, 0) == 2
+    assert first_unwritten(array.T, 1) == 2
+    assert first_unwritten(np.ones(3), 0) == 3
+    assert first_unwritten(np.arange(3), 0) is None
+
+
+def test_live_requires_hdf5(tmp_path):
+    with pytest.raises(AssertionError):
+        ps.load_experiment(str(tmp_path / 'missing.pkl'), live=True)
@@ -0,0 +1,183 @@
+import pyscan as ps
+import numpy as np
+import pytest
+import h5py
+import json
+
+
+@pytest.fixture()
+def expt():
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+    devices.v2 = ps.TestVoltage()
+
+    def measure(expt):
+        d = ps.ItemAttribute()
+        d.x1 = expt.runinfo.scan0.i + 10 * expt.runinfo.scan1.i
+        d.x2 = [d.x1, 2 * d.x1, 3 * d.x1]
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.3)}, 'voltage', dt=0)
+    runinfo.scan1 = ps.PropertyScan({'v2': ps.drange(0, 0.1, 0.2)}, 'voltage', dt=0)
+
+    expt = ps.Experiment(runinfo, devices)
+    expt.run()
+    return expt
+
+
+def test_lazy_matches_load(expt):
+    loaded = ps.load_experiment(expt.save_name)
+
+    with ps.load_experiment(expt.save_name, lazy=True) as lazy:
+        assert isinstance(lazy, ps.LazyExperiment)
+        assert sorted(lazy.runinfo.measured) == sorted(loaded.runinfo.measured)
+        for key in ['x1', 'x2', 'v1_voltage', 'v2_voltage']:
+            assert isinstance(lazy[key], ps.LazyArray)
+            assert lazy[key].shape == loaded[key].shape
+            assert np.allclose(np.asarray(lazy[key]), loaded[key])
+
+
+def test_lazy_slicing_and_dtype(expt):
+    with ps.load_experiment(expt.save_name, lazy=True) as lazy:
+        x2 = lazy.x2
+        assert (x2.ndim, x2.size, len(x2)) == (3, 36, 4)
+        assert np.allclose(x2[1, :, 2], expt.x2[1, :, 2])
+        assert np.allclose(x2[-1], expt.x2[-1])
+        # not supported by h5py, falls back to reading the dataset
+        assert np.allclose(x2[::-1, 0, [2, 0]], expt.x2[::-1, 0, [2, 0]])
+        assert np.isclose(np.mean(lazy.x1), np.mean(expt.x1))
+
+        # saved dtypes are kept instead of being converted to float64
+        assert lazy.x1.dtype == np.float64
+        assert lazy.v1_voltage.dtype == np.float32
+        assert np.asarray(lazy.v1_voltage, dtype='float64').dtype == np.float64
+
+    with pytest.raises(Exception):
+        lazy.x1[0]
+
+
+def test_lazy_requires_hdf5(tmp_path):
+    with pytest.raises(AssertionError):
+        ps.load_experiment(str(tmp_path / 'missing.pkl'), lazy=True)
+
+
+@pytest.fixture()
+def experiments(tmp_path):
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+
+    experiments = []
+    for n in range(4):
+        def measure(expt, n=n):
+            d = ps.ItemAttribute()
+            d.x1 = expt.runinfo.scan0.i + 10 * n
+            d.x2 = [d.x1, 2 * d.x1]
+            return d
+
+        runinfo = ps.RunInfo()
+        runinfo.measure_function = measure
+        runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.2)}, 'voltage', dt=0)
+        runinfo.initial_pause = 0
+
+        expt = ps.Experiment(runinfo, devices, data_dir=tmp_path)
+        expt.run()
+        experiments.append(expt)
+
+    return experiments
+
+
+@pytest.mark.parametrize('processes', [False, True])
+def test_load_experiments_order_and_keys(experiments, processes):
+    paths = [expt.save_name for expt in experiments[::-1]]
+    loaded = ps.load_experiments(paths, keys=['x1'], workers=2, processes=processes)
+
+    assert len(loaded) == 4
+    for expt, load in zip(experiments[::-1], loaded):
+        assert np.allclose(load.x1, expt.x1)
+        assert 'x2' not in load.keys()
+        assert sorted(load.runinfo.measured) == ['x1', 'x2']
+        assert load.runinfo.file_name == expt.runinfo.file_name
+
+
+def test_load_experiments_stack(experiments):
+    stacked = ps.load_experiments([expt.save_name for expt in experiments], stack=True)
+
+    assert stacked.x1.shape == (4, 3)
+    assert stacked.x2.shape == (4, 3, 2)
+    assert np.allclose(stacked.x1[:, 0], [0, 10, 20, 30])
+    assert np.allclose(stacked.v1_voltage[2], [0, 0.1, 0.2])
+    assert len(stacked.experiments) == 4
+
+
+def test_load_experiments_stack_shape_mismatch(experiments, tmp_path):
+    def measure(expt):
+        d = ps.ItemAttribute()
+        d.x1 = expt.runinfo.scan0.i
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.3)}, 'voltage', dt=0)
+    runinfo.initial_pause = 0
+    expt = ps.Experiment(runinfo, experiments[0].devices, data_dir=tmp_path)
+    expt.run()
+
+    with pytest.raises(AssertionError):
+        ps.load_experiments([experiments[0].save_name, expt.save_name], keys=['x1'], stack=True)
+
+
+def test_metadata_arrays_stored_as_datasets(tmp_path):
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+
+    def measure(expt):
+        d = ps.ItemAttribute()
+        d.x1 = expt.runinfo.scan0.i
+        return d
+
+    runinfo = ps.RunInfo()
+    runinfo.measure_function = measure
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 2)}, 'voltage', dt=0)
+    runinfo.initial_pause = 0
+    runinfo.metadata_array_size = 10
+
+    expt = ps.Experiment(runinfo, devices, data_dir=tmp_path)
+    expt.run()
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert '_metadata' in f
+        assert '1.9' not in f.attrs['runinfo']
+        assert '_pyscan_dataset' in f.attrs['runinfo']
+
+    loaded = ps.load_experiment(expt.save_name)
+    values = loaded.runinfo.scan0.scan_dict['v1_voltage']
+    assert isinstance(values, ps.measurement.pyscan_json_decoder.MetadataArray)
+    assert values._value is None
+    assert np.allclose(values, expt.v1_voltage)
+    assert len(values) == 21
+    assert sorted(loaded.keys()) == ['devices', 'runinfo', 'v1_voltage', 'x1']
+    assert loaded.runinfo.measured == ['x1']
+
+    with ps.load_experiment(expt.save_name, lazy=True) as lazy:
+        assert np.allclose(lazy.runinfo.scan0.scan_dict['v1_voltage'][:3], [0, 0.1, 0.2])
+        assert '_metadata' not in lazy.keys()
+        assert lazy.runinfo.measured == ['x1']
+
+    # arrays not read before the file is closed reopen it by its path
+    lazy = ps.load_experiment(expt.save_name, lazy=True)
+    lazy.close()
+    assert lazy.runinfo.scan0.scan_dict['v1_voltage']._value is None
+    assert np.allclose(lazy.runinfo.scan0.scan_dict['v1_voltage'], expt.v1_voltage)
+
+
+def test_metadata_without_dataset_references(expt):
+    # files saved before metadata arrays were stored as datasets inline them in the JSON
+    with h5py.File(expt.save_name, 'a') as f:
+        del f['_metadata']
+        f.attrs['runinfo'] = json.dumps(expt.runinfo, cls=ps.measurement.pyscan_json_encoder.PyscanJSONEncoder)
+
+    loaded = ps.load_experiment(expt.save_name)
+    assert np.allclose(loaded.runinfo.scan0.scan_dict['v1_voltage'], [0, 0.1, 0.2, 0.3])
+    assert np.allclose(loaded.x1, expt.x1)
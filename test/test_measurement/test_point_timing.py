@@ -0,0 +1,78 @@
+import pyscan as ps
+import numpy as np
+import h5py
+import pytest
+
+
+def test_point_timing_laps_and_records():
+    timing = ps.PointTiming(['measure', 'save'], block_size=3)
+
+    for k in range(10):
+        assert timing.start_point() == k
+        timing.lap('measure')
+        if k % 2 == 0:
+            timing.record(k, 'save', 0.5)
+
+    timing.finish()
+    arrays = timing.arrays()
+
+    assert timing.n == 10
+    # rows are compacted into blocks while recording
+    assert len(timing.blocks) > 0
+    assert list(arrays.keys())[:3] == ['timestamp', 'measure', 'save']
+    assert arrays.timestamp.shape == (10,)
+    assert np.all(np.diff(arrays.timestamp) >= 0)
+    assert np.all(arrays.measure >= 0)
+    assert np.allclose(arrays.save[::2], 0.5)
+    assert np.all(np.isnan(arrays.save[1::2]))
+    assert arrays.elapsed == timing.elapsed
+
+
+def test_timing_report():
+    timing = ps.ItemAttribute()
+    timing.timestamp = np.arange(5.)
+    timing.measure = np.array([1., 2., 3., 4., np.nan])
+    timing.save = np.full(5, np.nan)
+    timing.start_time = 0
+    timing.elapsed = 20.
+
+    report = ps.timing_report(timing, percentiles=(50, 90))
+
+    assert list(report.keys()) == ['measure', 'save']
+    assert report.measure.count == 4
+    assert report.measure.total == 10
+    assert report.measure.mean == 2.5
+    assert report.measure.min == 1
+    assert report.measure.max == 4
+    assert report.measure.p50 == 2.5
+    assert report.measure.p90 == pytest.approx(3.7)
+    assert report.measure.fraction == 0.5
+    assert report.save.count == 0
+    assert np.isnan(report.save.p50)
+
+    table = ps.format_timing_report(report).splitlines()
+    assert len(table) == 3
+    assert table[1].split()[:2] == ['measure', '4']
+
+
+def test_timing_save_and_load(tmp_path):
+    timing = ps.PointTiming(['iterate_scan0', 'measure'])
+    for k in range(4):
+        timing.start_point()
+        timing.lap('iterate_scan0')
+        timing.lap('measure')
+    timing.finish()
+
+    path = tmp_path / 'timing.hdf5'
+    with h5py.File(path, 'w') as f:
+        timing.save(f)
+        # saving again replaces the group
+        timing.save(f)
+
+    loaded = ps.load_timing(tmp_path / 'timing')
+    arrays = timing.arrays()
+    assert list(loaded.keys()) == ['timestamp', 'iterate_scan0', 'measure', 'start_time', 'elapsed']
+    for column in timing.columns:
+        assert np.array_equal(loaded[column], arrays[column])
+    assert loaded.elapsed == arrays.elapsed
+    assert ps.timing_report(path).measure.count == 4
@@ -110,3 +110,41 @@ def test_low_continuous_scan():
 
     with pytest.raises(AssertionError):
         runinfo.check()
+
+
+def test_compiled_structure_is_cached():
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.1)}, prop='voltage')
+    runinfo.scan1 = ps.AverageScan(3)
+    runinfo.check()
+
+    structure = runinfo.structure
+    assert runinfo.structure is structure
+    assert structure.scans == (runinfo.scan0, runinfo.scan1)
+    assert runinfo.average_index == 1
+    assert runinfo.continuous_index == -1
+    assert '_structure' not in runinfo.keys()
+
+    # the scan lengths are not cached
+    runinfo.scan1.n = 5
+    assert runinfo.dims == (2, 5)
+
+
+def test_compiled_structure_invalidated():
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.1)}, prop='voltage')
+    runinfo.scan1 = ps.AverageScan(3)
+    runinfo.check()
+    assert runinfo.has_average_scan
+
+    runinfo.scan1 = ps.ContinuousScan(2)
+    assert not runinfo.has_average_scan
+    assert runinfo.has_continuous_scan
+    assert runinfo.continuous_index == 1
+
+    runinfo['scan2'] = ps.RepeatScan(2)
+    assert runinfo.ndim == 3
+
+    del runinfo.scan2
+    assert runinfo.ndim == 2
+    assert runinfo.scans == [runinfo.scan0, runinfo.scan1]
@@ -0,0 +1,208 @@
+import pyscan as ps
+import numpy as np
+import h5py
+import pytest
+
+
+def lorentzian(v):
+    return 1 / (1 + ((v - 1) / 0.1) ** 2)
+
+
+def measure_1D(expt):
+    d = ps.ItemAttribute()
+    d.x = lorentzian(expt.devices.v1.voltage)
+    d.xy = [d.x, 2 * d.x]
+    return d
+
+
+def measure_2D(expt):
+    d = ps.ItemAttribute()
+    d.x = np.exp(-((expt.devices.v1.voltage - 1) ** 2 + (expt.devices.v2.voltage + 1) ** 2) / 0.5)
+    return d
+
+
+def make_devices():
+    devices = ps.ItemAttribute()
+    devices.v1 = ps.TestVoltage()
+    devices.v2 = ps.TestVoltage()
+    return devices
+
+
+def run_1D(tmp_path, loss='gradient', n_max=40):
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.AdaptiveScan({'v1': (-5, 5)}, 'voltage', n_max, n_initial=5, loss=loss, grid_size=101)
+    runinfo.measure_function = measure_1D
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, make_devices(), data_dir=tmp_path)
+    expt.run()
+    return expt
+
+
+def test_adaptive_scan_init():
+    scan = ps.AdaptiveScan({'v1': (0, 1), 'v2': (-1, 1)}, 'voltage', 30, n_initial=3)
+
+    assert scan.n == 30
+    assert scan.iterator() == range(30)
+    assert list(scan.scan_dict.keys()) == ['v1_voltage', 'v2_voltage']
+    assert np.all(np.isnan(scan.scan_dict['v1_voltage']))
+    # the initial 3 x 3 grid is queued
+    assert len(scan.queue) == 9
+
+    with pytest.raises(AssertionError):
+        ps.AdaptiveScan({'v1': (0, 1)}, 'voltage', 4, n_initial=5)
+    with pytest.raises(AssertionError):
+        ps.AdaptiveScan({'v1': (0, 1)}, 'voltage', 10, loss='spline')
+    with pytest.raises(AssertionError):
+        ps.AdaptiveScan({'v1': (0, 1), 'v2': (0, 1), 'v3': (0, 1)}, 'voltage', 200)
+
+
+@pytest.mark.parametrize('loss', ['gradient', 'curvature'])
+def test_adaptive_scan_1D(tmp_path, loss):
+    expt = run_1D(tmp_path, loss)
+
+    v = expt.v1_voltage
+    assert expt.runinfo.complete is True
+    assert v.shape == (40,)
+    assert np.all((v >= -5) & (v <= 5))
+    assert len(np.unique(v)) == 40
+    assert np.allclose(v[:5], [-5, -2.5, 0, 2.5, 5])
+    assert np.allclose(expt.x, lorentzian(v))
+
+    # the points are concentrated on the line
+    assert np.sum(np.abs(v - 1) < 0.5) > 10 * np.sum((v > 2) & (v < 2.5))
+
+    loaded = ps.load_experiment(expt.save_name)
+    assert np.allclose(loaded.v1_voltage, v)
+    assert np.allclose(loaded.x, expt.x)
+    assert sorted(loaded.runinfo.measured) == ['x', 'xy']
+
+
+def test_adaptive_scan_grid_1D(tmp_path):
+    expt = run_1D(tmp_path)
+
+    grid = ps.load_grid(expt.save_name)
+    assert np.allclose(grid.v1_voltage, np.linspace(-5, 5, 101))
+    assert grid.x.shape == (101,)
+    assert grid.xy.shape == (101, 2)
+    assert np.allclose(grid.xy[:, 1], 2 * grid.x)
+
+    # the refined line is interpolated closely
+    assert np.max(np.abs(grid.x - lorentzian(grid.v1_voltage))) < 0.1
+    assert np.allclose(grid.x, np.interp(grid.v1_voltage, np.sort(expt.v1_voltage),
+                                         expt.x[np.argsort(expt.v1_voltage)]))
+
+
+def test_adaptive_scan_2D(tmp_path):
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.AdaptiveScan({'v1': (0, 2), 'v2': (-2, 2)}, 'voltage', 120, n_initial=5, grid_size=41)
+    runinfo.measure_function = measure_2D
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, make_devices(), data_dir=tmp_path)
+    expt.run()
+
+    v1, v2 = expt.v1_voltage, expt.v2_voltage
+    assert np.all(np.isfinite(v1)) and np.all(np.isfinite(v2))
+    assert len(set(zip(v1, v2))) == 120
+    assert np.allclose(expt.x, np.exp(-((v1 - 1) ** 2 + (v2 + 1) ** 2) / 0.5))
+    # more points on the peak than in the flat corner
+    assert np.sum(v2 < 0) > 1.5 * np.sum(v2 > 0)
+
+    grid = ps.load_grid(expt.save_name)
+    assert grid.x.shape == (41, 41)
+    assert np.allclose(grid.v1_voltage, np.linspace(0, 2, 41))
+    g1, g2 = np.meshgrid(grid.v1_voltage, grid.v2_voltage, indexing='ij')
+    assert np.max(np.abs(grid.x - np.exp(-((g1 - 1) ** 2 + (g2 + 1) ** 2) / 0.5))) < 0.15
+
+    # samples on the grid keep their measured values
+    for a, b, x in zip(v1, v2, expt.x):
+        i, j = np.argmin(np.abs(grid.v1_voltage - a)), np.argmin(np.abs(grid.v2_voltage - b))
+        if np.isclose(grid.v1_voltage[i], a) and np.isclose(grid.v2_voltage[j], b):
+            assert grid.x[i, j] == pytest.approx(x)
+
+
+def test_adaptive_scan_must_be_only_scan():
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.AdaptiveScan({'v1': (0, 1)}, 'voltage', 10)
+    runinfo.scan1 = ps.RepeatScan(2)
+    runinfo.measure_function = measure_1D
+
+    with pytest.raises(AssertionError):
+        runinfo.check()
+
+
+def test_non_adaptive_experiment_has_no_grid(tmp_path):
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.3)}, 'voltage')
+    runinfo.measure_function = measure_1D
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, make_devices(), data_dir=tmp_path)
+    expt.run()
+
+    with h5py.File(expt.save_name, 'r') as f:
+        assert '_grid' not in f
+
+
+def test_adaptive_scan_stops_when_fully_refined(tmp_path):
+    class ShallowScan(ps.AdaptiveScan):
+        max_depth = 1
+
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ShallowScan({'v1': (0, 1)}, 'voltage', 10, n_initial=3)
+    runinfo.measure_function = measure_1D
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, make_devices(), data_dir=tmp_path)
+    expt.run()
+
+    # 0, 0.25, 0.5, 0.75 and 1 are the only reachable values
+    assert np.allclose(np.sort(expt.v1_voltage[:5]), [0, 0.25, 0.5, 0.75, 1])
+    assert np.all(np.isnan(expt.v1_voltage[5:]))
+    assert np.allclose(ps.load_grid(expt.save_name).x, np.interp(
+        np.linspace(0, 1, 201), [0, 0.25, 0.5, 0.75, 1], lorentzian(np.array([0, 0.25, 0.5, 0.75, 1]))))
+
+
+def test_adaptive_scan_rerun_stopped_early(tmp_path):
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.AdaptiveScan({'v1': (-5, 5)}, 'voltage', 40, n_initial=5, grid_size=101)
+    runinfo.measure_function = measure_1D
+    runinfo.initial_pause = 0
+    ps.Experiment(runinfo, make_devices(), data_dir=tmp_path).run()
+
+    calls = []
+
+    def stop_after_11(expt):
+        calls.append(1)
+        if len(calls) == 11:
+            expt.stop(interrupt=False)
+        return measure_1D(expt)
+
+    # the coordinates of the first run are cleared when the scan starts again
+    runinfo.measure_function = stop_after_11
+    expt = ps.Experiment(runinfo, make_devices(), data_dir=tmp_path)
+    expt.run()
+
+    assert np.all(np.isfinite(expt.v1_voltage[:11]))
+    assert np.all(np.isnan(expt.v1_voltage[11:]))
+    assert np.all(np.isnan(expt.x[11:]))
+
+    grid = ps.load_grid(expt.save_name)
+    assert grid.x.shape == (101,)
+    assert np.allclose(grid.x[50], lorentzian(0), atol=0.05)
+    with h5py.File(expt.save_name, 'r') as f:
+        assert np.all(np.isnan(f['v1_voltage'][11:]))
+
+
+def test_adaptive_scan_grid_error_warns(tmp_path, monkeypatch):
+    def fail(self, expt):
+        raise ValueError('grid failed')
+
+    monkeypatch.setattr(ps.AdaptiveScan, 'grid', fail)
+    with pytest.warns(UserWarning, match='grid failed'):
+        expt = run_1D(tmp_path, n_max=30)
+
+    assert expt.runinfo.complete is True
+    with h5py.File(expt.save_name, 'r') as f:
+        assert '_grid' not in f
@@ -2,6 +2,8 @@ import pyscan as ps
 import numpy as np
 import pytest
 
+from time import perf_counter, sleep
+
 
 @pytest.fixture()
 def runinfo():
@@ -76,3 +78,49 @@ def test_property_scan_iterate_one(runinfo, devices, property_scan):
     runinfo.scan0.iterate(expt, 1, 1)
     assert expt.devices.v1.voltage == 0.1
     assert expt.runinfo.scan0.i == 1
+
+
+class SlowVoltage(ps.ItemAttribute):
+    '''
+    Device that takes 0.2 s to set its voltage, like a ramped source
+    '''
+
+    @property
+    def voltage(self):
+        return self._voltage
+
+    @voltage.setter
+    def voltage(self, value):
+        sleep(0.2)
+        self._voltage = value
+
+
+def test_property_scan_parallel(runinfo):
+    devices = ps.ItemAttribute()
+    for dev in ['v1', 'v2', 'v3', 'v4']:
+        devices[dev] = SlowVoltage()
+
+    runinfo.scan0 = ps.PropertyScan(
+        {dev: np.arange(2) + k for k, dev in enumerate(devices.keys())}, prop='voltage', parallel=True)
+    expt = ps.Experiment(runinfo, devices)
+
+    t0 = perf_counter()
+    runinfo.scan0.iterate(expt, 1, 1)
+    elapsed = perf_counter() - t0
+
+    assert [devices[dev].voltage for dev in ['v1', 'v2', 'v3', 'v4']] == [1, 2, 3, 4]
+    assert elapsed < 0.6
+
+
+def test_property_scan_parallel_errors(runinfo, devices):
+    runinfo.scan0 = ps.PropertyScan(
+        {'v1': [0, 1], 'v2': [0, 20], 'v3': [0, -20]}, prop='voltage', parallel=True)
+    expt = ps.Experiment(runinfo, devices)
+
+    with pytest.raises(ps.PropertyScanError) as error:
+        runinfo.scan0.iterate(expt, 1, 1)
+
+    assert list(error.value.errors.keys()) == ['v2', 'v3']
+    assert isinstance(error.value.errors['v2'], AssertionError)
+    assert 'v2' in str(error.value) and 'v3' in str(error.value)
+    assert devices.v1.voltage == 1
@@ -0,0 +1,188 @@
+import pyscan as ps
+import numpy as np
+import pytest
+
+
+class FakeAWG(ps.ItemAttribute):
+    '''
+    Records the commands of an Agilent33500 used by a SweepScan
+    '''
+
+    def __init__(self, lockin):
+        self.lockin = lockin
+        self.uploads = 0
+        self.trigger_source = 'EXT'
+
+    def sweep_mode(self, values, srate):
+        self.values = np.array(values)
+        self.srate = srate
+        self.uploads += 1
+
+    def trigger(self):
+        assert self.trigger_source == 'BUS'
+        # the lock-in records the sweep, x = v and y = -v
+        self.lockin.record(self.values)
+
+
+class FakeLockin(ps.ItemAttribute):
+    '''
+    Records the buffer commands of a Stanford830 used by a SweepScan
+    '''
+
+    def __init__(self):
+        self.buffer = np.zeros((0, 2))
+        self.running = False
+        self.sweeps = 0
+
+    def set_buffer_mode(self, sample_rate):
+        self.sample_rate = sample_rate
+
+    def wait_for_trigger(self):
+        self.running = False
+        self.buffer = np.zeros((0, 2))
+
+    def start(self):
+        self.running = True
+
+    def pause(self):
+        self.running = False
+
+    def record(self, values):
+        if self.running:
+            self.buffer = np.stack([values, -values], axis=1) + self.sweeps
+            self.sweeps += 1
+
+    @property
+    def buffer_points(self):
+        return len(self.buffer)
+
+    def read_binary_buffer(self, channel, start, points):
+        return self.buffer[start:start + points, channel - 1]
+
+
+@pytest.fixture()
+def devices():
+    devices = ps.ItemAttribute()
+    devices.lockin = FakeLockin()
+    devices.awg = FakeAWG(devices.lockin)
+    devices.v1 = ps.TestVoltage()
+    return devices
+
+
+def measure(expt):
+    return expt.runinfo.scan0.point()
+
+
+def test_sweep_scan_experiment(devices, tmp_path):
+    values = ps.drange(0, 0.1, 0.4)
+
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.SweepScan({'awg': values}, 'lockin', 512)
+    runinfo.scan1 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.2)}, 'voltage')
+    runinfo.measure_function = measure
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, devices, data_dir=tmp_path)
+    expt.run()
+
+    assert devices.awg.uploads == 1
+    assert devices.lockin.sweeps == 3
+    assert devices.lockin.sample_rate == 512
+    assert np.allclose(devices.awg.values, values)
+
+    assert expt.x.shape == (5, 3)
+    assert np.allclose(expt.x, values[:, np.newaxis] + np.arange(3))
+    assert np.allclose(expt.y, -values[:, np.newaxis] + np.arange(3))
+    assert np.allclose(expt.awg_voltage, values)
+
+    loaded = ps.load_experiment(expt.save_name)
+    assert np.allclose(loaded.x, expt.x)
+
+    # a new experiment uploads the waveform again
+    expt = ps.Experiment(runinfo, devices, data_dir=tmp_path)
+    expt.run()
+    assert devices.awg.uploads == 2
+
+
+def test_sweep_scan_resume(devices, tmp_path):
+    values = ps.drange(0, 0.1, 0.4)
+    calls = []
+
+    def crash_measure(expt):
+        calls.append(expt.runinfo.indicies)
+        if len(calls) == 8:
+            raise RuntimeError('crash')
+        return expt.runinfo.scan0.point()
+
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.SweepScan({'awg': values}, 'lockin', 512)
+    runinfo.scan1 = ps.PropertyScan({'v1': ps.drange(0, 0.1, 0.2)}, 'voltage')
+    runinfo.measure_function = crash_measure
+    runinfo.initial_pause = 0
+
+    crashed = ps.Experiment(runinfo, devices, data_dir=tmp_path)
+    with pytest.raises(RuntimeError):
+        crashed.run()
+
+    # the crash was in the middle of the second line, which is swept again from its start
+    runinfo.measure_function = measure
+    expt = ps.Experiment(runinfo, devices, data_dir=tmp_path)
+    expt.resume(crashed.save_name)
+
+    assert expt.runinfo.complete is True
+    assert devices.lockin.sweeps == 4
+    assert np.allclose(expt.x[:, 0], values)
+    assert np.allclose(expt.x[:, 1:], values[:, np.newaxis] + np.arange(2, 4))
+    assert np.allclose(expt.y[:, 1:], -values[:, np.newaxis] + np.arange(2, 4))
+
+    loaded = ps.load_experiment(expt.save_name)
+    assert np.allclose(loaded.x, expt.x)
+
+
+def test_sweep_scan_custom_trigger(devices, tmp_path):
+    def trigger(expt):
+        expt.devices.lockin.start()
+        expt.devices.lockin.record(expt.devices.awg.values)
+
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.SweepScan(
+        {'awg': np.linspace(0, 1, 4)}, 'lockin', 256, channels={'r': 1}, trigger=trigger)
+    runinfo.measure_function = measure
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, devices, data_dir=tmp_path)
+    expt.run()
+
+    assert devices.awg.trigger_source == 'EXT'
+    assert np.allclose(expt.r, np.linspace(0, 1, 4))
+    assert 'x' not in expt.keys()
+
+
+def test_sweep_scan_timeout(devices, tmp_path):
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.SweepScan({'awg': np.linspace(0, 1, 4)}, 'lockin', 256, trigger=lambda expt: None, timeout=0.05)
+    runinfo.measure_function = measure
+    runinfo.initial_pause = 0
+
+    expt = ps.Experiment(runinfo, devices, data_dir=tmp_path)
+    with pytest.raises(TimeoutError):
+        expt.run()
+
+
+def test_sweep_scan_must_be_scan0():
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.RepeatScan(2)
+    runinfo.scan1 = ps.SweepScan({'awg': np.linspace(0, 1, 4)}, 'lockin', 256)
+
+    with pytest.raises(AssertionError):
+        runinfo.check()
+
+
+def test_sweep_scan_requires_raster():
+    runinfo = ps.RunInfo()
+    runinfo.scan0 = ps.SweepScan({'awg': np.linspace(0, 1, 4)}, 'lockin', 256)
+    runinfo.scan1 = ps.RepeatScan(2)
+    runinfo.scan_order = 'serpentine'
+
+    with pytest.raises(AssertionError):
+        runinfo.check()